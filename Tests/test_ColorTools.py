@@ -0,0 +1,96 @@
+from jes4py import *
+import numpy as np
+
+# Supporting functions
+def openPicture(mediaPath='', filename='nico_small.jpg'):
+    setMediaPath(mediaPath)
+    return makePicture(filename)
+
+# Testing functions
+
+def test_colorDistanceMap():
+    picture = openPicture()
+    distances = colorDistanceMap(picture, orange)
+    assert distances.shape == (getHeight(picture), getWidth(picture))
+    for x, y in [(0, 0), (31, 17), (getWidth(picture) - 1, 9)]:
+        assert distances[y, x] == distance(getColor(getPixel(picture, x, y)), orange)
+    gray = colorDistanceMap(picture, orange, asPicture=True)
+    assert getColor(getPixel(gray, 5, 5)) == makeColor(getRed(getPixel(gray, 5, 5)))
+    assert colorDistanceMap(makeEmptyPicture(3, 3, white), black, True).getImage().getpixel((1, 1)) == (255, 255, 255)
+
+def test_chromaKey():
+    foreground = makeEmptyPicture(40, 30, blue)
+    addRectFilled(foreground, 10, 10, 5, 5, red)
+    background = openPicture()
+    expected = duplicatePicture(foreground)
+    for pix in getPixels(expected):
+        if distance(getColor(pix), blue) < 100:
+            setColor(pix, getColor(getPixel(background, getX(pix), getY(pix))))
+    result = chromaKey(foreground, background, blue, 100)
+    assert result.getImage().tobytes() == expected.getImage().tobytes()
+    assert getColor(getPixel(foreground, 0, 0)) == blue
+    assert chromaKey(foreground, background, blue, 100, inPlace=True) is foreground
+    assert getColor(getPixel(foreground, 12, 12)) == red
+
+def test_replaceBackground():
+    oldBackground = openPicture()
+    picture = duplicatePicture(oldBackground)
+    addRectFilled(picture, 20, 20, 10, 10, green)
+    newBackground = makeEmptyPicture(200, 200, yellow)
+    result = replaceBackground(picture, oldBackground, newBackground, 10)
+    assert getColor(getPixel(result, 2, 2)) == yellow
+    assert getColor(getPixel(result, 25, 25)) == green
+
+def test_quantize():
+    picture = openPicture()
+    palette = [black, white, red, green, blue, yellow, gray, pink]
+    indices = nearestColorMap(picture, palette)
+    for x, y in [(0, 0), (20, 14), (getWidth(picture) - 1, getHeight(picture) - 1)]:
+        color = getColor(getPixel(picture, x, y))
+        distances = [distance(color, c) for c in palette]
+        assert indices[y, x] == distances.index(min(distances))
+    result = quantize(picture, palette)
+    assert getColor(getPixel(result, 20, 14)) == palette[indices[14, 20]]
+    dithered = quantize(picture, palette, dither=True)
+    colors = set(map(tuple, np.array(dithered.getImage()).reshape(-1, 3).tolist()))
+    assert colors <= set(c.getRGB() for c in palette)
+
+def test_makePalette():
+    picture = openPicture()
+    for method in ['mediancut', 'kmeans']:
+        palette = makePalette(picture, 6, method)
+        assert 1 <= len(palette) <= 6
+        assert all(isinstance(c, Color) for c in palette)
+    error = {}
+    for method in ['mediancut', 'kmeans']:
+        result = quantize(picture, makePalette(picture, 6, method))
+        diff = np.array(result.getImage(), dtype=float) - np.array(picture.getImage(), dtype=float)
+        error[method] = (diff ** 2).mean()
+    assert error['kmeans'] <= error['mediancut']
+
+def test_applyColorFunction():
+    picture = openPicture()
+    def sepia(color):
+        r, g, b = color.getRGB()
+        return (0.393 * r + 0.769 * g + 0.189 * b,
+                0.349 * r + 0.686 * g + 0.168 * b,
+                0.272 * r + 0.534 * g + 0.131 * b)
+    exact = applyColorFunction(picture, sepia, 'exact')
+    for pix in [getPixel(picture, 3, 4), getPixel(picture, 40, 20)]:
+        expected = makeColor(*sepia(getColor(pix)))
+        assert getColor(getPixel(exact, getX(pix), getY(pix))) == expected
+    approximate = applyColorFunction(picture, sepia, '3d', lutSize=17)
+    diff = np.array(approximate.getImage(), dtype=int) - np.array(exact.getImage(), dtype=int)
+    assert np.abs(diff).max() <= 3
+    inverted = applyColorFunction(picture, lambda c: (255 - c.getRed(), 255 - c.getGreen(), 255 - c.getBlue()))
+    assert getRed(getPixel(inverted, 5, 5)) == 255 - getRed(getPixel(picture, 5, 5))
+
+def test_makeDarker_makeLighter_picture():
+    picture = openPicture()
+    addRectFilled(picture, 0, 0, 4, 4, makeColor(1, 0, 2))
+    for func in [makeDarker, makeLighter, lambda p: scaleColor(p, 1.3)]:
+        result = func(picture)
+        for x, y in [(1, 1), (10, 12), (30, 25)]:
+            color = getColor(getPixel(picture, x, y))
+            expected = func(color)
+            assert getColor(getPixel(result, x, y)) == expected
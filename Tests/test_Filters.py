@@ -0,0 +1,111 @@
+from jes4py import *
+import numpy as np
+
+# Supporting functions
+def openPicture(mediaPath='', filename='nico_small.jpg'):
+    setMediaPath(mediaPath)
+    return makePicture(filename)
+
+def slowConvolve(picture, kernel):
+    # reference convolution written with pixels, clamping at the border
+    w, h = getWidth(picture), getHeight(picture)
+    r = len(kernel) // 2
+    result = duplicatePicture(picture)
+    for y in range(h):
+        for x in range(w):
+            total = [0, 0, 0]
+            for i in range(-r, r + 1):
+                for j in range(-r, r + 1):
+                    pix = picture.getPixel(min(max(x - j, 0), w - 1),
+                                           min(max(y - i, 0), h - 1))
+                    weight = kernel[i + r][j + r]
+                    total[0] += weight * getRed(pix)
+                    total[1] += weight * getGreen(pix)
+                    total[2] += weight * getBlue(pix)
+            total = [min(max(int(round(t)), 0), 255) for t in total]
+            result.getPixel(x, y).setColor(makeColor(*total))
+    return result
+
+# Testing functions
+
+def test_convolve():
+    picture = openPicture().crop(10, 10, 30, 20)
+    kernel = [[0, -1, 2], [1, 3, 0], [-2, 0, 1]]
+    expected = slowConvolve(picture, kernel)
+    result = convolve(picture, kernel, border='clamp')
+    assert result.getImage().tobytes() == expected.getImage().tobytes()
+    # separable kernels take the two-pass route
+    kernel = [[1, 2, 1], [2, 4, 2], [1, 2, 1]]
+    kernel = [[k / 16 for k in row] for row in kernel]
+    expected = np.array(slowConvolve(picture, kernel).getImage(), dtype=int)
+    result = np.array(convolve(picture, kernel, 'clamp').getImage(), dtype=int)
+    assert np.abs(result - expected).max() <= 1
+
+def test_blur_border():
+    picture = makeEmptyPicture(9, 7, pink)
+    for blur in [gaussianBlur(picture, 2.0), boxBlur(picture, 3, 'wrap'),
+                 sharpen(picture)]:
+        assert blur.getImage().tobytes() == picture.getImage().tobytes()
+    # with wrapping, a bright column bleeds across the left border
+    picture = makeEmptyPicture(9, 7, black)
+    for y in range(7):
+        setColor(getPixel(picture, 8, y), white)
+    assert getRed(getPixel(boxBlur(picture, 1, 'wrap'), 0, 3)) == 85
+    assert getRed(getPixel(boxBlur(picture, 1, 'clamp'), 0, 3)) == 0
+
+def test_boxBlur_pixelate():
+    picture = openPicture()
+    for radius in [2, 40]:
+        expected = convolve(picture, [[1 / (2 * radius + 1) ** 2] * (2 * radius + 1)] * (2 * radius + 1))
+        result = boxBlur(picture, radius)
+        diff = np.array(result.getImage(), dtype=int) - np.array(expected.getImage(), dtype=int)
+        assert np.abs(diff).max() <= 1
+    w, h = getWidth(picture), getHeight(picture)
+    blocks = pixelate(picture, 7)
+    for x, y in [(0, 0), (15, 22), (w - 1, h - 1)]:
+        bx, by = x - x % 7, y - y % 7
+        mean = regionMean(picture, bx, by, 7, 7)
+        assert getColor(getPixel(blocks, x, y)) == makeColor(*[round(m) for m in mean])
+
+def test_medianFilter_rankFilter():
+    picture = openPicture().crop(0, 0, 25, 18)
+    levels = np.array(picture.getImage())
+    padded = np.pad(levels, [(2, 2), (2, 2), (0, 0)], mode='symmetric')
+    windows = np.array([[padded[y:y + 5, x:x + 5].reshape(25, 3)
+                         for x in range(25)] for y in range(18)])
+    median = medianFilter(picture, 2)
+    assert (np.array(median.getImage()) == np.median(windows, axis=2)).all()
+    lowest = rankFilter(picture, 2, 0)
+    assert (np.array(lowest.getImage()) == windows.min(axis=2)).all()
+
+def test_morphology():
+    picture = makeEmptyPicture(20, 20, black)
+    addRectFilled(picture, 5, 5, 8, 8, white)
+    setColor(getPixel(picture, 17, 2), white)
+    setColor(getPixel(picture, 8, 8), black)
+    assert getColor(getPixel(opening(picture, 1, 128), 17, 2)) == black
+    assert getColor(getPixel(opening(picture, 1, 128), 6, 6)) == white
+    assert getColor(getPixel(closing(picture), 8, 8)) == white
+    assert getColor(getPixel(erode(picture), 5, 5)) == black
+    assert getColor(getPixel(dilate(picture, 2), 3, 3)) == white
+
+def test_edgeDetect():
+    picture = makeEmptyPicture(20, 10, white)
+    for y in range(10):
+        for x in range(10):
+            setColor(getPixel(picture, x, y), black)
+    for method in ['sobel', 'laplacian']:
+        edges = edgeDetect(picture, method)
+        assert getRed(getPixel(edges, 3, 5)) == 0
+        assert getRed(getPixel(edges, 15, 5)) == 0
+        assert getRed(getPixel(edges, 9, 5)) > 200
+        assert getRed(getPixel(edges, 10, 5)) > 200
+        assert getColor(getPixel(edges, 9, 5)) == makeColor(getRed(getPixel(edges, 9, 5)))
+
+def test_inPlace():
+    picture = openPicture()
+    before = picture.getImage().tobytes()
+    blurred = gaussianBlur(picture, 1.5)
+    assert picture.getImage().tobytes() == before
+    assert gaussianBlur(picture, 1.5, inPlace=True) is picture
+    assert picture.getImage().tobytes() == blurred.getImage().tobytes()
@@ -1,7 +1,11 @@
 from jes4py import *
+from jes4py import Vectorizer
 from random import randint
 import PIL.Image
+import numpy as np
 import os
+import glob
+import pickle
 import time
 
 # Supporting functions
@@ -31,6 +35,13 @@ def makeReferenceImage(filename='refimage.jpg'):
     pic.setFileName("ScribbleTest")
     pic.image.save(filename)
 
+def posterizePixel(pix):
+    # defined at top level so it can be sent to worker processes
+    for get, set in [(getRed, setRed), (getGreen, setGreen), (getBlue, setBlue)]:
+        set(pix, get(pix) * 1.7 - 40)
+    if getX(pix) == getY(pix):
+        setColor(pix, yellow)
+
 # Testing functions
 
 def test_init():
@@ -131,6 +142,247 @@ def test_crop():
     croppedImage = croppedPicture.getImage()
     assert croppedImage == image.crop([x, y, x+cw, y+ch])
     
+def test_image_mode_normalized():
+    filename = 'test_modes.png'
+    sources = [PIL.Image.new('L', (4, 3), 77),
+               PIL.Image.new('RGB', (4, 3), (10, 20, 30)).convert('P'),
+               PIL.Image.new('LA', (4, 3), (77, 128))]
+    for image, mode in zip(sources, ['RGB', 'RGB', 'RGBA']):
+        image.save(filename)
+        picture = makePicture(os.path.abspath(filename))
+        assert picture.getImage().mode == mode
+        pix = picture.getPixel(1, 1)
+        assert len(pix.getColor().getRGB()) == 3
+        pix.setRed(200)
+        assert pix.getRed() == 200
+    # alpha levels survive pixel writes
+    assert picture.getImage().getpixel((1, 1))[3] == 128
+    os.remove(filename)
+
+def test_getWxImage_cache():
+    picture = openEmptyPicture(white, 4, 3)
+    picture.getWxImage()
+    data = picture._cache['wxData']
+    picture.getWxImage()
+    assert picture._cache['wxData'] is data
+    picture.getPixel(0, 0).setColor(red)
+    assert bytes(picture.getWxImage().GetData()[:3]) == bytes([255, 0, 0])
+
+def test_makePicture_reduced():
+    setMediaPath('')
+    full = makePicture('city.jpg')
+    picture = makePicture('city.jpg', maxWidth=200)
+    assert picture.getWidth() == 200
+    assert abs(picture.getHeight() - 200 * full.getHeight() / full.getWidth()) <= 1
+    thumb = makeThumbnail('city.jpg', 300, 100)
+    assert thumb.getWidth() <= 300 and thumb.getHeight() == 100
+    assert thumb.getImage().mode == 'RGB'
+
+def test_duplicate_copy_on_write():
+    picture = openPicture()
+    before = picture.getPixel(5, 5).getColor()
+    copy = duplicatePicture(picture)
+    assert copy.image is picture.image
+    copy.getPixel(5, 5).setColor(red)
+    assert copy.image is not picture.image
+    assert copy.getPixel(5, 5).getColor() == red
+    assert picture.getPixel(5, 5).getColor() == before
+    # drawing on the original leaves an earlier duplicate untouched
+    copy2 = Picture(picture)
+    addRectFilled(picture, 0, 0, 10, 10, blue)
+    assert copy2.getPixel(5, 5).getColor() == before
+    # reading the image neither unshares it nor discards cached data
+    copy3 = duplicatePicture(copy2)
+    generation = copy3._generation
+    assert copy3.getImage() is copy2.getImage()
+    assert copy3._generation == generation
+    # fast pixel writes stop as soon as the pixels are shared again
+    setColor(getPixel(copy, 1, 1), red)
+    mean = regionMean(copy, 1, 1, 1, 1)
+    copy4 = duplicatePicture(copy)
+    setColor(getPixel(copy, 1, 1), blue)
+    assert getColor(getPixel(copy4, 1, 1)) == red
+    assert regionMean(copy, 1, 1, 1, 1) != mean
+    assert pickle.loads(pickle.dumps(copy)).getPixel(1, 1).getColor() == blue
+
+def test_mapPixels():
+    picture = openPicture('', 'nico_small.jpg')
+    expected = duplicatePicture(picture)
+    for pix in getPixels(expected):
+        posterizePixel(pix)
+    mapPixels(picture, posterizePixel, workers=3)
+    assert picture.getImage().tobytes() == expected.getImage().tobytes()
+    # lambdas cannot be sent to other processes and run serially instead
+    mapPixels(picture, lambda pix: setRed(pix, 0), workers=2)
+    assert getRed(getPixel(picture, 10, 20)) == 0
+
+def test_applyToPicture():
+    def grayscaleThreshold(pix):
+        level = (getRed(pix) + getGreen(pix) + getBlue(pix)) / 3
+        if level < 100 and getX(pix) > 20:
+            setColor(pix, makeColor(level / 2, 0, 0))
+        elif level > 200:
+            setBlue(pix, 255 - getBlue(pix))
+        else:
+            setGreen(pix, max(getRed(pix), getGreen(pix)) * 1.5)
+    def squareRoot(pix):
+        import math
+        setRed(pix, math.sqrt(getRed(pix)) * 16)
+    for func in [posterizePixel, grayscaleThreshold, squareRoot]:
+        picture = openPicture('', 'nico_small.jpg')
+        expected = duplicatePicture(picture)
+        for pix in getPixels(expected):
+            func(pix)
+        applyToPicture(picture, func)
+        assert picture.getImage().tobytes() == expected.getImage().tobytes()
+    # decorated functions still work on a single pixel
+    darken = vectorize(lambda pix: setRed(pix, getRed(pix) - 300))
+    picture = openEmptyPicture(white, 5, 4)
+    darken(getPixel(picture, 0, 0))
+    assert getRed(getPixel(picture, 0, 0)) == 0
+    darken(picture)
+    assert getRed(getPixel(picture, 4, 3)) == 0
+    # division by zero raises as it does in a per-pixel loop
+    picture = openEmptyPicture(makeColor(200, 10, 30), 5, 4)
+    setColor(getPixel(picture, 2, 1), makeColor(200, 20, 30))
+    for func in [lambda pix: setRed(pix, getRed(pix) // (getGreen(pix) - 10)),
+                 lambda pix: setRed(pix, getRed(pix) % (getGreen(pix) - 10)),
+                 lambda pix: setRed(pix, getRed(pix) / (getGreen(pix) - 10)),
+                 lambda pix: setBlue(pix, 3000 / (getGreen(pix) - 10))]:
+        try:
+            applyToPicture(picture, func)
+            assert False
+        except ZeroDivisionError:
+            pass
+    # pixels whose divisor is zero but skip the division still trace
+    def guarded(pix):
+        if getGreen(pix) != 10:
+            setRed(pix, getRed(pix) // (getGreen(pix) - 10))
+    assert Vectorizer.applyToPicture(picture, guarded)
+    assert getRed(getPixel(picture, 2, 1)) == 20 and getRed(getPixel(picture, 0, 0)) == 200
+
+def test_regionSum_regionMean():
+    picture = openPicture('', 'nico_small.jpg')
+    sums = [0, 0, 0]
+    for y in range(5, 25):
+        for x in range(10, 13):
+            for c, level in enumerate(picture.getBasicPixel(x, y)):
+                sums[c] += level
+    assert regionSum(picture, 10, 5, 3, 20) == tuple(sums)
+    assert regionMean(picture, 10, 5, 3, 20) == tuple(s / 60 for s in sums)
+    # the table is rebuilt after the picture changes
+    setColor(getPixel(picture, 0, 0), white)
+    setColor(getPixel(picture, 1, 0), black)
+    assert regionSum(picture, -5, -5, 7, 6) == (255, 255, 255)
+    # regions entirely outside the picture sum to nothing and have no mean
+    w, h = getWidth(picture), getHeight(picture)
+    for x, y in [(w + 10, h + 10), (w, 0), (0, h + 3), (-10, -10)]:
+        assert picture.regionSum(x, y, 5, 5) == (0, 0, 0)
+        try:
+            picture.regionMean(x, y, 5, 5)
+            assert False
+        except ValueError:
+            pass
+
+def test_histogram_statistics():
+    picture = openPicture('', 'nico_small.jpg')
+    reds = [getRed(pix) for pix in getPixels(picture)]
+    histogram = getHistogram(picture, 'red')
+    assert histogram == [reds.count(i) for i in range(256)]
+    stats = getStatistics(picture)
+    assert stats['red']['min'] == min(reds) and stats['red']['max'] == max(reds)
+    assert abs(stats['red']['mean'] - sum(reds) / len(reds)) < 1e-9
+    assert sum(getHistogram(picture)) == len(reds)
+    # repeated queries reuse the cached histograms until the next write
+    assert getHistogram(picture, 'red') == histogram
+    assert picture._cache['histograms'][0] == picture._generation
+    setColor(getPixel(picture, 0, 0), makeColor(255, 0, 0))
+    assert getStatistics(picture)['red']['max'] == 255
+
+def test_equalizeHistogram():
+    picture = makeEmptyPicture(10, 10, makeColor(100, 100, 100))
+    addRectFilled(picture, 0, 0, 4, 9, makeColor(120, 110, 100))
+    result = equalizeHistogram(picture)
+    stats = getStatistics(result)
+    for channel in ['red', 'green']:
+        assert stats[channel]['min'] == 0 and stats[channel]['max'] == 255
+    assert getStatistics(picture)['red']['max'] == 120
+
+def test_mirror_flip():
+    picture = openPicture('', 'nico_small.jpg')
+    w, h = getWidth(picture), getHeight(picture)
+    mirrored = mirrorVertical(picture)
+    for x, y in [(0, 0), (7, 30), (w // 2 - 1, h - 1)]:
+        assert getColor(getPixel(mirrored, w - 1 - x, y)) == getColor(getPixel(picture, x, y))
+    mirrored = mirrorHorizontal(picture)
+    assert getColor(getPixel(mirrored, 3, h - 1)) == getColor(getPixel(picture, 3, 0))
+    flipped = flip(picture, 'vertical')
+    assert getColor(getPixel(flipped, 5, h - 8)) == getColor(getPixel(picture, 5, 7))
+    before = picture.getImage().tobytes()
+    assert flip(flip(picture, inPlace=True), inPlace=True) is picture
+    assert picture.getImage().tobytes() == before
+    # in-place flips and half turns work band by band, with odd heights
+    # and bands that do not divide the picture
+    bandBytes = Picture.FLIP_BAND_BYTES
+    Picture.FLIP_BAND_BYTES = 3 * w * 4
+    try:
+        for height in [h, h - 1]:
+            part = picture.crop(0, 0, w, height)
+            for direction, image in [('horizontal', part.getImage().transpose(PIL.Image.FLIP_LEFT_RIGHT)),
+                                     ('vertical', part.getImage().transpose(PIL.Image.FLIP_TOP_BOTTOM))]:
+                copy = duplicatePicture(part)
+                flip(copy, direction, inPlace=True)
+                assert copy.getImage().tobytes() == image.tobytes()
+            copy = duplicatePicture(part)
+            rotate(copy, 180, inPlace=True)
+            assert copy.getImage().tobytes() == part.getImage().transpose(PIL.Image.ROTATE_180).tobytes()
+            assert part.getImage().tobytes() == picture.crop(0, 0, w, height).getImage().tobytes()
+    finally:
+        Picture.FLIP_BAND_BYTES = bandBytes
+
+def test_rotate_transpose():
+    picture = openPicture('', 'nico_small.jpg')
+    w, h = getWidth(picture), getHeight(picture)
+    turned = rotate(picture, 90)
+    assert (getWidth(turned), getHeight(turned)) == (h, w)
+    assert getColor(getPixel(turned, 4, w - 1 - 9)) == getColor(getPixel(picture, 9, 4))
+    swapped = transpose(picture)
+    assert getColor(getPixel(swapped, 4, 9)) == getColor(getPixel(picture, 9, 4))
+    assert rotate(rotate(picture, 180), -180).getImage().tobytes() == picture.getImage().tobytes()
+    tilted = rotate(picture, 30, expand=False, acolor=white)
+    assert (getWidth(tilted), getHeight(tilted)) == (w, h)
+    assert getColor(getPixel(tilted, 0, 0)) == white
+    shifted = affineTransform(picture, [1, 0, 5, 0, 1, 0], acolor=red)
+    assert getColor(getPixel(shifted, 0, 0)) == getColor(getPixel(picture, 5, 0))
+    assert getColor(getPixel(shifted, w - 1, 0)) == red
+
+def test_scale_resample():
+    picture = openPicture()
+    w, h = getWidth(picture), getHeight(picture)
+    for mode in ['nearest', 'box', 'bilinear', 'bicubic', 'lanczos']:
+        small = picture.scale(0.1, 0.2, mode)
+        assert (getWidth(small), getHeight(small)) == (int(w * 0.1), int(h * 0.2))
+    assert getWidth(picture.getPictureWithWidth(50, 'box')) == 50
+    assert getHeight(picture.getPictureWithHeight(30)) == 30
+    # the reduce-then-filter path stays close to filtering the full image
+    fast = np.array(picture.scale(0.125, 0.125, 'lanczos').getImage(), dtype=float)
+    exact = np.array(picture.getImage().resize(fast.shape[1::-1], PIL.Image.LANCZOS), dtype=float)
+    assert np.abs(fast - exact).mean() < 2
+
+def test_scaled_pyramid():
+    picture = openPicture('', 'city.jpg')
+    w, h = getWidth(picture), getHeight(picture)
+    first = picture.getScaledImage(w // 20, h // 20)
+    pyramid = picture._cache['pyramid'][1]
+    assert len(pyramid) > 2 and pyramid[1].size == (w // 2, h // 2)
+    # later requests reuse the levels already built
+    assert picture.getScaledImage(w // 20, h // 20).tobytes() == first.tobytes()
+    assert picture._cache['pyramid'][1] is pyramid
+    assert getWidth(picture.getPictureWithWidth(w // 10)) == w // 10
+    # changing the picture discards the pyramid
+    addRectFilled(picture, 0, 0, w, h, red)
+    assert picture.getScaledImage(10, 10).getpixel((5, 5)) == (255, 0, 0)
+
 def test_drawing():
     pic = openEmptyPicture()
     scribble(pic)
@@ -155,6 +407,198 @@ def test_write():
     assert not picture.write(badFileName)
     os.remove(goodFileName)
 
+def test_write_asynchronous():
+    picture = makeEmptyPicture(40, 30, black)
+    names = ['test_frame{}.png'.format(i) for i in range(6)]
+    for i, name in enumerate(names):
+        future = writePictureTo(picture, os.path.abspath(name), asynchronous=True, compressLevel=1)
+        # later changes do not affect files still being written
+        addRectFilled(picture, 0, 0, 40, 30, makeColor(i * 40, 0, 0))
+    flushWrites()
+    assert future.done()
+    for i, name in enumerate(names):
+        assert makePicture(os.path.abspath(name)).getPixel(5, 5).getRed() == max(0, (i - 1) * 40)
+        os.remove(name)
+    writePictureTo(picture, os.path.abspath('test_picture.jpg'), quality=20, optimize=True)
+    os.remove('test_picture.jpg')
+    badFileName = os.path.join('nonexistantpath', 'test_picture.png')
+    writePictureTo(picture, os.path.abspath(badFileName), asynchronous=True)
+    try:
+        flushWrites()
+        assert False
+    except OSError:
+        pass
+    flushWrites()
+    # cancelled writes give back their slots
+    import threading
+    from jes4py import Writer
+    gate = threading.Event()
+    busy = [Writer.submit(gate.wait) for i in range(Writer.MAX_WORKERS)]
+    for i in range(Writer.MAX_PENDING + 1):
+        assert Writer.submit(time.sleep, 0).cancel()
+    gate.set()
+    flushWrites()
+    assert Writer.submit(time.sleep, 0).result(timeout=5) is None
+
+def test_loadPictures():
+    setMediaPath('')
+    names = ['map.png', 'city.jpg', 'nico_small.jpg']
+    pictures = loadPictures(names, workers=2)
+    for name, picture in zip(names, pictures):
+        assert picture.getImage().tobytes() == makePicture(name).getImage().tobytes()
+    assert len(loadPictures('*.jpg', maxWidth=50)) == len(glob.glob(getMediaPath('*.jpg')))
+    streamed = dict(loadPictures(names, stream=True))
+    assert sorted(streamed) == sorted(getMediaPath(name) for name in names)
+    assert streamed[getMediaPath('city.jpg')].getWidth() == pictures[1].getWidth()
+    thumbs = loadPictures(names[:2], processes=True, maxHeight=40)
+    assert [thumb.getHeight() for thumb in thumbs] == [40, 40]
+    try:
+        loadPictures(['map.png', 'noSuchFile.png'])
+        assert False
+    except ValueError:
+        pass
+
+def test_write_raw():
+    picture = openPicture('', 'nico_small.jpg')
+    for level in [None, 1]:
+        writePictureTo(picture, os.path.abspath('test_picture.jpic'), compressLevel=level)
+        loaded = makePicture(os.path.abspath('test_picture.jpic'))
+        assert loaded.getImage().mode == 'RGB'
+        assert loaded.getImage().tobytes() == picture.getImage().tobytes()
+    thumb = makePicture(os.path.abspath('test_picture.jpic'), maxWidth=20)
+    assert thumb.getWidth() == 20
+    with open('test_picture.jpic', 'r+b') as file:
+        file.truncate(100)
+    assert not Picture().load(os.path.abspath('test_picture.jpic'))
+    os.remove('test_picture.jpic')
+    rgba = Picture(PIL.Image.new('RGBA', (5, 4), (1, 2, 3, 4)))
+    rgba.write('test_picture.jpic')
+    assert Picture('test_picture.jpic').getImage().getpixel((4, 3)) == (1, 2, 3, 4)
+    os.remove('test_picture.jpic')
+
+def test_bytes():
+    picture = openPicture('', 'nico_small.jpg')
+    for format in ['png', 'bmp', 'jpic']:
+        data = picture.toBytes(format)
+        assert Picture.fromBytes(data).getImage().tobytes() == picture.getImage().tobytes()
+    with open('nico_small.jpg', 'rb') as file:
+        upload = file.read()
+    assert makePicture(upload).getImage().tobytes() == picture.getImage().tobytes()
+    assert picture.toBytes('jpeg', quality=10)[:2] == b'\xff\xd8'
+    levels = np.arange(4 * 3 * 3, dtype=np.uint8)
+    small = Picture.fromBuffer(4, 3, levels)
+    assert small.getPixel(1, 2).getColor() == makeColor(27, 28, 29)
+    levels[0] = 99
+    assert small.getPixel(0, 0).getRed() == 0
+    try:
+        Picture.fromBuffer(4, 4, levels)
+        assert False
+    except ValueError:
+        pass
+
+def test_array_interface():
+    picture = openPicture('', 'nico_small.jpg')
+    levels = np.asarray(picture)
+    assert levels.shape == (getHeight(picture), getWidth(picture), 3)
+    assert not levels.flags.writeable
+    assert np.asarray(picture) is levels
+    assert (levels == np.array(picture.getImage())).all()
+    setColor(getPixel(picture, 0, 0), red)
+    assert tuple(np.asarray(picture)[0, 0]) == (255, 0, 0)
+    copy = np.array(picture)
+    copy[0, 0] = 0
+    assert getColor(getPixel(picture, 0, 0)) == red
+    assert memoryview(picture.__buffer__(0)).shape == levels.shape
+
+def test_pickle_out_of_band():
+    picture = openPicture('', 'nico_small.jpg')
+    picture.setTitle('nico')
+    for protocol in [4, 5]:
+        copy = pickle.loads(pickle.dumps(picture, protocol=protocol))
+        assert copy.getImage().tobytes() == picture.getImage().tobytes()
+        assert copy.getTitle() == 'nico'
+    buffers = []
+    data = pickle.dumps(picture, protocol=5, buffer_callback=buffers.append)
+    assert len(data) < 1000
+    assert sum(buffer.raw().nbytes for buffer in buffers) == getWidth(picture) * getHeight(picture) * 3
+    copy = pickle.loads(data, buffers=[bytes(buffer) for buffer in buffers])
+    assert copy.getImage().tobytes() == picture.getImage().tobytes()
+    setColor(getPixel(copy, 0, 0), red)
+    assert getColor(getPixel(picture, 0, 0)) != red
+
+def test_view():
+    picture = openPicture('', 'nico_small.jpg')
+    original = picture.getImage().copy()
+    box = makeView(picture, 10, 20, 30, 15)
+    assert getWidth(box) == 30 and getHeight(box) == 15
+    assert getColor(getPixel(box, 2, 3)) == getColor(getPixel(picture, 12, 23))
+    # pixel writes go to the parent
+    setColor(getPixel(box, 0, 0), red)
+    assert getColor(getPixel(picture, 10, 20)) == red
+    for pixel in getPixels(box):
+        setGreen(pixel, 0)
+    assert getGreen(getPixel(picture, 39, 34)) == 0
+    assert getGreen(getPixel(picture, 40, 34)) == original.getpixel((40, 34))[1]
+    # drawing is clipped to the view
+    addRectFilled(box, -5, -5, 100, 100, blue)
+    assert getColor(getPixel(picture, 25, 30)) == blue
+    assert picture.getImage().getpixel((9, 20)) == original.getpixel((9, 20))
+    # filters and in-place transforms write through
+    picture = openPicture('', 'nico_small.jpg')
+    box = picture.view(10, 20, 30, 15)
+    expected = gaussianBlur(picture.crop(10, 20, 30, 15), 1.5)
+    gaussianBlur(box, 1.5, inPlace=True)
+    assert picture.crop(10, 20, 30, 15).getImage().tobytes() == expected.getImage().tobytes()
+    mirrored = box.mirrorHorizontal()
+    box.mirrorHorizontal(inPlace=True)
+    assert picture.crop(10, 20, 30, 15).getImage().tobytes() == mirrored.getImage().tobytes()
+    # changes to the parent are seen through the view, including cached values
+    before = regionMean(box, 0, 0, 30, 15)
+    addRectFilled(picture, 0, 0, 80, 80, white)
+    assert getColor(getPixel(box, 5, 5)) == white
+    assert regionMean(box, 0, 0, 30, 15) != before
+    copy = duplicatePicture(box)
+    setColor(getPixel(copy, 0, 0), black)
+    assert getColor(getPixel(picture, 10, 20)) == white
+    assert pickle.loads(pickle.dumps(box)).getImage().tobytes() == box.getImage().tobytes()
+    try:
+        makeView(picture, 100, 70, 30, 15)
+        assert False
+    except ValueError:
+        pass
+
+def test_pixelColors():
+    picture = openPicture('', 'nico_small.jpg')
+    coords = [(0, 0), (17, 5), (getWidth(picture) - 1, getHeight(picture) - 1), (17, 5)]
+    colors = getPixelColors(picture, coords)
+    assert colors.shape == (4, 3)
+    for (x, y), levels in zip(coords, colors):
+        assert makeColor(*levels) == getColor(getPixel(picture, x, y))
+    setPixelColors(picture, coords[:3], [red, (300, -5, 2.5), makeColor(1, 2, 3)])
+    assert getColor(getPixel(picture, 0, 0)) == red
+    assert getColor(getPixel(picture, 17, 5)) == makeColor(255, 0, 2)
+    setPixelColors(picture, np.array([[3, 4], [5, 6]]), blue)
+    assert (getPixelColors(picture, [[3, 4], [5, 6]]) == [0, 0, 255]).all()
+    # views and tiled pictures write through to the right pixels
+    box = picture.view(10, 10, 20, 20)
+    setPixelColors(box, [(0, 0), (19, 19)], green)
+    assert getColor(getPixel(picture, 29, 29)) == green
+    tiled = TiledPicture(300, 200, white, tileSize=64)
+    setPixelColors(tiled, [(5, 5), (250, 150)], [red, blue])
+    assert getColor(getPixel(tiled, 250, 150)) == blue
+    assert (getPixelColors(tiled, [(5, 5), (6, 6)]) == [[255, 0, 0], [255, 255, 255]]).all()
+    # pixelsToPicture rebuilds a picture from pixels in one pass
+    pixels = [getPixel(picture, x, y) for x, y in coords]
+    rebuilt = makePicture(pixels)
+    assert getWidth(rebuilt) == getWidth(picture) and getHeight(rebuilt) == getHeight(picture)
+    assert getColor(getPixel(rebuilt, 17, 5)) == getColor(getPixel(picture, 17, 5))
+    assert getColor(getPixel(rebuilt, 1, 1)) == white
+    try:
+        getPixelColors(picture, [(0, getHeight(picture))])
+        assert False
+    except ValueError:
+        pass
+
 # Can be run as script to create or recreate refimage.jpg if needed
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "makeref":
@@ -3,6 +3,8 @@ from random import randint
 import simpleaudio as sa
 import wave
 import os
+import pickle
+import numpy as np
 from jes4py.Sound import Sound
 
 # Supporting functions
@@ -115,6 +117,115 @@ def test_write():
     assert s.getBuffer().__eq__(s2.getBuffer())
     os.remove(fi)
 
+def test_write_asynchronous():
+    sound = makeSound("myFirstSound.wav")
+    expected = bytes(sound.getBuffer())
+    fi = os.path.abspath("testFileAsync.wav")
+    writeSoundTo(sound, fi, asynchronous=True)
+    sound.setSampleValueAt(0, 1234)
+    flushWrites()
+    s = Sound(5)
+    s.loadFromFile(fi)
+    assert bytes(s.getBuffer()) == expected
+    os.remove(fi)
+
+def test_loadSounds():
+    setMediaPath('')
+    sounds = loadSounds(['myFirstSound.wav', 'myFirstSound.wav'], workers=2)
+    assert len(sounds) == 2
+    assert sounds[0] is not sounds[1]
+    assert sounds[1].getBuffer() == makeSound('myFirstSound.wav').getBuffer()
+    for name, sound in loadSounds('*.wav', stream=True):
+        assert name.endswith('.wav') and isinstance(sound, Sound)
+
+def test_write_raw():
+    sound = makeSound("myFirstSound.wav")
+    for level in [None, 1]:
+        writeSoundTo(sound, os.path.abspath("testFile.jsnd"), compressLevel=level)
+        s = makeSound(os.path.abspath("testFile.jsnd"))
+        assert s.getBuffer() == sound.getBuffer()
+        assert s.getSamplingRate() == sound.getSamplingRate()
+        assert s.getLengthInFrames() == sound.getLengthInFrames()
+        assert s.isStereo() == sound.isStereo()
+    os.remove("testFile.jsnd")
+
+def test_bytes():
+    sound = makeSound("myFirstSound.wav")
+    for format in ["wav", "jsnd"]:
+        s = Sound.fromBytes(sound.toBytes(format))
+        assert s.getBuffer() == sound.getBuffer()
+        assert s.getSamplingRate() == sound.getSamplingRate()
+        assert s.getLengthInFrames() == sound.getLengthInFrames()
+    with open("myFirstSound.wav", "rb") as file:
+        assert makeSound(file.read()).getBuffer() == sound.getBuffer()
+    s = Sound.fromBuffer(bytes([1, 0, 255, 255, 0, 1]), 8000)
+    assert s.getLengthInFrames() == 3
+    assert s.getSamplingRate() == 8000
+    assert [s.getSampleValueAt(i) for i in range(3)] == [1, -1, 256]
+
+def test_array_interface():
+    sound = makeSound("myFirstSound.wav")
+    samples = np.asarray(sound)
+    assert samples.shape == (sound.getLengthInFrames(), 2)
+    assert samples.dtype == np.int16
+    assert samples[100, 0] == sound.getLeftSample(100)
+    samples[100, 1] = -1234
+    assert sound.getRightSample(100) == -1234
+    sound.setBuffer(bytearray(len(sound.getBuffer())))
+    assert samples[100, 1] == 0
+    mono = Sound(10)
+    view = mono.__buffer__(0)
+    assert view.format == "h" and view.shape == (10,)
+    view[3] = 77
+    assert mono.getSampleValueAt(3) == 77
+
+def test_pickle_out_of_band():
+    sound = makeSound("myFirstSound.wav")
+    for protocol in [4, 5]:
+        copy = pickle.loads(pickle.dumps(sound, protocol=protocol))
+        assert copy.getBuffer() == sound.getBuffer()
+        assert copy.getSamplingRate() == sound.getSamplingRate()
+    buffers = []
+    data = pickle.dumps(sound, protocol=5, buffer_callback=buffers.append)
+    assert len(data) < 1000
+    copy = pickle.loads(data, buffers=buffers)
+    assert isinstance(copy.getBuffer(), bytearray)
+    copy.setSampleValueAt(0, 1234)
+    assert copy.getSampleValueAt(0) == 1234
+    assert sound.getSampleValueAt(0) != 1234
+
+def test_view():
+    sound = makeSound("myFirstSound.wav")
+    word = makeSoundView(sound, 1000, 3000)
+    assert getLength(word) == 2000
+    assert word.getSamplingRate() == sound.getSamplingRate()
+    assert word.isStereo() == sound.isStereo()
+    assert word.getLeftSample(5) == sound.getLeftSample(1005)
+    # changes go both ways
+    word.setSampleValueAt(0, 4321)
+    assert sound.getSampleValueAt(1000) == 4321
+    sound.setRightSample(2999, -77)
+    assert word.getRightSample(1999) == -77
+    for sample in getSamples(word):
+        setSampleValue(sample, 0)
+    assert sound.getSampleValueAt(2999) == 0
+    assert sound.getSampleValueAt(3000) != 0 or sound.getSampleValueAt(3001) != 0
+    # views of views, copies, bytes and pickles
+    inner = word.view(10, 20)
+    inner.setSampleValueAt(0, 99)
+    assert sound.getSampleValueAt(1010) == 99
+    copy = Sound(word)
+    copy.setSampleValueAt(0, 1)
+    assert sound.getSampleValueAt(1000) == 0
+    assert Sound.fromBytes(word.toBytes()).getBuffer() == bytearray(word.getBuffer())
+    assert pickle.loads(pickle.dumps(word)).getBuffer() == bytearray(word.getBuffer())
+    assert np.asarray(word).shape == (2000, 2)
+    try:
+        makeSoundView(sound, 10, sound.getLength() + 1)
+        assert False
+    except ValueError:
+        pass
+
 def test_getLeng_getNumSamp_getLenInFrames():
     sound = Sound(1000)
     leng  = sound.getLength()
@@ -124,6 +235,40 @@ def test_getLeng_getNumSamp_getLenInFrames():
     assert numSamples == 1000
     assert lenInFrames == 1000
 
+def test_sampleValues():
+    sound = makeSound("myFirstSound.wav")
+    values = getSampleValues(sound, 100, 200, 3)
+    assert list(values) == [getSampleValueAt(sound, i) for i in range(100, 200, 3)]
+    assert len(getSampleValues(sound)) == getLength(sound)
+    setSampleValues(sound, 10, [1, -2.7, 40000, -40000])
+    assert [getSampleValueAt(sound, i) for i in range(10, 14)] == [1, -2, 32767, -32768]
+    # only the left sample of a stereo sound changes
+    if sound.isStereo():
+        right = sound.getRightSample(10)
+        setSampleValues(sound, 10, np.array([5]))
+        assert sound.getRightSample(10) == right
+    # gather and scatter at arbitrary frames
+    sound.setSampleValues([500, 20], [7, 8])
+    assert list(sound.getSampleValues([20, 500])) == [8, 7]
+    # samplesToSound places each sample by its index
+    samples = [getSampleObjectAt(sound, i) for i in [3, 20, 11]]
+    rebuilt = makeSound(samples)
+    assert getLength(rebuilt) == 21
+    assert getSampleValueAt(rebuilt, 20) == 8 and getSampleValueAt(rebuilt, 11) == -2
+    assert getIndex(sound.getSample(42)) == 42
+    # a single value fills every frame from start to the end
+    length = getLength(sound)
+    setSampleValues(sound, length - 50, -3.5)
+    assert getSampleValueAt(sound, length - 51) != -3
+    assert list(getSampleValues(sound, length - 50)) == [-3] * 50
+    sound.setSampleValues([0, 2], 9)
+    assert list(sound.getSampleValues(0, 3)) == [9, getSampleValueAt(sound, 1), 9]
+    try:
+        setSampleValues(sound, getLength(sound) - 1, [1, 2])
+        assert False
+    except ValueError:
+        pass
+
 # Can be run as script to create or recreate refimage.jpg if needed
 # if __name__ == "__main__":
 #     if len(sys.argv) > 1 and sys.argv[1] == "makeref":
@@ -0,0 +1,74 @@
+from jes4py import *
+from jes4py.TiledPicture import TiledPicture
+import os
+import pickle
+
+# Supporting functions
+def openTiledPicture(width=70, height=50, color=white):
+    # small tiles and a small tile budget exercise paging in and out
+    return TiledPicture(width, height, color, tileSize=16, cacheBytes=16*16*3*6)
+
+# Testing functions
+
+def test_makeTiledPicture():
+    picture = makeTiledPicture(200, 100, green)
+    assert isinstance(picture, Picture)
+    assert picture.getWidth() == 200
+    assert picture.getHeight() == 100
+    assert getColor(getPixel(picture, 199, 99)) == green
+
+def test_getPixel_setColor():
+    picture = openTiledPicture()
+    for y in range(picture.getHeight()):
+        for x in range(picture.getWidth()):
+            setColor(getPixel(picture, x, y), makeColor(x, y, x + y))
+    # row-major loops load each tile once
+    assert picture._tileLoads == picture.tilesAcross * picture.tilesDown
+    assert len(picture._tiles) <= picture._maxTiles
+    for y in range(picture.getHeight()):
+        for x in range(picture.getWidth()):
+            assert getColor(getPixel(picture, x, y)) == makeColor(x, y, x + y)
+
+def test_crop_copyInto():
+    picture = openTiledPicture()
+    small = makeEmptyPicture(20, 20, red)
+    small.copyInto(picture, 10, 10)
+    cropped = picture.crop(5, 5, 30, 30)
+    assert not isinstance(cropped, TiledPicture)
+    assert getColor(getPixel(cropped, 4, 4)) == white
+    assert getColor(getPixel(cropped, 5, 5)) == red
+    assert getColor(getPixel(cropped, 24, 24)) == red
+    assert getColor(getPixel(cropped, 25, 25)) == white
+    dest = makeEmptyPicture(100, 100, blue)
+    picture.copyInto(dest, 40, 60)
+    assert getColor(getPixel(dest, 39, 60)) == blue
+    assert getColor(getPixel(dest, 40, 60)) == white
+    assert getColor(getPixel(dest, 55, 75)) == red
+    assert getColor(getPixel(dest, 99, 99)) == white
+
+def test_write():
+    fileName = 'test_tiled.png'
+    picture = openTiledPicture()
+    setColor(getPixel(picture, 69, 49), magenta)
+    assert picture.write(fileName)
+    loaded = makePicture(os.path.abspath(fileName))
+    assert loaded.getWidth() == 70 and loaded.getHeight() == 50
+    assert getColor(getPixel(loaded, 69, 49)) == magenta
+    assert getColor(getPixel(loaded, 0, 0)) == white
+    os.remove(fileName)
+
+def test_pickle():
+    picture = openTiledPicture()
+    picture.setTitle('tiles')
+    for x in range(70):
+        setColor(getPixel(picture, x, x % 50), makeColor(x, 2 * x, 3 * x))
+    for protocol in [4, 5]:
+        buffers = []
+        data = pickle.dumps(picture, protocol, buffer_callback=buffers.append if protocol == 5 else None)
+        copy = pickle.loads(data, buffers=buffers)
+        assert isinstance(copy, TiledPicture)
+        assert copy.getTitle() == 'tiles' and copy.tileSize == 16
+        assert copy.getImage().tobytes() == picture.getImage().tobytes()
+        # the copy has its own tile file
+        setColor(getPixel(copy, 0, 0), red)
+        assert getColor(getPixel(picture, 0, 0)) != red
@@ -0,0 +1,432 @@
+"""
+ColorTools.py - whole-picture color operations (distances, palettes, contrast)
+
+These do in one pass over a NumPy array what Media Computation exercises
+usually do by calling distance() or colorDistance() once per pixel.
+Distances are Euclidean distances between (red, green, blue) levels,
+exactly as computed by Color.distance().
+"""
+
+import math
+import numpy as np
+import PIL.Image, PIL.ImageFilter
+from jes4py.PixelColor import Pixel, Color
+
+# Largest possible distance between two colors (black to white)
+MAX_DISTANCE = math.sqrt(3 * 255 * 255)
+
+def _distances(levels, other):
+    """Return the distances between corresponding colors of two arrays
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        uint8 array of shape (height, width, 3)
+    other : numpy.ndarray
+        array of levels that broadcasts against levels
+
+    Returns
+    -------
+    numpy.ndarray
+        float array of shape (height, width)
+    """
+    difference = levels.astype(np.int32) - other
+    return np.sqrt(np.einsum('ijk,ijk->ij', difference, difference))
+
+def _overlap(*arrays):
+    """Crop arrays of levels to the size they have in common
+
+    Parameters
+    ----------
+    arrays : numpy.ndarray
+        arrays of shape (height, width, 3) aligned at their upper-left
+        corners
+
+    Returns
+    -------
+    list of numpy.ndarray
+        views of the arrays covering the common area
+    """
+    height = min(array.shape[0] for array in arrays)
+    width = min(array.shape[1] for array in arrays)
+    return [array[:height, :width] for array in arrays]
+
+def colorDistanceMap(picture, color, asPicture=False):
+    """Return the distance of every pixel of a picture from a color
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to examine
+    color : Color
+        the color to measure distances from
+    asPicture : bool
+        False to return the distances as an array, True to return a
+        grayscale picture that is black where the distance is 0 and white
+        where it is the largest possible distance
+
+    Returns
+    -------
+    numpy.ndarray or Picture
+        float array of shape (height, width), or a grayscale Picture
+    """
+    distances = _distances(picture._getArray(), np.array(color.getRGB()))
+    if not asPicture:
+        return distances
+    gray = np.rint(distances * (255 / MAX_DISTANCE)).astype(np.uint8)
+    return picture._applyArray(np.repeat(gray[:, :, np.newaxis], 3, axis=2),
+                               False)
+
+def chromaKey(foreground, background, keyColor, threshold, inPlace=False):
+    """Replace the pixels of a picture that are close to a key color
+
+    Every pixel of foreground whose distance from keyColor is less than
+    threshold is replaced by the pixel at the same place in background.
+    Only the area the two pictures have in common is changed.
+
+    Parameters
+    ----------
+    foreground : Picture
+        the picture shot in front of a backdrop of the key color
+    background : Picture
+        the picture to show through the backdrop
+    keyColor : Color
+        the color of the backdrop
+    threshold : float
+        pixels closer than this to keyColor are replaced
+    inPlace : bool
+        True to change foreground, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the combined picture
+    """
+    levels = foreground._getArray()
+    front, back = _overlap(levels, background._getArray())
+    mask = _distances(front, np.array(keyColor.getRGB())) < threshold
+    front[mask] = back[mask]
+    return foreground._applyArray(levels, inPlace)
+
+def replaceBackground(picture, oldBackground, newBackground, threshold,
+                      inPlace=False):
+    """Replace the background of a picture with a new one
+
+    Every pixel of picture whose distance from the pixel at the same place
+    in oldBackground (a shot of the scene without the subject) is less
+    than threshold is replaced by the pixel at the same place in
+    newBackground.  Only the area the three pictures have in common is
+    changed.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture of the subject in front of the old background
+    oldBackground : Picture
+        the picture of the old background alone
+    newBackground : Picture
+        the picture to use as the new background
+    threshold : float
+        pixels closer than this to the old background are replaced
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the picture with its background replaced
+    """
+    levels = picture._getArray()
+    front, old, new = _overlap(levels, oldBackground._getArray(),
+                               newBackground._getArray())
+    mask = _distances(front, old) < threshold
+    front[mask] = new[mask]
+    return picture._applyArray(levels, inPlace)
+
+def equalizeHistogram(picture, inPlace=False):
+    """Spread the levels of each channel evenly over [0..255]
+
+    Each channel is remapped through its cumulative histogram, which
+    raises the contrast of pictures whose levels are bunched together.
+    The picture's cached histograms are used, so only one pass over the
+    pixels is needed to apply the mapping.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to equalize
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the equalized picture
+    """
+    histograms = picture._getHistograms()
+    tables = []
+    for channel in ("red", "green", "blue"):
+        cumulative = np.cumsum(histograms[channel])
+        total = cumulative[-1]
+        lowest = cumulative[np.flatnonzero(histograms[channel])[0]] if total else 0
+        if total == lowest:
+            tables.append(np.arange(256))
+        else:
+            scaled = (cumulative - lowest) * 255.0 / (total - lowest)
+            tables.append(np.clip(np.rint(scaled), 0, 255))
+    return _applyTables(picture, np.array(tables, dtype=np.uint8), inPlace)
+
+def _paletteArray(palette):
+    """Return the levels of a list of colors as an array
+
+    Parameters
+    ----------
+    palette : list of Color
+        the colors
+
+    Returns
+    -------
+    numpy.ndarray
+        int32 array of shape (len(palette), 3)
+    """
+    return np.array([color.getRGB() for color in palette], dtype=np.int32)
+
+def _nearestIndices(colors, palette):
+    """Return the index of the nearest palette entry for each color
+
+    Ties go to the earliest palette entry, as in a loop over the palette
+    that only switches to strictly closer colors.
+
+    Parameters
+    ----------
+    colors : numpy.ndarray
+        array of shape (n, 3) of levels
+    palette : numpy.ndarray
+        int32 array of shape (m, 3) of levels
+
+    Returns
+    -------
+    numpy.ndarray
+        array of n indices into palette
+    """
+    # |c - p|^2 = |c|^2 - 2 c.p + |p|^2, and |c|^2 is the same for every
+    # entry; all terms are integers small enough to be exact in floats
+    palette = palette.astype(np.float64)
+    offsets = (palette * palette).sum(axis=1)
+    indices = np.empty(len(colors), dtype=np.intp)
+    step = max(1, (1 << 22) // len(palette))
+    for start in range(0, len(colors), step):
+        block = colors[start:start + step].astype(np.float64)
+        squares = offsets - 2 * block @ palette.T
+        indices[start:start + step] = np.argmin(squares, axis=1)
+    return indices
+
+def _distinctColors(levels):
+    """Return the distinct colors in an array of levels
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        uint8 array of shape (height, width, 3)
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        int32 array of shape (n, 3) of the distinct colors, and an array
+        giving for every pixel (row by row) the index of its color
+    """
+    packed = ((levels[:, :, 0].astype(np.int32) << 16)
+              | (levels[:, :, 1].astype(np.int32) << 8) | levels[:, :, 2])
+    distinct, inverse = np.unique(packed.ravel(), return_inverse=True)
+    colors = np.stack([distinct >> 16, (distinct >> 8) & 255, distinct & 255],
+                      axis=1)
+    return colors, inverse
+
+def _applyTables(picture, tables, inPlace):
+    """Map each channel of a picture through a table of 256 levels
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to change
+    tables : numpy.ndarray
+        uint8 array of shape (3, 256); tables[c][v] replaces level v of
+        channel c
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the changed picture
+    """
+    levels = picture._getArray()
+    for c in range(3):
+        levels[:, :, c] = tables[c][levels[:, :, c]]
+    return picture._applyArray(levels, inPlace)
+
+def nearestColorMap(picture, palette):
+    """Return the index of the palette color nearest to each pixel
+
+    Each distinct color in the picture is matched against the palette
+    once, and the answers are spread to the pixels by a table lookup, so
+    pictures with many pixels of few colors are matched quickly.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to examine
+    palette : list of Color
+        the colors to choose from
+
+    Returns
+    -------
+    numpy.ndarray
+        int array of shape (height, width) of indices into palette
+    """
+    colors, inverse = _distinctColors(picture._getArray())
+    nearest = _nearestIndices(colors, _paletteArray(palette))
+    return nearest[inverse].reshape(picture.getHeight(), picture.getWidth())
+
+def quantize(picture, palette, dither=False, inPlace=False):
+    """Replace every pixel by the nearest color in a palette
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to change
+    palette : list of Color
+        the colors to use (at most 256)
+    dither : bool
+        False to use the nearest color for each pixel, True to spread
+        the error of each choice over the neighboring pixels
+        (Floyd-Steinberg dithering), which hides banding
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the quantized picture
+    """
+    if not dither:
+        levels = _paletteArray(palette)[nearestColorMap(picture, palette)]
+        return picture._applyArray(levels.astype(np.uint8), inPlace)
+    entries = [level for color in palette for level in color.getRGB()]
+    paletteImage = PIL.Image.new("P", (1, 1))
+    paletteImage.putpalette(entries + entries[:3] * (256 - len(palette)))
+    image = picture._getRegion(0, 0, picture.getWidth(), picture.getHeight())
+    image = image.convert("RGB").quantize(palette=paletteImage,
+                                          dither=PIL.Image.Dither.FLOYDSTEINBERG)
+    return picture._applyArray(np.array(image.convert("RGB")), inPlace)
+
+def makePalette(picture, numColors, method='mediancut', iterations=10):
+    """Choose a palette of colors that represents a picture well
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to choose colors for
+    numColors : int
+        the number of colors to choose (at most 256)
+    method : str
+        'mediancut' to split the colors into boxes holding equal numbers
+        of pixels, or 'kmeans' to refine those colors by k-means
+        clustering of the picture's distinct colors
+    iterations : int
+        the number of k-means refinement steps
+
+    Returns
+    -------
+    list of Color
+        the chosen colors
+    """
+    image = picture._getRegion(0, 0, picture.getWidth(), picture.getHeight())
+    reduced = image.convert("RGB").quantize(numColors,
+                                            PIL.Image.Quantize.MEDIANCUT)
+    used = sorted(index for count, index in reduced.getcolors(256))
+    entries = np.array(reduced.getpalette(), dtype=np.float64).reshape(-1, 3)
+    centers = entries[used]
+    if method == 'kmeans':
+        levels = picture._getArray().reshape(-1, 3)
+        colors, counts = np.unique(levels, axis=0, return_counts=True)
+        for i in range(iterations):
+            nearest = _nearestIndices(colors, np.rint(centers).astype(np.int32))
+            weights = np.bincount(nearest, weights=counts, minlength=len(centers))
+            for c in range(3):
+                sums = np.bincount(nearest, weights=counts * colors[:, c],
+                                   minlength=len(centers))
+                occupied = weights > 0
+                centers[occupied, c] = sums[occupied] / weights[occupied]
+    return [Color(*(int(level) for level in center))
+            for center in np.rint(centers)]
+
+def _levelsOf(color):
+    """Return the levels of a color returned by a color function
+
+    Parameters
+    ----------
+    color : Color or sequence of numbers
+        the color; levels outside [0..255] are corrected like Pixel levels
+
+    Returns
+    -------
+    tuple of int
+        the (red, green, blue) levels
+    """
+    if isinstance(color, Color):
+        return color.getRGB()
+    return tuple(Pixel.correctLevel(level) for level in color)
+
+def applyColorFunction(picture, func, mode='channel', lutSize=33,
+                       inPlace=False):
+    """Replace the color of every pixel by a function of that color
+
+    The function is called far fewer times than there are pixels; its
+    results are gathered in a lookup table that is applied to the whole
+    picture at once.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to change
+    func : function
+        function taking a Color and returning a Color (or a tuple of
+        red, green and blue levels)
+    mode : str
+        'channel' if each new level depends only on the old level of
+        the same channel (e.g. Color.makeDarker); func is called with
+        the 256 grays and the result is exact.
+        '3d' for any function; func is called at the points of a
+        lutSize x lutSize x lutSize grid and colors between grid points
+        are interpolated (trilinearly), so results are approximate.
+        'exact' for any function; func is called once for each distinct
+        color in the picture.
+    lutSize : int
+        the number of grid points along each axis in '3d' mode (2 to 65)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the changed picture
+    """
+    if mode == 'channel':
+        results = [_levelsOf(func(Color(v, v, v))) for v in range(256)]
+        tables = np.array(results, dtype=np.uint8).T
+        return _applyTables(picture, tables, inPlace)
+    if mode == '3d':
+        def sample(r, g, b):
+            color = Color(round(r * 255), round(g * 255), round(b * 255))
+            return tuple(level / 255.0 for level in _levelsOf(func(color)))
+        lut = PIL.ImageFilter.Color3DLUT.generate(lutSize, sample)
+        image = picture._getRegion(0, 0, picture.getWidth(), picture.getHeight())
+        image = image.convert("RGB").filter(lut)
+        return picture._applyArray(np.array(image), inPlace)
+    colors, inverse = _distinctColors(picture._getArray())
+    results = [_levelsOf(func(Color(*(int(level) for level in color))))
+               for color in colors]
+    levels = np.array(results, dtype=np.uint8)[inverse]
+    levels = levels.reshape(picture.getHeight(), picture.getWidth(), 3)
+    return picture._applyArray(levels, inPlace)
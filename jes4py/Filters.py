@@ -0,0 +1,583 @@
+"""
+Filters.py - neighborhood filters (blur, sharpen, edges, median) for pictures
+
+The filters work on NumPy arrays holding the levels of the whole picture
+rather than on one Pixel at a time.  Kernels that are the product of a
+column and a row (e.g. Gaussian and box kernels) are applied as two
+one-dimensional passes, so a k by k kernel costs 2k rather than k*k
+operations per pixel.  Box blurs and pixelation read window sums from a
+summed-area table and cost the same for any window size, as do median, rank and morphology
+filters, which slide window histograms across the picture.
+
+Pixels near the border of the picture need levels from outside it; the
+border argument chooses how those are made up:
+
+    'clamp'    repeat the edge pixels           aaaa|abcd|dddd
+    'wrap'     wrap around to the other side    abcd|abcd|abcd
+    'reflect'  mirror the picture at the edge   dcba|abcd|dcba
+"""
+
+import math
+import numpy as np
+
+# numpy.pad modes used for the border choices
+BORDERS = {'clamp': 'edge', 'wrap': 'wrap', 'reflect': 'symmetric'}
+
+# Weights used to compute the luminance of a pixel
+LUMINANCE = np.array([0.299, 0.587, 0.114])
+
+def _padMode(border):
+    """Return the numpy.pad mode for a border choice
+
+    Parameters
+    ----------
+    border : str
+        'clamp', 'wrap' or 'reflect'
+
+    Returns
+    -------
+    str
+        the corresponding numpy.pad mode
+    """
+    try:
+        return BORDERS[border]
+    except KeyError:
+        raise ValueError("border must be one of " + ", ".join(BORDERS))
+
+def _levels(picture):
+    """Return the levels of a picture as a float array
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture
+
+    Returns
+    -------
+    numpy.ndarray
+        float array of shape (height, width, 3)
+    """
+    return picture._getArray().astype(np.float64)
+
+def _result(picture, levels, inPlace):
+    """Store filtered levels in the picture or in a new picture
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture that was filtered
+    levels : numpy.ndarray
+        the filtered levels, shape (height, width, 3); they are rounded
+        and clamped to [0..255]
+    inPlace : bool
+        True to change picture, False to make a new picture
+
+    Returns
+    -------
+    Picture
+        picture if inPlace is True, otherwise the new picture
+    """
+    levels = np.clip(np.rint(levels), 0, 255).astype(np.uint8)
+    return picture._applyArray(levels, inPlace)
+
+def _correlate1d(levels, weights, axis, border):
+    """Apply a one-dimensional kernel along the rows or columns of an array
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        float array of shape (height, width, channels)
+    weights : sequence of float
+        the kernel, with an odd number of weights centered on the pixel
+    axis : int
+        0 to run the kernel down the columns, 1 to run it along the rows
+    border : str
+        how levels outside the array are made up
+
+    Returns
+    -------
+    numpy.ndarray
+        the filtered levels
+    """
+    radius = len(weights) // 2
+    pad = [(0, 0)] * levels.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(levels, pad, mode=_padMode(border))
+    size = levels.shape[axis]
+    result = np.zeros(levels.shape)
+    for i, weight in enumerate(weights):
+        if weight != 0:
+            result += weight * padded.take(range(i, i + size), axis=axis)
+    return result
+
+def _correlate(levels, kernel, border):
+    """Apply a two-dimensional kernel to an array
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        float array of shape (height, width, channels)
+    kernel : numpy.ndarray
+        2-D kernel with an odd number of rows and columns
+    border : str
+        how levels outside the array are made up
+
+    Returns
+    -------
+    numpy.ndarray
+        the filtered levels
+    """
+    u, s, vt = np.linalg.svd(kernel)
+    if s[0] == 0 or s[1:].sum() <= 1e-12 * s[0]:
+        # the kernel is a column times a row; use two 1-D passes
+        column = u[:, 0] * math.sqrt(s[0])
+        row = vt[0] * math.sqrt(s[0])
+        return _correlate1d(_correlate1d(levels, column, 0, border),
+                            row, 1, border)
+    ry, rx = kernel.shape[0] // 2, kernel.shape[1] // 2
+    padded = np.pad(levels, [(ry, ry), (rx, rx), (0, 0)],
+                    mode=_padMode(border))
+    height, width = levels.shape[:2]
+    result = np.zeros(levels.shape)
+    for i in range(kernel.shape[0]):
+        for j in range(kernel.shape[1]):
+            if kernel[i, j] != 0:
+                result += kernel[i, j] * padded[i:i + height, j:j + width]
+    return result
+
+def _gaussianWeights(sigma):
+    """Return a normalized 1-D Gaussian kernel
+
+    Parameters
+    ----------
+    sigma : float
+        the standard deviation in pixels
+
+    Returns
+    -------
+    numpy.ndarray
+        weights covering three standard deviations on each side
+    """
+    radius = max(1, int(math.ceil(3 * sigma)))
+    x = np.arange(-radius, radius + 1)
+    weights = np.exp(-x * x / (2.0 * sigma * sigma))
+    return weights / weights.sum()
+
+def _gaussian(levels, sigma, border):
+    """Return Gaussian-blurred levels"""
+    weights = _gaussianWeights(sigma)
+    return _correlate1d(_correlate1d(levels, weights, 0, border),
+                        weights, 1, border)
+
+def convolve(picture, kernel, border='reflect', inPlace=False):
+    """Convolve a picture with a kernel
+
+    Each new level is the sum of the levels around the pixel weighted by
+    the kernel, which is flipped as usual for a convolution.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to filter
+    kernel : 2-D sequence of float
+        the weights; it must have an odd number of rows and columns
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the filtered picture
+    """
+    kernel = np.array(kernel, dtype=np.float64)[::-1, ::-1]
+    return _result(picture, _correlate(_levels(picture), kernel, border),
+                   inPlace)
+
+def gaussianBlur(picture, sigma=1.0, border='reflect', inPlace=False):
+    """Blur a picture with a Gaussian kernel
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to blur
+    sigma : float
+        the standard deviation of the kernel in pixels
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the blurred picture
+    """
+    return _result(picture, _gaussian(_levels(picture), sigma, border),
+                   inPlace)
+
+def _boxMeans(levels, radius, border):
+    """Return the average levels over a square around every pixel
+
+    The window sums are read from a summed-area table of the padded
+    levels, so the cost does not depend on the radius.
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        array of shape (height, width, channels)
+    radius : int
+        the square is 2*radius+1 pixels wide
+    border : str
+        how levels outside the array are made up
+
+    Returns
+    -------
+    numpy.ndarray
+        float array of the averages
+    """
+    height, width = levels.shape[:2]
+    size = 2 * radius + 1
+    padded = np.pad(levels, [(radius, radius), (radius, radius), (0, 0)],
+                    mode=_padMode(border))
+    table = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1,
+                      levels.shape[2]), dtype=np.int64)
+    np.cumsum(np.cumsum(padded, axis=0, dtype=np.int64), axis=1,
+              out=table[1:, 1:])
+    sums = (table[size:size + height, size:size + width]
+            - table[:height, size:size + width]
+            - table[size:size + height, :width] + table[:height, :width])
+    return sums / float(size * size)
+
+def boxBlur(picture, radius=1, border='reflect', inPlace=False):
+    """Replace each pixel by the average of a square around it
+
+    Any radius takes the same time (see _boxMeans).
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to blur
+    radius : int
+        the square is 2*radius+1 pixels wide
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the blurred picture
+    """
+    levels = _boxMeans(picture._getArray(), radius, border)
+    return _result(picture, levels, inPlace)
+
+def pixelate(picture, size, inPlace=False):
+    """Replace each size by size block of a picture by its average color
+
+    Block averages come from the picture's summed-area table, so the cost
+    does not depend on the block size.  Blocks at the right and bottom
+    edges may be smaller.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to pixelate
+    size : int
+        the width and height of the blocks
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the pixelated picture
+    """
+    table = picture._getIntegral()
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    ys = np.append(np.arange(0, height, size), height)
+    xs = np.append(np.arange(0, width, size), width)
+    corners = table[ys][:, xs]
+    sums = (corners[1:, 1:] - corners[:-1, 1:]
+            - corners[1:, :-1] + corners[:-1, :-1])
+    heights, widths = np.diff(ys), np.diff(xs)
+    means = sums / np.outer(heights, widths)[:, :, np.newaxis]
+    levels = np.repeat(np.repeat(means, heights, axis=0), widths, axis=1)
+    return _result(picture, levels, inPlace)
+
+def unsharpMask(picture, sigma=1.0, amount=1.0, border='reflect',
+                inPlace=False):
+    """Sharpen a picture by adding the difference from a blurred copy
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to sharpen
+    sigma : float
+        the standard deviation of the blur in pixels
+    amount : float
+        how much of the difference to add
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the sharpened picture
+    """
+    levels = _levels(picture)
+    blurred = _gaussian(levels, sigma, border)
+    return _result(picture, levels + amount * (levels - blurred), inPlace)
+
+def edgeDetect(picture, method='sobel', border='reflect', inPlace=False):
+    """Make a grayscale picture showing the edges in a picture
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to examine
+    method : str
+        'sobel' for the size of the luminance gradient or 'laplacian'
+        for the size of the Laplacian of the luminance
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        a picture that is bright at edges and dark elsewhere
+    """
+    luminance = _levels(picture) @ LUMINANCE
+    luminance = luminance[:, :, np.newaxis]
+    if method == 'sobel':
+        gx = _correlate1d(_correlate1d(luminance, [1, 2, 1], 0, border),
+                          [-1, 0, 1], 1, border)
+        gy = _correlate1d(_correlate1d(luminance, [-1, 0, 1], 0, border),
+                          [1, 2, 1], 1, border)
+        edges = np.hypot(gx, gy)
+    elif method == 'laplacian':
+        kernel = np.array([[0, 1, 0], [1, -4, 1], [0, 1, 0]], dtype=np.float64)
+        edges = np.abs(_correlate(luminance, kernel, border))
+    else:
+        raise ValueError("method must be 'sobel' or 'laplacian'")
+    return _result(picture, np.repeat(edges, 3, axis=2), inPlace)
+
+def _windowHistograms(entering, leaving, size):
+    """Return the change in the histograms of the vertical windows of a column
+
+    Parameters
+    ----------
+    entering : numpy.ndarray
+        uint8 array of shape (rows, channels) whose windows are counted
+    leaving : numpy.ndarray or None
+        array like entering whose windows are subtracted, or None
+    size : int
+        the number of rows in a window
+
+    Returns
+    -------
+    numpy.ndarray
+        int32 array of shape (rows - size + 1, channels, 256) whose entry
+        [y, c, v] counts the levels equal to v in rows y..y+size-1 of
+        entering minus those in the same rows of leaving
+    """
+    rows, channels = entering.shape
+    counts = np.zeros((rows + 1, channels, 256), dtype=np.int32)
+    index = np.arange(1, rows + 1)[:, np.newaxis], np.arange(channels)
+    counts[index + (entering,)] += 1
+    if leaving is not None:
+        counts[index + (leaving,)] -= 1
+    np.cumsum(counts, axis=0, out=counts)
+    return counts[size:] - counts[:-size]
+
+def _rankLevels(levels, radius, rank, border):
+    """Return the rank-th smallest level in a square around every pixel
+
+    The histogram of the window around each pixel of a column is kept
+    for all rows at once.  Moving one pixel to the right adds the levels
+    of the column entering the window and removes those of the column
+    leaving it.  For small windows this is done level by level (Huang's
+    algorithm); for large ones the histograms of whole column segments
+    are added and subtracted instead (the constant-time median algorithm
+    of Perreault and Hebert), so the cost does not grow with the radius.
+    The chosen level is found with a coarse histogram of 16 bins followed
+    by the 16 fine bins within the chosen coarse bin.
+
+    Parameters
+    ----------
+    levels : numpy.ndarray
+        uint8 array of shape (height, width, channels)
+    radius : int
+        the square is 2*radius+1 pixels wide
+    rank : int
+        which level to choose; 0 is the smallest
+    border : str
+        how levels outside the array are made up
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 array of the chosen levels
+    """
+    height, width, channels = levels.shape
+    size = 2 * radius + 1
+    padded = np.pad(levels, [(radius, radius), (radius, radius), (0, 0)],
+                    mode=_padMode(border))
+    rows = np.arange(height)[:, np.newaxis]
+    chans = np.arange(channels)
+    fine = np.zeros((height, channels, 256), dtype=np.int32)
+    coarse = np.zeros((height, channels, 16), dtype=np.int32)
+
+    def update(entering, leaving):
+        # move the windows from column leaving to column entering of padded
+        if size <= 13:
+            for i in range(size):
+                for x, sign in [(entering, 1), (leaving, -1)]:
+                    if x is not None:
+                        values = padded[i:i + height, x]
+                        fine[rows, chans, values] += sign
+                        coarse[rows, chans, values >> 4] += sign
+        else:
+            delta = _windowHistograms(padded[:, entering],
+                                      None if leaving is None else padded[:, leaving],
+                                      size)
+            np.add(fine, delta, out=fine)
+            np.add(coarse, delta.reshape(height, channels, 16, 16).sum(axis=3),
+                   out=coarse)
+
+    for x in range(size):
+        update(x, None)
+    result = np.empty(levels.shape, dtype=np.uint8)
+    for x in range(width):
+        if x > 0:
+            update(x + size - 1, x - 1)
+        counts = np.cumsum(coarse, axis=2)
+        block = np.argmax(counts > rank, axis=2)[:, :, np.newaxis]
+        below = (np.take_along_axis(counts, block, axis=2)
+                 - np.take_along_axis(coarse, block, axis=2))
+        bins = np.take_along_axis(fine.reshape(height, channels, 16, 16),
+                                  block[:, :, :, np.newaxis], axis=2)[:, :, 0]
+        fineCounts = np.cumsum(bins, axis=2) + below
+        result[:, x] = block[:, :, 0] * 16 + np.argmax(fineCounts > rank, axis=2)
+    return result
+
+def rankFilter(picture, radius, percentile, border='reflect', inPlace=False):
+    """Replace each level by a percentile of the levels in a square around it
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to filter
+    radius : int
+        the square is 2*radius+1 pixels wide
+    percentile : float
+        0 for the smallest level, 50 for the median, 100 for the largest
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the filtered picture
+    """
+    count = (2 * radius + 1) ** 2
+    rank = int(round(percentile / 100.0 * (count - 1)))
+    levels = _rankLevels(picture._getArray(), radius, rank, border)
+    return _result(picture, levels, inPlace)
+
+def medianFilter(picture, radius=1, border='reflect', inPlace=False):
+    """Replace each level by the median of the levels in a square around it
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to filter
+    radius : int
+        the square is 2*radius+1 pixels wide
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the filtered picture
+    """
+    return rankFilter(picture, radius, 50, border, inPlace)
+
+def _morphology(picture, steps, radius, threshold, border, inPlace):
+    """Apply a sequence of erosions and dilations to a picture
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture to change
+    steps : str
+        'e' for an erosion and 'd' for a dilation, applied in order
+    radius : int
+        the structuring element is a square 2*radius+1 pixels wide
+    threshold : int or None
+        None for grayscale morphology of each channel; otherwise pixels
+        with luminance of at least threshold are white, the others are
+        black, and the result is a black and white picture
+    border : str
+        'clamp', 'wrap' or 'reflect' (see the module documentation)
+    inPlace : bool
+        True to change picture, False to return a new picture
+
+    Returns
+    -------
+    Picture
+        the changed picture
+    """
+    levels = picture._getArray()
+    if threshold is not None:
+        luminance = levels @ LUMINANCE
+        levels = np.where(luminance >= threshold, 255, 0).astype(np.uint8)
+        levels = levels[:, :, np.newaxis]
+    last = (2 * radius + 1) ** 2 - 1
+    for step in steps:
+        levels = _rankLevels(levels, radius, 0 if step == 'e' else last,
+                             border)
+    if threshold is not None:
+        levels = np.repeat(levels, 3, axis=2)
+    return _result(picture, levels, inPlace)
+
+def erode(picture, radius=1, threshold=None, border='reflect', inPlace=False):
+    """Shrink bright regions: each level becomes the smallest one around it
+
+    See _morphology for the meaning of the parameters.
+    """
+    return _morphology(picture, 'e', radius, threshold, border, inPlace)
+
+def dilate(picture, radius=1, threshold=None, border='reflect', inPlace=False):
+    """Grow bright regions: each level becomes the largest one around it
+
+    See _morphology for the meaning of the parameters.
+    """
+    return _morphology(picture, 'd', radius, threshold, border, inPlace)
+
+def opening(picture, radius=1, threshold=None, border='reflect',
+            inPlace=False):
+    """Erode then dilate, removing bright specks smaller than the square
+
+    See _morphology for the meaning of the parameters.
+    """
+    return _morphology(picture, 'ed', radius, threshold, border, inPlace)
+
+def closing(picture, radius=1, threshold=None, border='reflect',
+            inPlace=False):
+    """Dilate then erode, filling dark specks smaller than the square
+
+    See _morphology for the meaning of the parameters.
+    """
+    return _morphology(picture, 'de', radius, threshold, border, inPlace)
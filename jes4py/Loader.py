@@ -0,0 +1,100 @@
+"""
+Loader.py - load many pictures or sounds at once on a pool of workers
+
+Decoding image and sound files is mostly done by C code that releases
+the interpreter lock, so a pool of threads can decode several files at
+the same time.  A pool of processes may be used instead when decoding
+is not the bottleneck (e.g. many small files of a format decoded in
+Python).
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import as_completed
+from jes4py.Picture import Picture
+from jes4py.Sound import Sound
+
+def loadPicture(fileName, maxWidth=None, maxHeight=None):
+    """Load one picture (runs in a worker)
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the image file
+    maxWidth, maxHeight : int
+        bounds on the size of the picture, as for Picture.loadOrFail()
+
+    Returns
+    -------
+    Picture
+        the loaded picture
+    """
+    picture = Picture()
+    picture.loadOrFail(fileName, maxWidth, maxHeight)
+    return picture
+
+def loadSound(fileName):
+    """Load one sound (runs in a worker)
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the WAV file
+
+    Returns
+    -------
+    Sound
+        the loaded sound
+    """
+    return Sound(fileName)
+
+def loadAll(load, fileNames, workers=None, processes=False, stream=False):
+    """Load files on a pool of workers
+
+    Parameters
+    ----------
+    load : function
+        function taking a file name and returning what was loaded from
+        it; it must be defined at the top level of a module if processes
+        is True
+    fileNames : list of str
+        the names of the files to load
+    workers : int
+        the number of workers (default chosen by concurrent.futures)
+    processes : bool
+        False to use threads, True to use processes
+    stream : bool
+        False to return all results once every file is loaded, True to
+        return a generator producing results as soon as each file is
+        loaded, so they can be used while other files are still loading
+
+    Returns
+    -------
+    list or generator
+        the results in the order of fileNames, or if stream is True a
+        generator of (fileName, result) pairs in the order the files
+        finish loading
+    """
+    if processes:
+        executor = ProcessPoolExecutor(workers)
+    else:
+        executor = ThreadPoolExecutor(workers)
+    if stream:
+        return _streamAll(executor, load, fileNames)
+    with executor:
+        return list(executor.map(load, fileNames))
+
+def _streamAll(executor, load, fileNames):
+    """Generate (fileName, result) pairs as files finish loading
+
+    Files not yet started are abandoned if the generator is closed early.
+    """
+    futures = {}
+    try:
+        for name in fileNames:
+            futures[executor.submit(load, name)] = name
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
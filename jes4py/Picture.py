@@ -1,12 +1,215 @@
 import os, sys
 import wx
 import atexit
-import subprocess, tempfile, pickle
+import subprocess, pickle
+import io
+import weakref
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
 from subprocess import PIPE
 import PIL.ImageDraw, PIL.Image
+import numpy as np
 from jes4py import Config
 from jes4py.PixelColor import Pixel, Color
 from jes4py import FileChooser
+from jes4py import Writer
+from jes4py import RawMedia
+
+def _normalizeImage(image):
+    """Convert a PIL image to the canonical internal layout
+
+    Pictures are stored as RGB images, or as RGBA images when the source
+    carries alpha or transparency information.  Converting once when an
+    image is loaded keeps the per-pixel accessors on a single code path
+    and avoids converting again every time the picture is displayed.
+
+    Parameters
+    ----------
+    image : PIL.Image.Image
+        the image to normalize
+
+    Returns
+    -------
+    PIL.Image.Image
+        the image itself if already canonical, otherwise a converted copy
+    """
+    mode = image.mode
+    if mode == "RGB" or mode == "RGBA":
+        return image
+    if mode in ("LA", "La", "PA", "RGBa") or "transparency" in image.info:
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+def _openImage(fileName):
+    """Open an image file, including jes4py's own .jpic files
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the image file
+
+    Returns
+    -------
+    PIL.Image.Image
+        the image (not yet normalized)
+    """
+    if os.path.splitext(fileName)[1].lower() == RawMedia.PICTURE_EXTENSION:
+        return RawMedia.readPicture(fileName)
+    return PIL.Image.open(fileName)
+
+def _saveImage(image, file, imageType=None, quality=None, compressLevel=None,
+               optimize=None):
+    """Save an image to a file
+
+    Parameters
+    ----------
+    image : PIL.Image.Image
+        the image to save
+    file : str or file object
+        the name of the file, or (except for .jpic) a file open for
+        writing in binary mode
+    imageType : str
+        the file format ("jpic" or one known to PIL); None to choose it
+        from the file name
+    quality, compressLevel, optimize
+        as for Picture.writeOrFail()
+    """
+    if imageType == 'jpic':
+        RawMedia.writePicture(file, image, compressLevel)
+        return
+    options = {}
+    if quality is not None:
+        options["quality"] = quality
+    if compressLevel is not None:
+        options["compress_level"] = compressLevel
+    if optimize is not None:
+        options["optimize"] = optimize
+    image.save(file, format=imageType, **options)
+
+def _unpicklePicture(cls, mode, size, pixels, state):
+    """Rebuild a picture pickled with protocol 5
+
+    Parameters
+    ----------
+    cls : type
+        the class of the picture
+    mode : str
+        the mode of the picture's image
+    size : tuple of int
+        the width and height of the image
+    pixels : bytes-like
+        the pixel data of the image
+    state : dict
+        the other attributes, as returned by Picture.__getstate__
+
+    Returns
+    -------
+    Picture
+        the rebuilt picture
+    """
+    picture = cls.__new__(cls)
+    state['image'] = PIL.Image.frombytes(mode, size, pixels)
+    picture.__setstate__(state)
+    return picture
+
+def _colorLevels(colors):
+    """Return the red, green and blue levels of one or more colors
+
+    Levels outside [0..255] are wrapped or clamped according to the Pixel
+    wrapLevels setting, as Color does for single levels.
+
+    Parameters
+    ----------
+    colors : Color, sequence or numpy.ndarray
+        a color, a sequence of colors or (red, green, blue) triples, or an
+        array of shape (n, 3)
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 array of shape (3,) for a single color, (n, 3) otherwise
+    """
+    if isinstance(colors, Color):
+        colors = colors.getRGB()
+    elif not isinstance(colors, np.ndarray):
+        colors = [c.getRGB() if isinstance(c, Color) else c for c in colors]
+    levels = np.asarray(colors)
+    if levels.shape[-1:] != (3,):
+        raise ValueError("colors must have red, green and blue levels")
+    if levels.dtype.kind == 'f':
+        if not np.isfinite(levels).all():
+            raise ValueError("color levels must be finite")
+        levels = np.trunc(levels)
+    levels = levels.astype(np.int64)
+    if Pixel.getWrapLevels():
+        levels = levels % 256
+    else:
+        levels = np.clip(levels, 0, 255)
+    return levels.astype(np.uint8)
+
+class _ImageBuffer:
+    """Pixel storage that can be shared by several pictures
+
+    Duplicating a picture shares its buffer instead of copying the image.
+    The buffer keeps track of the pictures using it, and a picture about
+    to modify a shared buffer first takes a private copy (copy-on-write).
+
+    Attributes
+    ----------
+    image : PIL.Image.Image
+        the image holding the pixels
+    owners : weakref.WeakSet
+        the pictures currently using this buffer
+    """
+
+    def __init__(self, image, owner):
+        """Initializer for _ImageBuffer class
+
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            the image holding the pixels
+        owner : Picture
+            the first picture using this buffer
+        """
+        self.image = image
+        self.owners = weakref.WeakSet()
+        self.owners.add(owner)
+
+def _mapPixelsBand(shmName, width, top, bottom, func, wrapLevels):
+    """Apply a function to every pixel in a band of rows (worker process)
+
+    Parameters
+    ----------
+    shmName : str
+        name of the shared memory block holding the picture's RGB data
+    width : int
+        the width of the picture
+    top, bottom : int
+        the first row of the band and the row just below it
+    func : function
+        the function to call with each Pixel in the band
+    wrapLevels : bool
+        the Pixel wrapLevels setting of the calling process
+    """
+    Pixel.setWrapLevels(wrapLevels)
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        levels = np.ndarray((bottom - top, width, 3), dtype=np.uint8,
+                            buffer=shm.buf, offset=top * width * 3)
+        band = _BandPicture(levels, top)
+        try:
+            for y in range(top, bottom):
+                for x in range(width):
+                    func(Pixel(None, x, y, band))
+        finally:
+            # the block cannot be closed while views of it remain
+            band.release()
+            del band, levels
+    finally:
+        shm.close()
 
 class Picture:
 
@@ -16,14 +219,27 @@ class Picture:
     _PictureIndexOffset = 0
     tmpfilename = None
     process = None
+    # PIL pixel access for fast pixel writes, set while this picture is
+    # the only owner of an RGB buffer (see _setRGB)
+    _pixels = None
     subprocessList = []
     show_control_exit = bytes([0])
     show_control_data = bytes([1])
+    CHANNELS = ("red", "green", "blue", "luminance")
+    LUMINANCE = np.array([0.299, 0.587, 0.114])
+    RESAMPLING = {"nearest": PIL.Image.NEAREST, "box": PIL.Image.BOX,
+                  "bilinear": PIL.Image.BILINEAR, "bicubic": PIL.Image.BICUBIC,
+                  "lanczos": PIL.Image.LANCZOS}
+    REDUCING_GAP = 3.0
+    # Size of the bands of rows flipped at a time by in-place flips
+    FLIP_BAND_BYTES = 1 << 20
 
     def __init__(self, *args, **kwargs):
         """Initializer for Picture class
         """
         self.filename = self.title = 'None'
+        self._generation = 0
+        self._cache = {}
         if len(args) == 0:
             # no parameters, make 100x200 picture with white background
             self.image = PIL.Image.new("RGB", (200, 100), (255, 255, 255))
@@ -37,19 +253,20 @@ class Picture:
                     if os.path.isfile(filepath):
                         self.filename = self.title = filepath
                 try:
-                    self.image = PIL.Image.open(self.filename)
+                    self.image = _normalizeImage(_openImage(self.filename))
                 except:
                     self.image = PIL.Image.new("RGB", (600, 200))
-                    draw = PIL.ImageDraw.Draw(self.image)
+                    draw = PIL.ImageDraw.Draw(self._getWritableImage())
                     draw.text((0, 100), "Couldn't load " + self.filename)
             elif isinstance(args[0], Picture):
-                # We've been passed a Picture object
-                self.image = args[0].image.copy()
+                # We've been passed a Picture object; share its pixels
+                # until one of the two pictures is modified
+                self._shareImage(args[0])
                 self.filename = args[0].filename
                 self.title = args[0].title
             elif isinstance(args[0], PIL.Image.Image):
                 # We've been passed a PIL image object
-                self.image = args[0]
+                self.image = _normalizeImage(args[0])
                 try:
                     self.filename = self.title = args[0].filename
                 except AttributeError:
@@ -62,6 +279,101 @@ class Picture:
         else:
             print("Could not construct Picture object")
 
+    def __getstate__(self):
+        """Return the state to pickle, leaving out caches and processes
+
+        Returns
+        -------
+        dict
+            the picture attributes worth sending to another process
+        """
+        state = self.__dict__.copy()
+        state.pop('_cache', None)
+        state.pop('_pixels', None)
+        state.pop('process', None)
+        state['image'] = state.pop('_buffer').image
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled picture
+
+        Parameters
+        ----------
+        state : dict
+            the attributes returned by __getstate__
+        """
+        image = state.pop('image')
+        self.__dict__.update(state)
+        self._cache = {}
+        self.image = image
+
+    def __reduce_ex__(self, protocol):
+        """Reduce this picture for pickling
+
+        With protocol 5 the pixels are handed to pickle as a PickleBuffer,
+        so they can be sent out-of-band (see the buffer_callback argument
+        of pickle.dumps) instead of being copied into the pickle.  PIL
+        does not expose its pixel storage, so one copy of the pixels is
+        still made with tobytes().
+
+        Parameters
+        ----------
+        protocol : int
+            the pickle protocol in use
+
+        Returns
+        -------
+        tuple
+            the reduce value described in the pickle documentation
+        """
+        if protocol < 5:
+            return object.__reduce_ex__(self, protocol)
+        state = self.__getstate__()
+        image = state.pop('image')
+        pixels = pickle.PickleBuffer(image.tobytes())
+        return (_unpicklePicture,
+                (type(self), image.mode, image.size, pixels, state))
+
+    @property
+    def image(self):
+        """PIL.Image.Image : the image holding this picture's pixels
+
+        The image may be shared with duplicates of this picture; code that
+        modifies it must obtain it through _getWritableImage() instead.
+        """
+        return self._buffer.image
+
+    @image.setter
+    def image(self, image):
+        buffer = self.__dict__.get('_buffer')
+        if buffer is not None:
+            buffer.owners.discard(self)
+        self._buffer = _ImageBuffer(image, self)
+        self._pixels = None
+
+    def _shareImage(self, other):
+        """Use the pixels of another picture without copying them
+
+        Parameters
+        ----------
+        other : Picture
+            the picture whose pixels are shared
+        """
+        if '_buffer' not in other.__dict__:
+            # other keeps its pixels elsewhere (e.g. in tiles), so copy them
+            self.image = other.image
+        else:
+            buffer = self.__dict__.get('_buffer')
+            if buffer is not None:
+                buffer.owners.discard(self)
+            for owner in other._buffer.owners:
+                # the buffer is now shared, so writes must copy it first
+                owner._pixels = None
+            self._buffer = other._buffer
+            self._buffer.owners.add(self)
+            self._pixels = None
+        self._markChanged()
+
     def __str__(self):
         """Return string representation of this picture
 
@@ -71,7 +383,7 @@ class Picture:
             representation of this picture
         """
         output = "Picture, filename {} height {} width {}".format(
-            self.filename, self.image.height, self.image.width)
+            self.filename, self.getHeight(), self.getWidth())
         return output
 
     def __repr__(self):
@@ -103,9 +415,7 @@ class Picture:
             the Picture object that self will look like
 
         """
-        im = PIL.Image.new("RGB", (self.getWidth(), self.getHeight()), (0,0,0))
-        im = sourcePicture.getImage().copy()
-        self.setImage(im)
+        self._shareImage(sourcePicture)
 
     def setAllPixelsToAColor(self, acolor):
         """Makes the image associated with the picture filled in with one color
@@ -119,6 +429,7 @@ class Picture:
             print ("setAllPixelsToAColor(color): Input is not a color")
             raise ValueError
         self.image = PIL.Image.new("RGB", (self.getWidth(), self.getHeight()), acolor.getRGB())
+        self._markChanged()
 
     def getFileName(self):
         """Return picture file name
@@ -183,6 +494,10 @@ class Picture:
     def getImage(self):
         """Return the PIL Image associated with this picture
 
+        The image may be shared with duplicates of this picture and is
+        used for cached data derived from the pixels, so it should only be
+        read; change the picture through its methods or setImage().
+
         Returns
         -------
         PIL.Image.Image
@@ -198,7 +513,147 @@ class Picture:
         image : PIL.Image.Image
             the PIL Image to associate with this picture
         """
-        self.image = image
+        self.image = _normalizeImage(image)
+        self._markChanged()
+
+    def _markChanged(self):
+        """Record that the pixels of this picture have changed
+
+        Every write bumps the generation counter; cached values computed
+        for an older generation are recomputed the next time they are used.
+        """
+        self._generation += 1
+
+    def _getCached(self, key, compute):
+        """Return a value derived from the pixels, computing it if needed
+
+        Parameters
+        ----------
+        key : str
+            name of the cached value
+        compute : function
+            function of no arguments that computes the value
+
+        Returns
+        -------
+        any
+            the cached (or freshly computed) value
+        """
+        entry = self._cache.get(key)
+        if entry is None or entry[0] != self._generation:
+            entry = (self._generation, compute())
+            self._cache[key] = entry
+        return entry[1]
+
+    def _getWritableImage(self):
+        """Return the PIL Image so that it can be modified
+
+        If the image is shared with other pictures, this picture first
+        switches to a private copy so the others are not affected.
+
+        Returns
+        -------
+        PIL.Image.Image
+            the PIL Image associated with this picture
+        """
+        buffer = self._buffer
+        if len(buffer.owners) > 1:
+            buffer.owners.discard(self)
+            self._buffer = _ImageBuffer(buffer.image.copy(), self)
+        self._markChanged()
+        return self._buffer.image
+
+    @contextlib.contextmanager
+    def _drawing(self):
+        """Give a PIL ImageDraw object for drawing on this picture
+
+        Yields
+        ------
+        PIL.ImageDraw.ImageDraw
+            the object to draw with, valid only inside the with statement
+        """
+        yield PIL.ImageDraw.Draw(self._getWritableImage())
+
+    def _getRGB(self, x, y):
+        """Return the red, green and blue levels of a pixel
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel
+
+        Returns
+        -------
+        tuple of int
+            the (red, green, blue) levels of the pixel
+        """
+        if self._pixels is not None:
+            return self._pixels[x, y]
+        return self.image.getpixel((x, y))[:3]
+
+    def _setRGB(self, x, y, rgb):
+        """Set the red, green and blue levels of a pixel
+
+        Levels must already be within [0..255].  The alpha level of
+        pictures with transparency is left unchanged.
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel
+        rgb : tuple of int
+            the new (red, green, blue) levels
+        """
+        pixels = self._pixels
+        if pixels is not None:
+            # fast path: this picture alone owns an RGB buffer
+            self._generation += 1
+            pixels[x, y] = rgb
+            return
+        image = self._getWritableImage()
+        if image.mode == "RGBA":
+            rgb = tuple(rgb[:3]) + (image.getpixel((x, y))[3],)
+            image.putpixel((x, y), rgb)
+        else:
+            self._pixels = image.load()
+            self._pixels[x, y] = rgb
+
+    def _getRegion(self, x, y, width, height):
+        """Return a copy of a rectangular region of this picture
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        PIL.Image.Image
+            a new image holding the pixels in the region
+        """
+        return self.image.crop((x, y, x + width, y + height))
+
+    def _pasteImage(self, image, x, y):
+        """Copy the pixels of an image into this picture
+
+        Only the red, green and blue levels are copied; the alpha levels of
+        pictures with transparency are left unchanged.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            the image to copy; it must fit within this picture
+        x, y : int
+            the coordinates where the upper-left corner of image goes
+        """
+        target = self._getWritableImage()
+        if target.mode == "RGBA":
+            box = (x, y, x + image.width, y + image.height)
+            alpha = target.getchannel("A").crop(box)
+            image = PIL.Image.merge("RGBA", image.convert("RGB").split() + (alpha,))
+        target.paste(image, (x, y))
 
     def getBasicPixel(self, x, y):
         """Return the pixel at specified coordinates as a tuple.
@@ -213,7 +668,7 @@ class Picture:
         tuple of int
             the color of the pixel at position (x,y) as a tuple
         """
-        return self.getPixel(x,y).getColor().getRGB()
+        return self._getRGB(x, y)
 
     def setBasicPixel(self, x, y, rgb):
         """Sets the pixel at specified coordinates to a color based on rgb(tuple)
@@ -226,7 +681,7 @@ class Picture:
             the color the pixel will be set to
         """
         col = Color(rgb[0], rgb[1], rgb[2])
-        self.getPixel(x,y).setColor(col)
+        self._setRGB(x, y, col.getRGB())
 
     def getPixel(self, x, y):
         """Return the pixel at specified coordinates
@@ -241,7 +696,7 @@ class Picture:
         Pixel
             the pixel at (x,y) in this picture
         """
-        pix = Pixel(self.image, x, y)
+        pix = Pixel(self.image, x, y, self)
         return pix
 
     def getPixels(self):
@@ -256,11 +711,151 @@ class Picture:
             list of pixels in this picture
         """
         pixels = list()
-        for y in range(self.image.height):
-            for x in range(self.image.width):
-                pixels.append(Pixel(self.image, x, y))
+        image = self.image
+        for y in range(self.getHeight()):
+            for x in range(self.getWidth()):
+                pixels.append(Pixel(image, x, y, self))
         return pixels
 
+    def _coordinateBox(self, coords):
+        """Check pixel coordinates and find the region holding them
+
+        Parameters
+        ----------
+        coords : sequence or numpy.ndarray
+            (x, y) pairs, or an array of shape (n, 2)
+
+        Returns
+        -------
+        tuple
+            the x and y coordinates as arrays, then the upper-left corner,
+            width and height of the smallest region holding every pixel
+        """
+        coords = np.asarray(coords, dtype=np.intp).reshape(-1, 2)
+        xs, ys = coords[:, 0], coords[:, 1]
+        if len(coords) == 0:
+            return xs, ys, 0, 0, 0, 0
+        left, top = xs.min(), ys.min()
+        right, bottom = xs.max() + 1, ys.max() + 1
+        if left < 0 or top < 0 or right > self.getWidth() or bottom > self.getHeight():
+            raise ValueError("the pixels must lie within the picture")
+        return xs, ys, int(left), int(top), int(right - left), int(bottom - top)
+
+    def getPixelColors(self, coords):
+        """Return the colors of many pixels at once
+
+        Only the smallest region holding all the pixels is read, in one
+        pass, instead of making a Pixel object for each of them.
+
+        Parameters
+        ----------
+        coords : sequence or numpy.ndarray
+            the coordinates of the pixels, as (x, y) pairs or as an array
+            of shape (n, 2)
+
+        Returns
+        -------
+        numpy.ndarray
+            a new uint8 array of shape (n, 3) holding the red, green and
+            blue levels of the pixels, in the order of coords
+        """
+        xs, ys, left, top, width, height = self._coordinateBox(coords)
+        if width == 0:
+            return np.zeros((0, 3), dtype=np.uint8)
+        region = np.asarray(self._getRegion(left, top, width, height))
+        return region[ys - top, xs - left, :3]
+
+    def setPixelColors(self, coords, colors):
+        """Set the colors of many pixels at once
+
+        The smallest region holding all the pixels is changed in one pass.
+        Levels outside [0..255] are handled as Color handles them.  The
+        alpha levels of pictures with transparency are left unchanged.
+
+        Parameters
+        ----------
+        coords : sequence or numpy.ndarray
+            the coordinates of the pixels, as (x, y) pairs or as an array
+            of shape (n, 2)
+        colors : Color, sequence or numpy.ndarray
+            one color for all the pixels, or one color per pixel given as
+            Color objects, (red, green, blue) triples or an array of shape
+            (n, 3)
+        """
+        xs, ys, left, top, width, height = self._coordinateBox(coords)
+        levels = _colorLevels(colors)
+        if levels.ndim > 1 and len(levels) != len(xs):
+            raise ValueError("there must be one color per pixel")
+        if width == 0:
+            return
+        region = self._getRegion(left, top, width, height)
+        if region.mode != "RGB":
+            region = region.convert("RGB")
+        region = np.array(region)
+        region[ys - top, xs - left] = levels
+        self._pasteImage(PIL.Image.fromarray(region), left, top)
+
+    def mapPixels(self, func, workers=None):
+        """Call a function with every pixel of this picture, in parallel
+
+        The picture is split into bands of rows which are handled by a pool
+        of worker processes, each reading and writing its band's pixels
+        directly in a shared memory block.  The result is the same as
+        calling func for each pixel in getPixels(), but func only sees the
+        pixel it is given: it must not rely on other pixels, on global
+        variables it changes, or on its return value.  func must be
+        defined at the top level of a module so it can be sent to the
+        workers.  The workers are forked from this process, so the
+        calling script is not run again in them; where processes cannot
+        be forked (Windows), or func cannot be sent, the pixels are
+        processed one at a time in this process.
+
+        Parameters
+        ----------
+        func : function
+            function taking a Pixel, e.g. def f(pixel): ...
+        workers : int
+            the number of worker processes (default is the number of CPUs)
+        """
+        width, height = self.getWidth(), self.getHeight()
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, height)
+        try:
+            pickle.dumps(func)
+        except Exception:
+            workers = 1
+        if "fork" not in multiprocessing.get_all_start_methods():
+            workers = 1
+        if workers <= 1:
+            for y in range(height):
+                for x in range(width):
+                    func(self.getPixel(x, y))
+            return
+
+        shm = shared_memory.SharedMemory(create=True, size=width * height * 3)
+        try:
+            levels = np.ndarray((height, width, 3), dtype=np.uint8,
+                                buffer=shm.buf)
+            try:
+                levels[...] = self._getArray()
+                numBands = min(height, workers * 4)
+                rows = [height * i // numBands for i in range(numBands + 1)]
+                context = multiprocessing.get_context("fork")
+                with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                    futures = [executor.submit(_mapPixelsBand, shm.name,
+                                               width, rows[i], rows[i + 1],
+                                               func, Pixel.getWrapLevels())
+                               for i in range(numBands)]
+                    for future in futures:
+                        future.result()
+                self._setArray(levels)
+            finally:
+                del levels
+        finally:
+            shm.close()
+            shm.unlink()
+
     def addLine(self, acolor, x1, y1, x2, y2):
         """Draw a line on this picture
     
@@ -275,9 +870,9 @@ class Picture:
         y2 : int
             the y-coordinate of the second point
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x1, y1, x2, y2]
-        draw.line(shape, fill=acolor.getRGB())
+        with self._drawing() as draw:
+            shape = [x1, y1, x2, y2]
+            draw.line(shape, fill=acolor.getRGB())
 
     def addText(self, acolor, x, y, string):
         """Add a line of text to the picture
@@ -293,11 +888,11 @@ class Picture:
         string : str
             the text that will be drawn on the picture
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        # font = ImageFont.truetype(<font-file>, <font-size>)
-        # font = ImageFont.truetype("sans-serif.ttf", 16)
-        # draw.text((x, y),"Sample Text",(r,g,b))
-        draw.text((x, y), string, acolor.getRGB())
+        with self._drawing() as draw:
+            # font = ImageFont.truetype(<font-file>, <font-size>)
+            # font = ImageFont.truetype("sans-serif.ttf", 16)
+            # draw.text((x, y),"Sample Text",(r,g,b))
+            draw.text((x, y), string, acolor.getRGB())
 
     def addTextWithStyle(self, acolor, x, y, string, style):
         """Add text to a picture withe a particular font style
@@ -336,9 +931,9 @@ class Picture:
         h : int
             the height of the rectangle
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        draw.rectangle(shape, fill = None, outline = acolor.getRGB()) 
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            draw.rectangle(shape, fill = None, outline = acolor.getRGB()) 
 
     def addRectFilled(self, acolor, x, y, w, h):
         """Draw a filled rectangle on this picture
@@ -354,10 +949,10 @@ class Picture:
         h : int
             the height of the rectangle
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        color = acolor.getRGB()
-        draw.rectangle(shape, fill = color, outline = color) 
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            color = acolor.getRGB()
+            draw.rectangle(shape, fill = color, outline = color) 
 
     def addOvalFilled(self, acolor, x, y, w, h):
         """Draw a filled oval on this picture
@@ -373,10 +968,10 @@ class Picture:
         h : int
             the height of the oval
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        color = acolor.getRGB()
-        draw.ellipse(shape, fill=color, outline=color, width=1)
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            color = acolor.getRGB()
+            draw.ellipse(shape, fill=color, outline=color, width=1)
 
     def addOval(self, acolor, x, y, w, h):
         """Draw the outline of an oval on this picture
@@ -392,9 +987,9 @@ class Picture:
         h : int
             the height of the oval
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        draw.ellipse(shape, fill=None, outline=acolor.getRGB(), width=1)
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            draw.ellipse(shape, fill=None, outline=acolor.getRGB(), width=1)
 
     def addArcFilled(self, acolor, x, y, w, h, start, angle):
         """Draw a filled in arc on this picture
@@ -414,14 +1009,14 @@ class Picture:
         angle : int
             the angle of the arc relative to start in degrees
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        end = -start % 360
-        start = -(start+angle) % 360
-        if start > end:
-            start, end = end, start
-        color = acolor.getRGB()
-        draw.pieslice(shape, start, end, fill=color, outline=color, width=1)
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            end = -start % 360
+            start = -(start+angle) % 360
+            if start > end:
+                start, end = end, start
+            color = acolor.getRGB()
+            draw.pieslice(shape, start, end, fill=color, outline=color, width=1)
 
     def addArc(self, acolor, x, y, w, h, start, angle):
         """Draw the outline of an arc on this picture
@@ -441,13 +1036,281 @@ class Picture:
         angle : int
             the angle of the arc relative to start in degrees
         """
-        draw = PIL.ImageDraw.Draw(self.image)
-        shape = [x, y, x+w, y+h]
-        end = -start % 360
-        start = -(start+angle) % 360
-        if start > end:
-            start, end = end, start
-        draw.arc(shape, start, end, fill=acolor.getRGB(), width=1)
+        with self._drawing() as draw:
+            shape = [x, y, x+w, y+h]
+            end = -start % 360
+            start = -(start+angle) % 360
+            if start > end:
+                start, end = end, start
+            draw.arc(shape, start, end, fill=acolor.getRGB(), width=1)
+
+    def _getArray(self):
+        """Return the red, green and blue levels of all pixels as an array
+
+        Returns
+        -------
+        numpy.ndarray
+            a new uint8 array of shape (height, width, 3)
+        """
+        image = self._getRegion(0, 0, self.getWidth(), self.getHeight())
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return np.array(image)
+
+    def _getSnapshot(self):
+        """Return a read-only array of all pixels, shared until they change
+
+        Returns
+        -------
+        numpy.ndarray
+            uint8 array of shape (height, width, 3), or (height, width, 4)
+            for pictures with alpha
+        """
+        def compute():
+            array = np.array(self._getRegion(0, 0, self.getWidth(),
+                                             self.getHeight()))
+            array.setflags(write=False)
+            return array
+        return self._getCached("snapshot", compute)
+
+    def __array__(self, dtype=None, copy=None):
+        """Let numpy.asarray(picture) return the levels of all pixels
+
+        PIL keeps pixels in its own padded layout, so the array is a
+        read-only snapshot rather than a view of the picture's storage.
+        It is made once and shared by later calls until the picture is
+        changed.  Use numpy.array(picture) for an array that can be
+        modified.
+
+        Parameters
+        ----------
+        dtype : numpy.dtype
+            the type of the levels (default uint8)
+        copy : bool
+            True to return a new, writable array
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (height, width, 3), or (height, width, 4) for
+            pictures with alpha
+        """
+        array = self._getSnapshot()
+        if copy or (dtype is not None and array.dtype != dtype):
+            return np.array(array, dtype=dtype)
+        return array
+
+    def __buffer__(self, flags):
+        """Return a read-only memoryview of the levels of all pixels (PEP 688)
+
+        Parameters
+        ----------
+        flags : int
+            the kind of buffer requested
+
+        Returns
+        -------
+        memoryview
+            the snapshot described in __array__()
+        """
+        if flags & 1:
+            # inspect.BufferFlags.WRITABLE
+            raise BufferError("picture levels can only be read through a buffer")
+        return memoryview(self._getSnapshot())
+
+    def _setArray(self, array):
+        """Set the red, green and blue levels of all pixels from an array
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            array of shape (height, width, 3) with levels in [0..255]
+        """
+        array = np.ascontiguousarray(array, dtype=np.uint8)
+        self._pasteImage(PIL.Image.fromarray(array), 0, 0)
+
+    def _applyArray(self, array, inPlace):
+        """Store new levels in this picture or in a new picture
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            uint8 array of shape (height, width, 3) holding the levels
+        inPlace : bool
+            True to change this picture, False to make a new picture
+
+        Returns
+        -------
+        Picture
+            this picture if inPlace is True, otherwise the new picture
+        """
+        if inPlace:
+            self._setArray(array)
+            return self
+        pic = Picture(PIL.Image.fromarray(np.ascontiguousarray(array, dtype=np.uint8)))
+        pic.filename = self.filename
+        pic.title = self.title
+        return pic
+
+    def _getIntegral(self):
+        """Return the summed-area table (integral image) of this picture
+
+        Entry [y, x] holds the sums of the red, green and blue levels of
+        all pixels above and to the left of (x,y).  The table is kept
+        until the picture is next changed.
+
+        Returns
+        -------
+        numpy.ndarray
+            int64 array of shape (height + 1, width + 1, 3)
+        """
+        def compute():
+            levels = self._getArray()
+            height, width = levels.shape[:2]
+            table = np.zeros((height + 1, width + 1, 3), dtype=np.int64)
+            np.cumsum(np.cumsum(levels, axis=0, dtype=np.int64), axis=1,
+                      out=table[1:, 1:])
+            return table
+        return self._getCached("integral", compute)
+
+    def _clipRegion(self, x, y, width, height):
+        """Return the part of a rectangular region inside this picture
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        tuple of int
+            the (left, upper, right, lower) bounds of the part inside
+        """
+        left = min(max(x, 0), self.getWidth())
+        upper = min(max(y, 0), self.getHeight())
+        right = max(left, min(x + width, self.getWidth()))
+        lower = max(upper, min(y + height, self.getHeight()))
+        return left, upper, right, lower
+
+    def regionSum(self, x, y, width, height):
+        """Return the sums of the levels of the pixels in a region
+
+        The sums are looked up in the summed-area table, so they take the
+        same time for any size of region.  Parts of the region outside
+        the picture are ignored.
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        tuple of int
+            the sums of the red, green and blue levels
+        """
+        left, upper, right, lower = self._clipRegion(x, y, width, height)
+        table = self._getIntegral()
+        sums = (table[lower, right] - table[upper, right]
+                - table[lower, left] + table[upper, left])
+        return tuple(int(s) for s in sums)
+
+    def regionMean(self, x, y, width, height):
+        """Return the average levels of the pixels in a region
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        tuple of float
+            the average red, green and blue levels of the pixels in the
+            part of the region inside the picture
+
+        Raises
+        ------
+        ValueError
+            if the region does not overlap the picture
+        """
+        left, upper, right, lower = self._clipRegion(x, y, width, height)
+        count = (right - left) * (lower - upper)
+        if count == 0:
+            raise ValueError("the region does not overlap the picture")
+        return tuple(s / count for s in self.regionSum(x, y, width, height))
+
+    def _getHistograms(self):
+        """Return the histograms of the levels of this picture
+
+        The histograms are kept until the picture is next changed.
+
+        Returns
+        -------
+        dict
+            maps 'red', 'green', 'blue' and 'luminance' to int64 arrays of
+            256 counts
+        """
+        def compute():
+            levels = self._getArray().reshape(-1, 3)
+            histograms = {}
+            for c, channel in enumerate(Picture.CHANNELS[:3]):
+                histograms[channel] = np.bincount(levels[:, c], minlength=256)
+            luminance = np.rint(levels @ Picture.LUMINANCE).astype(np.intp)
+            histograms["luminance"] = np.bincount(luminance, minlength=256)
+            return histograms
+        return self._getCached("histograms", compute)
+
+    def getHistogram(self, channel="luminance"):
+        """Return the number of pixels with each level in a channel
+
+        Parameters
+        ----------
+        channel : str
+            'red', 'green', 'blue' or 'luminance'; the luminance of a pixel
+            is 0.299*red + 0.587*green + 0.114*blue rounded to an integer
+
+        Returns
+        -------
+        list of int
+            256 counts; entry i is the number of pixels with level i
+        """
+        return self._getHistograms()[channel].tolist()
+
+    def getStatistics(self):
+        """Return the minimum, maximum, mean and standard deviation of levels
+
+        The statistics are computed from the histograms, which are kept
+        until the picture is next changed, so asking again costs nothing.
+
+        Returns
+        -------
+        dict
+            maps 'red', 'green', 'blue' and 'luminance' to dicts with keys
+            'min', 'max', 'mean' and 'stddev'
+        """
+        def compute():
+            statistics = {}
+            levels = np.arange(256)
+            for channel, counts in self._getHistograms().items():
+                total = counts.sum()
+                if total == 0:
+                    statistics[channel] = dict(min=0, max=0, mean=0.0, stddev=0.0)
+                    continue
+                used = np.flatnonzero(counts)
+                mean = float(counts @ levels) / total
+                variance = float(counts @ (levels - mean) ** 2) / total
+                statistics[channel] = dict(min=int(used[0]), max=int(used[-1]),
+                                           mean=mean, stddev=variance ** 0.5)
+            return statistics
+        statistics = self._getCached("statistics", compute)
+        return {channel: dict(values) for channel, values in statistics.items()}
 
     def copyInto(self, dest, upperLeftX, upperLeftY):
         """Returns a picture with the current picture copied into it
@@ -473,6 +1336,13 @@ class Picture:
         """
         srcWidth = self.getWidth()
         srcHeight = self.getHeight()
+        if (upperLeftX >= 0 and upperLeftY >= 0
+                and upperLeftX + srcWidth <= dest.getWidth()
+                and upperLeftY + srcHeight <= dest.getHeight()):
+            # The whole picture fits, so copy it in one operation
+            region = self._getRegion(0, 0, srcWidth, srcHeight)
+            dest._pasteImage(region, upperLeftX, upperLeftY)
+            return dest
         # # The next block of statments deal with cases where the self
         # # picture would extend past the rigth or bottom border of the
         # # destination picture. This is good, but an enhancement over
@@ -515,13 +1385,82 @@ class Picture:
         Picture
             a cropped version of the picture
         """
-        croppedImage = self.image.crop((upperLeftX, upperLeftY, upperLeftX+width, upperLeftY+height))
+        croppedImage = self._getRegion(upperLeftX, upperLeftY, width, height)
         pic = Picture(croppedImage)
         pic.filename = self.filename
         pic.title = self.title
         return pic
 
-    def scale(self, xFactor, yFactor):
+    def view(self, upperLeftX, upperLeftY, width, height):
+        """Returns a view of a rectangular part of this picture
+
+        Unlike crop(), no pixels are copied: the view is a picture whose
+        pixels are those of this picture, so changing a pixel of the view
+        (with setColor, a filter applied in place, drawing, ...) changes
+        this picture, and the other way around.  Coordinates in the view
+        start at (0, 0) in its upper-left corner.
+
+        Parameters
+        ----------
+        upperLeftX, upperLeftY : int
+            the coordinates in this picture of the view's upper-left corner
+        width, height : int
+            the size of the view
+
+        Returns
+        -------
+        Picture
+            the view
+        """
+        if (upperLeftX < 0 or upperLeftY < 0 or width < 0 or height < 0
+                or upperLeftX + width > self.getWidth()
+                or upperLeftY + height > self.getHeight()):
+            raise ValueError("the view must lie within the picture")
+        return _PictureView(self, upperLeftX, upperLeftY, width, height)
+
+    def getScaledImage(self, width, height, resample="bicubic"):
+        """Return a PIL Image of this picture scaled to a given size
+
+        Reductions start from a pyramid of images, each half the size of
+        the one before, which is built as needed and kept until the
+        picture is next changed.  The smallest level at least
+        REDUCING_GAP times larger than the requested size is used, and
+        further large reductions shrink it by an integer factor with a
+        cheap box filter (PIL's reducing_gap) before applying the
+        requested filter.  This is several times faster than filtering
+        the full image and visually indistinguishable, and repeated
+        requests for small views of a large picture are cheap.
+
+        Parameters
+        ----------
+        width, height : int
+            the size of the scaled image
+        resample : str
+            'nearest', 'box', 'bilinear', 'bicubic' or 'lanczos'
+
+        Returns
+        -------
+        PIL.Image.Image
+            the scaled image (a new image; changing it does not change
+            the picture)
+        """
+        method = Picture.RESAMPLING[resample]
+        width, height = max(1, width), max(1, height)
+        if method == PIL.Image.NEAREST:
+            return self.image.resize((width, height), method)
+        gap = Picture.REDUCING_GAP
+        pyramid = self._getCached("pyramid", lambda: [self.image])
+        level = 0
+        image = pyramid[0]
+        while (image.width // 2 >= width * gap
+                and image.height // 2 >= height * gap):
+            level += 1
+            if level == len(pyramid):
+                pyramid.append(image.reduce(2))
+            image = pyramid[level]
+        return image.resize((width, height), method, reducing_gap=gap)
+
+    def scale(self, xFactor, yFactor, resample="bicubic"):
         """Create new scaled picture
 
         Method to create a new picture by scaling the current picture by
@@ -533,6 +1472,9 @@ class Picture:
             the amount to scale in x
         yFactor : float
             the amount to scale in y
+        resample : str
+            the filter used to compute the new pixels, from fastest to
+            best: 'nearest', 'box', 'bilinear', 'bicubic' or 'lanczos'
 
         Returns
         -------
@@ -540,13 +1482,15 @@ class Picture:
 
             a scaled version of the picture
         """
-        scaledImage = self.image.resize((int(self.image.width*xFactor), int(self.image.height*yFactor)))
+        scaledImage = self.getScaledImage(int(self.getWidth()*xFactor),
+                                          int(self.getHeight()*yFactor),
+                                          resample)
         pic = Picture(scaledImage)
         pic.filename = self.filename
         pic.title = None
         return pic
 
-    def getPictureWithHeight(self, height):
+    def getPictureWithHeight(self, height, resample="bicubic"):
         """Returns a scaled version of this picture
 
         Scales the picture so that the height is equal to height while keeping
@@ -556,6 +1500,8 @@ class Picture:
         ----------
         height : int
             The height of the returned picture
+        resample : str
+            the filter to use (see scale())
 
         Returns
         -------
@@ -564,10 +1510,10 @@ class Picture:
         """
         # // set up the scale tranform
         yFactor = height / self.getHeight()
-        result = self.scale(yFactor, yFactor)
+        result = self.scale(yFactor, yFactor, resample)
         return result
         
-    def getPictureWithWidth(self, width):
+    def getPictureWithWidth(self, width, resample="bicubic"):
         """Returns a scaled version of this picture
 
         Scales the picture so that the width is equal to width while keeping
@@ -577,6 +1523,8 @@ class Picture:
         ----------
         width : int
             The width of the returned picture
+        resample : str
+            the filter to use (see scale())
 
         Returns
         -------
@@ -585,9 +1533,268 @@ class Picture:
         """
         # // set up the scale tranform
         xFactor = width / self.getWidth()
-        result = self.scale(xFactor, xFactor)
+        result = self.scale(xFactor, xFactor, resample)
         return result
 
+    def _withImage(self, image, inPlace):
+        """Use a transformed image for this picture or for a new picture
+
+        With inPlace=True the transformed image, already built in full,
+        replaces this picture's image; only a new Picture is avoided.
+
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            the transformed image; it is not copied
+        inPlace : bool
+            True to change this picture, False to make a new picture
+
+        Returns
+        -------
+        Picture
+            this picture if inPlace is True, otherwise the new picture
+        """
+        if inPlace:
+            self.image = image
+            self._markChanged()
+            return self
+        pic = Picture(image)
+        pic.filename = self.filename
+        pic.title = self.title
+        return pic
+
+    def _flipInPlace(self, leftRight, topBottom):
+        """Flip the pixels of this picture's image where they are
+
+        The image is flipped a band of rows at a time, so only two bands
+        are held in memory besides the image instead of a second image.
+
+        Parameters
+        ----------
+        leftRight : bool
+            True to swap left and right
+        topBottom : bool
+            True to swap top and bottom (both True rotates by 180 degrees)
+        """
+        image = self._getWritableImage()
+        width, height = image.size
+        rows = max(1, self.FLIP_BAND_BYTES // max(1, width * len(image.getbands())))
+        def band(top, bottom):
+            part = image.crop((0, top, width, bottom))
+            if leftRight:
+                part = part.transpose(PIL.Image.FLIP_LEFT_RIGHT)
+            if topBottom:
+                part = part.transpose(PIL.Image.FLIP_TOP_BOTTOM)
+            return part
+        top = 0
+        if topBottom:
+            # swap bands from the top with the matching bands from the
+            # bottom, working toward the middle
+            while True:
+                n = min(rows, (height - 2 * top) // 2)
+                if n == 0:
+                    break
+                upper = band(top, top + n)
+                image.paste(band(height - top - n, height - top), (0, top))
+                image.paste(upper, (0, height - top - n))
+                top += n
+            if not leftRight:
+                return
+            # the middle row of an odd height is only flipped left-right
+        bottom = height - top
+        for start in range(top, bottom, rows):
+            end = min(start + rows, bottom)
+            image.paste(band(start, end), (0, start))
+
+    def _fillColor(self, acolor):
+        """Return the fill value for areas a transform leaves uncovered
+
+        Parameters
+        ----------
+        acolor : Color or None
+            the color to fill with; None for black (transparent for
+            pictures with transparency)
+
+        Returns
+        -------
+        tuple of int or None
+            a fill value suitable for the picture's image mode
+        """
+        if acolor is None:
+            return None
+        if self.image.mode == "RGBA":
+            return acolor.getRGB() + (255,)
+        return acolor.getRGB()
+
+    def mirrorVertical(self, inPlace=False):
+        """Mirror the left half of this picture onto the right half
+
+        Only half of the picture is copied; with inPlace=False the new
+        picture shares the untouched half with this one until either is
+        changed.
+
+        Parameters
+        ----------
+        inPlace : bool
+            True to change this picture, False to return a new picture
+
+        Returns
+        -------
+        Picture
+            the mirrored picture
+        """
+        pic = self if inPlace else Picture(self)
+        width, height = self.getWidth(), self.getHeight()
+        half = self._getRegion(0, 0, width // 2, height)
+        pic._pasteImage(half.transpose(PIL.Image.FLIP_LEFT_RIGHT),
+                        width - width // 2, 0)
+        return pic
+
+    def mirrorHorizontal(self, inPlace=False):
+        """Mirror the top half of this picture onto the bottom half
+
+        Parameters
+        ----------
+        inPlace : bool
+            True to change this picture, False to return a new picture
+
+        Returns
+        -------
+        Picture
+            the mirrored picture
+        """
+        pic = self if inPlace else Picture(self)
+        width, height = self.getWidth(), self.getHeight()
+        half = self._getRegion(0, 0, width, height // 2)
+        pic._pasteImage(half.transpose(PIL.Image.FLIP_TOP_BOTTOM),
+                        0, height - height // 2)
+        return pic
+
+    def flip(self, direction="horizontal", inPlace=False):
+        """Flip this picture over
+
+        Parameters
+        ----------
+        direction : str
+            'horizontal' to swap left and right, 'vertical' to swap top
+            and bottom
+        inPlace : bool
+            True to change this picture, False to return a new picture;
+            in place the pixels are flipped a band of rows at a time
+            without building a second image
+
+        Returns
+        -------
+        Picture
+            the flipped picture
+        """
+        if inPlace and '_buffer' in self.__dict__:
+            self._flipInPlace(direction == "horizontal",
+                              direction != "horizontal")
+            return self
+        if direction == "horizontal":
+            method = PIL.Image.FLIP_LEFT_RIGHT
+        else:
+            method = PIL.Image.FLIP_TOP_BOTTOM
+        return self._withImage(self.image.transpose(method), inPlace)
+
+    def transpose(self, inPlace=False):
+        """Swap the rows and columns of this picture
+
+        inPlace=True only avoids making a new Picture: the transposed
+        image is still built in full before it replaces this picture's.
+
+        Parameters
+        ----------
+        inPlace : bool
+            True to change this picture, False to return a new picture
+
+        Returns
+        -------
+        Picture
+            the transposed picture; its width is this picture's height
+        """
+        return self._withImage(self.image.transpose(PIL.Image.TRANSPOSE),
+                               inPlace)
+
+    def rotate(self, degrees, expand=True, acolor=None, inPlace=False):
+        """Rotate this picture counterclockwise
+
+        Rotations by multiples of 90 degrees move pixels without
+        resampling; other angles are interpolated.  In place, rotations
+        by 0 and 180 degrees move the pixels where they are; other angles
+        still build the rotated image in full before it replaces this
+        picture's.
+
+        Parameters
+        ----------
+        degrees : float
+            the angle to rotate by; negative angles rotate clockwise
+        expand : bool
+            True to make the new picture large enough to hold the whole
+            rotated picture, False to keep the size of this picture
+        acolor : Color
+            the color of areas not covered by the rotated picture (default
+            is black)
+        inPlace : bool
+            True to change this picture, False to return a new picture
+
+        Returns
+        -------
+        Picture
+            the rotated picture
+        """
+        degrees = degrees % 360
+        if inPlace and degrees in (0, 180) and '_buffer' in self.__dict__:
+            if degrees == 180:
+                self._flipInPlace(True, True)
+            return self
+        image = self.image
+        quarterTurns = {90: PIL.Image.ROTATE_90, 180: PIL.Image.ROTATE_180,
+                        270: PIL.Image.ROTATE_270}
+        if degrees == 0:
+            image = image.copy()
+        elif degrees in quarterTurns and (expand or degrees == 180
+                                          or image.width == image.height):
+            image = image.transpose(quarterTurns[degrees])
+        else:
+            image = image.rotate(degrees, PIL.Image.BILINEAR, expand=expand,
+                                 fillcolor=self._fillColor(acolor))
+        return self._withImage(image, inPlace)
+
+    def affineTransform(self, coefficients, width=None, height=None,
+                        acolor=None, inPlace=False):
+        """Apply an affine transform to this picture
+
+        The pixel at (x,y) in the new picture is taken from position
+        (a*x + b*y + c, d*x + e*y + f) in this picture, interpolating
+        between pixels.  inPlace=True only avoids making a new Picture:
+        the transformed image is still built in full.
+
+        Parameters
+        ----------
+        coefficients : sequence of float
+            the six coefficients (a, b, c, d, e, f)
+        width, height : int
+            the size of the new picture (default is this picture's size)
+        acolor : Color
+            the color of pixels taken from outside this picture (default
+            is black)
+        inPlace : bool
+            True to change this picture, False to return a new picture
+
+        Returns
+        -------
+        Picture
+            the transformed picture
+        """
+        image = self.image
+        size = (width or image.width, height or image.height)
+        image = image.transform(size, PIL.Image.AFFINE, tuple(coefficients),
+                                PIL.Image.BILINEAR,
+                                fillcolor=self._fillColor(acolor))
+        return self._withImage(image, inPlace)
+
     def loadPictureAndShowIt(self, fileName):
         """Load picture from a file and show it
 
@@ -632,28 +1839,49 @@ class Picture:
             mode = "RGB"
             size = (600, 200)
             self.image = PIL.Image.new(mode, size, (255,255,255))
+            self._markChanged()
             self.addMessage("Couldn't load " + fileName, 5, 100)
             return False
 
-    def loadOrFail(self, fileName):
+    def loadOrFail(self, fileName, maxWidth=None, maxHeight=None):
         """Load a picture from a file
 
+        If maxWidth or maxHeight is given, the picture is reduced to fit
+        within those bounds while keeping its aspect ratio.  JPEG files are
+        then decoded directly at 1/2, 1/4 or 1/8 resolution where possible,
+        which is much faster than decoding at full size and scaling after.
+
         Parameters
         ----------
         fileName : str
             the name of the file to load the picture from
+        maxWidth : int
+            the largest width the loaded picture may have (optional)
+        maxHeight : int
+            the largest height the loaded picture may have (optional)
         """
-        self.image = PIL.Image.open(fileName) #.convert('RGB')
+        image = _openImage(fileName)
+        if maxWidth is not None or maxHeight is not None:
+            if maxWidth is None:
+                maxWidth = image.width
+            if maxHeight is None:
+                maxHeight = image.height
+            # thumbnail() selects the JPEG draft scale before decoding
+            image.thumbnail((maxWidth, maxHeight))
+        self.image = _normalizeImage(image)
+        self._markChanged()
         self.filename = self.title = fileName
 
 
-    def write(self, fileName):
+    def write(self, fileName, **options):
         """Writes this picture to a file with the name fileName
 
         Parameters
         ----------
         fileName : str
             The name of the file that this picture will be written to
+        options : any
+            the keyword arguments of writeOrFail()
 
         Returns
         -------
@@ -661,19 +1889,37 @@ class Picture:
             True if the file is written False if an IO error occurs
         """
         try :
-            self.writeOrFail(fileName)
+            self.writeOrFail(fileName, **options)
             return True
         except:
             print("There was an error trying to write " + fileName)
             return False
 
-    def writeOrFail(self, fileName):
+    def writeOrFail(self, fileName, asynchronous=False, quality=None,
+                    compressLevel=None, optimize=None):
         """Write the contents of the picture to a file
- 
+
         Parameters
         ----------
         fileName : str
             the name of the file to write the picture to
+        asynchronous : bool
+            False to write the file before returning, True to write it on
+            a background thread (see Writer).  The picture may be changed
+            right away; the file holds the pixels as they were when this
+            method was called.
+        quality : int
+            JPEG quality from 1 (smallest file) to 95 (best picture)
+        compressLevel : int
+            PNG or .jpic compression from 0 (none, fastest) to 9 (smallest
+            file); .jpic files are stored uncompressed by default
+        optimize : bool
+            True to spend extra time making JPEG and PNG files smaller
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            the future for the write when asynchronous is True
         """
         # get name and extension
         name, ext = os.path.splitext(fileName)
@@ -685,9 +1931,96 @@ class Picture:
             if imageType.lower() == 'jpg':
                 imageType = 'jpeg'
             print('imageType = {}'.format(imageType))
- 
-        # write file
-        self.image.save(fileName, format=imageType)
+
+        if ext.lower() == RawMedia.PICTURE_EXTENSION:
+            imageType = 'jpic'
+
+        if not asynchronous:
+            # write file
+            _saveImage(self.image, fileName, imageType, quality,
+                       compressLevel, optimize)
+            return None
+
+        # share the pixels with a snapshot; changing this picture while
+        # the file is written makes it switch to its own copy
+        snapshot = Picture(self)
+        return Writer.submit(lambda: _saveImage(snapshot.image, fileName,
+                                                imageType, quality,
+                                                compressLevel, optimize))
+
+    def toBytes(self, format="png", quality=None, compressLevel=None,
+                optimize=None):
+        """Return the contents of an image file holding this picture
+
+        Parameters
+        ----------
+        format : str
+            the file format, e.g. "png", "jpeg", "bmp" or "jpic"
+        quality, compressLevel, optimize
+            as for writeOrFail()
+
+        Returns
+        -------
+        bytes
+            the contents of the file
+        """
+        if format.lower() == "jpic":
+            return RawMedia.encodePicture(self.image, compressLevel)
+        if format.lower() == "jpg":
+            format = "jpeg"
+        file = io.BytesIO()
+        _saveImage(self.image, file, format, quality, compressLevel, optimize)
+        return file.getvalue()
+
+    @staticmethod
+    def fromBytes(data):
+        """Make a picture from the contents of an image file
+
+        Parameters
+        ----------
+        data : bytes-like
+            the contents of a file in any format PIL can read, or .jpic
+
+        Returns
+        -------
+        Picture
+            the new picture
+        """
+        if RawMedia.isPicture(data):
+            image = RawMedia.decodePicture(data)
+        else:
+            image = PIL.Image.open(io.BytesIO(data))
+            image.load()
+        return Picture(_normalizeImage(image))
+
+    @staticmethod
+    def fromBuffer(width, height, data, mode="RGB"):
+        """Make a picture from raw pixel data
+
+        Parameters
+        ----------
+        width, height : int
+            the size of the picture
+        data : bytes-like
+            the levels of every pixel, row by row, e.g. red, green, blue,
+            red, green, blue, ... for mode "RGB"
+        mode : str
+            "RGB" or "RGBA"
+
+        Returns
+        -------
+        Picture
+            the new picture; its pixels are a copy of data
+        """
+        if mode not in ("RGB", "RGBA"):
+            raise ValueError("mode must be 'RGB' or 'RGBA'")
+        with memoryview(data) as view:
+            if view.nbytes != width * height * len(mode):
+                raise ValueError("data does not hold {}x{} {} pixels".format(
+                    width, height, mode))
+            with view.cast("B") as pixels:
+                return Picture(PIL.Image.frombytes(mode, (width, height),
+                                                   pixels))
 
     def setMediaPath(self, directory):
         """Method to set the directory for the media
@@ -778,32 +2111,28 @@ class Picture:
             the converted image
         """
         orig_width, orig_height = self.image.size
+        rgb, alpha = self._getCached('wxData', self.__getDisplayData)
         wx_img = wx.Image(orig_width, orig_height)
-        wx_img.SetData(self.image.convert('RGB').tobytes())
+        wx_img.SetData(rgb)
 
-        if copy_alpha and (self.image.mode[-1] == 'A'):
-            alpha = self.image.getchannel("A").tobytes()
+        if copy_alpha and alpha is not None:
             wx_img.InitAlpha()
-            for i in range(orig_width):
-                for j in range(orig_height):
-                    wx_img.SetAlpha(i, j, alpha[i + j * orig_width])
+            wx_img.SetAlpha(alpha)
         return wx_img
 
-    def __saveInTempFile(self):
-        """Create temporary image file
+    def __getDisplayData(self):
+        """Return the pixel data in the layout expected by wx.Image
 
         Returns
         -------
-        string
-            path to temporary image file
+        tuple of bytes
+            packed RGB data and alpha data (None if there is no alpha)
         """
-        filename = os.path.join(tempfile.gettempdir(),
-            "jes4py_" + next(tempfile._get_candidate_names()) + self.extension)
-        #tempdir = tempfile.mkdtemp()
-        #filename = os.path.join(tempdir, "showimage" + self.extension)
-        #os.mkdir(tempdir)
-        self.write(filename)
-        return filename
+        if self.image.mode == "RGBA":
+            rgb = self.image.convert("RGB").tobytes()
+            alpha = self.image.getchannel("A").tobytes()
+            return rgb, alpha
+        return self.image.tobytes(), None
 
     def __runScript(self, script, *argv):
         """Run a Python script in a subprocess
@@ -851,11 +2180,18 @@ class Picture:
         """Send pickled self object to "show" process
         """
         pic = Picture(self)
-        pkg = pickle.dumps(pic)
+        buffers = []
+        pkg = pickle.dumps(pic, protocol=5, buffer_callback=buffers.append)
         pkgSize = len(pkg).to_bytes(8, byteorder='big')
         self.process.stdin.write(self.show_control_data)
         self.process.stdin.write(pkgSize)
         self.process.stdin.write(pkg)
+        # the pixels follow the pickle rather than being copied into it
+        self.process.stdin.write(len(buffers).to_bytes(8, byteorder='big'))
+        for buffer in buffers:
+            data = buffer.raw()
+            self.process.stdin.write(data.nbytes.to_bytes(8, byteorder='big'))
+            self.process.stdin.write(data)
         self.process.stdin.flush()
 
     def show(self):
@@ -884,6 +2220,311 @@ class Picture:
 
     def pictureTool(self):
         """Explore a picture using a stand-alone Python script
+
+        The picture is sent to the script through its standard input as a
+        PPM image, which is quick to write and read and needs no file.
+        """
+        image = self.image
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        process = self.__runScript('pictureTool.py', '-', self.title)
+        _saveImage(image, process.stdin, "ppm")
+        process.stdin.close()
+
+class _BandPicture(Picture):
+    """A band of rows of a larger picture, used by Picture.mapPixels
+
+    The levels are read and written in place, in the shared memory block
+    holding the whole picture.  Pixel coordinates are those of the full
+    picture, so a band starting at row top holds rows top, top+1, ... of
+    the original.
+    """
+
+    def __init__(self, levels, top):
+        """Initializer for _BandPicture class
+
+        Parameters
+        ----------
+        levels : numpy.ndarray
+            uint8 array of shape (rows, width, 3) viewing the band's levels
+        top : int
+            the row of the full picture held in the first row of levels
+        """
+        self.filename = self.title = 'None'
+        self._generation = 0
+        self._cache = {}
+        self.top = top
+        self.levels = levels
+        self._rowBytes = levels.shape[1] * 3
+        # indexing a flat memoryview is much faster than indexing levels
+        self._data = memoryview(levels).cast('B')
+
+    def release(self):
+        """Drop this band's views of the levels"""
+        self._data.release()
+        self.levels = None
+
+    def _getRGB(self, x, y):
+        i = (y - self.top) * self._rowBytes + 3 * x
+        data = self._data
+        return (data[i], data[i + 1], data[i + 2])
+
+    def _setRGB(self, x, y, rgb):
+        i = (y - self.top) * self._rowBytes + 3 * x
+        self._data[i:i + 3] = bytes(rgb)
+
+class _PictureView(Picture):
+    """A rectangular part of another picture, returned by Picture.view
+
+    The view holds no pixels of its own: reading and writing a pixel reads
+    and writes the pixel of the parent picture at the same place,
+    translated by the view's position.  Operations on whole regions
+    (filters, drawing, copyInto, ...) work on a copy of the view's
+    rectangle that is pasted back into the parent.  Changes made through
+    the parent are seen by the view and vice versa.
+
+    Attributes
+    ----------
+    parent : Picture
+        the picture holding the pixels
+    left, top : int
+        the position of the view's upper-left corner in the parent
+    width, height : int
+        the size of the view
+    """
+
+    def __init__(self, parent, left, top, width, height):
+        """Initializer for _PictureView class
+
+        Parameters
+        ----------
+        parent : Picture
+            the picture holding the pixels
+        left, top : int
+            the position of the view's upper-left corner in the parent
+        width, height : int
+            the size of the view; the view must lie within the parent
+        """
+        self.filename = parent.filename
+        self.title = parent.title
+        self._cache = {}
+        self.parent = parent
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+    def __reduce_ex__(self, protocol):
+        """Pickle a view as an ordinary picture holding a copy of its pixels
+
+        Parameters
+        ----------
+        protocol : int
+            the pickle protocol in use
+
+        Returns
+        -------
+        tuple
+            the reduce value described in the pickle documentation
+        """
+        state = Picture(self).__getstate__()
+        image = state.pop('image')
+        pixels = image.tobytes()
+        if protocol >= 5:
+            pixels = pickle.PickleBuffer(pixels)
+        return (_unpicklePicture, (Picture, image.mode, image.size, pixels,
+                                   state))
+
+    @property
+    def _generation(self):
+        """int : the generation counter, shared with the parent
+
+        Changes made through the parent also invalidate values cached
+        for the view, and the other way around.
+        """
+        return self.parent._generation
+
+    @_generation.setter
+    def _generation(self, generation):
+        self.parent._generation = generation
+
+    @property
+    def image(self):
+        """PIL.Image.Image : a new image holding the pixels of the view
+
+        Changing the returned image does not change the picture; setting
+        this property copies an image of the same size into the parent.
+        """
+        return self._getRegion(0, 0, self.width, self.height)
+
+    @image.setter
+    def image(self, image):
+        if image.size != (self.width, self.height):
+            print("The size of a view cannot be changed")
+            raise ValueError
+        self._pasteImage(image, 0, 0)
+
+    def _shareImage(self, other):
+        """Copy the pixels of another picture of the same size into the view
+
+        Parameters
+        ----------
+        other : Picture
+            the picture whose pixels are copied
+        """
+        self.image = other.image
+        self._markChanged()
+
+    def _getWritableImage(self):
+        """Views cannot be modified through a single image
+
+        Raises
+        ------
+        ValueError
+            always; the view's pixels belong to its parent
+        """
+        print("A view cannot be modified through a PIL image")
+        raise ValueError
+
+    @contextlib.contextmanager
+    def _drawing(self):
+        """Give a PIL ImageDraw object drawing on a copy of the view
+
+        The copy is pasted back into the parent afterwards, so nothing is
+        drawn outside the view.
+
+        Yields
+        ------
+        PIL.ImageDraw.ImageDraw
+            the object to draw with, valid only inside the with statement
+        """
+        region = self.image
+        yield PIL.ImageDraw.Draw(region)
+        self._pasteImage(region, 0, 0)
+
+    def getImage(self):
+        """Return a new PIL Image holding the pixels of the view
+
+        Returns
+        -------
+        PIL.Image.Image
+            a copy of the view's pixels (changes to it are not reflected
+            in the picture)
+        """
+        return self.image
+
+    def getWidth(self):
+        """Return the width of this view
+
+        Returns
+        -------
+        int
+            number of pixels in a row of this view
+        """
+        return self.width
+
+    def getHeight(self):
+        """Return the height of this view
+
+        Returns
+        -------
+        int
+            number of pixels in a column of this view
+        """
+        return self.height
+
+    def getPixel(self, x, y):
+        """Return the pixel at specified coordinates of the view
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel within the view
+
+        Returns
+        -------
+        Pixel
+            the pixel at (x,y) in this view
+        """
+        return Pixel(None, x, y, self)
+
+    def getPixels(self):
+        """Return list of pixels contained in the view
+
+        Pixels are listed row-by-row.
+
+        Returns
+        -------
+        list of Pixel
+            list of pixels in this view
+        """
+        return [Pixel(None, x, y, self)
+                for y in range(self.height) for x in range(self.width)]
+
+    def _getRGB(self, x, y):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            raise IndexError("image index out of range")
+        return self.parent._getRGB(x + self.left, y + self.top)
+
+    def _setRGB(self, x, y, rgb):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            raise IndexError("image index out of range")
+        self.parent._setRGB(x + self.left, y + self.top, rgb)
+
+    def _clip(self, x, y, width, height):
+        """Return the part of a rectangle lying within the view
+
+        Returns
+        -------
+        tuple of int
+            the left, upper, right and lower edges of the part
+        """
+        left, upper = max(x, 0), max(y, 0)
+        right = max(left, min(x + width, self.width))
+        lower = max(upper, min(y + height, self.height))
+        return left, upper, right, lower
+
+    def _getRegion(self, x, y, width, height):
+        """Return a copy of a rectangular region of this view
+
+        Parts of the region outside the view are black.
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        PIL.Image.Image
+            a new image holding the pixels in the region
+        """
+        left, upper, right, lower = self._clip(x, y, width, height)
+        part = self.parent._getRegion(left + self.left, upper + self.top,
+                                      right - left, lower - upper)
+        if part.size == (width, height):
+            return part
+        region = PIL.Image.new(part.mode, (width, height))
+        region.paste(part, (left - x, upper - y))
+        return region
+
+    def _pasteImage(self, image, x, y):
+        """Copy the pixels of an image into the parent through this view
+
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            the image to copy; parts outside the view are ignored
+        x, y : int
+            the coordinates in the view where the upper-left corner of
+            image goes
         """
-        filename = self.__saveInTempFile()
-        self.__runScript('pictureTool.py', filename, self.title)
+        left, upper, right, lower = self._clip(x, y, image.width,
+                                               image.height)
+        if right <= left or lower <= upper:
+            return
+        if (right - left, lower - upper) != image.size:
+            image = image.crop((left - x, upper - y, right - x, lower - y))
+        self.parent._pasteImage(image, left + self.left, upper + self.top)
@@ -16,7 +16,7 @@ class Pixel:
 
     wrapLevels = False
 
-    def __init__(self, image=None, x=None, y=None):
+    def __init__(self, image=None, x=None, y=None, picture=None):
         """Pixel constructor
 
         Parameters
@@ -27,13 +27,42 @@ class Pixel:
             column of the pixel
         y : int
             row of the pixel
+        picture : Picture
+            picture the pixel belongs to; when given, levels are read and
+            written through the picture rather than directly on the image
         """
         self.wrapLevels = Config.getConfigVal("CONFIG_WRAPPIXELVALUES")
         self.image = image
+        self.picture = picture
         self.x = x
         self.y = y
         #self.color = color
 
+    def _getRGB(self):
+        """Return the red, green and blue levels of this pixel
+
+        Returns
+        -------
+        tuple of int
+            the (red, green, blue) levels
+        """
+        if self.picture is not None:
+            return self.picture._getRGB(self.x, self.y)
+        return self.image.getpixel((self.x, self.y))
+
+    def _setRGB(self, rgb):
+        """Set the red, green and blue levels of this pixel
+
+        Parameters
+        ----------
+        rgb : tuple of int
+            the new (red, green, blue) levels, already within [0..255]
+        """
+        if self.picture is not None:
+            self.picture._setRGB(self.x, self.y, rgb)
+        else:
+            self.image.putpixel((self.x, self.y), rgb)
+
     def __str__(self):
         """Return string with pixel contents
 
@@ -42,7 +71,7 @@ class Pixel:
         str
             user-readable pixel information
         """
-        rgb = self.image.getpixel((self.x, self.y))
+        rgb = self._getRGB()
         return "Pixel red={} green={} blue={}".format(rgb[0], rgb[1], rgb[2])
 
     def __repr__(self):
@@ -93,8 +122,7 @@ class Pixel:
         int
             red level in pixel
         """
-        rgb = self.image.getpixel((self.x, self.y))
-        return rgb[0]
+        return self._getRGB()[0]
 
     def getGreen(self):
         """Return green level in pixel
@@ -104,8 +132,7 @@ class Pixel:
         int
             green level in pixel
         """
-        rgb = self.image.getpixel((self.x, self.y))
-        return rgb[1]
+        return self._getRGB()[1]
 
     def getBlue(self):
         """Return blue level in pixel
@@ -115,8 +142,7 @@ class Pixel:
         int
             blue level in pixel
         """
-        rgb = self.image.getpixel((self.x, self.y))
-        return rgb[2]
+        return self._getRGB()[2]
 
     def getAverage(self):
         """Return the average of the color values of this pixel
@@ -126,7 +152,7 @@ class Pixel:
         int
             rounded average of red, green, and blue pixel values
         """
-        rgb = self.image.getpixel((self.x, self.y))
+        rgb = self._getRGB()
         return round((rgb[0] + rgb[1] + rgb[2]) / 3.0)
     
     def setAlpha(self, value):
@@ -149,9 +175,8 @@ class Pixel:
             red level for pixel
         """
         value = Pixel.correctLevel(value)
-        color = Color(self.image.getpixel((self.x, self.y)))
-        newColor = (value, color.getGreen(), color.getBlue())
-        self.image.putpixel((self.x, self.y), newColor)
+        rgb = self._getRGB()
+        self._setRGB((value, rgb[1], rgb[2]))
 
     def setGreen(self, value):
         """Set green level in the pixel
@@ -162,9 +187,8 @@ class Pixel:
             green level for pixel
         """
         value = Pixel.correctLevel(value)
-        color = Color(self.image.getpixel((self.x, self.y)))
-        newColor = (color.getRed(), value, color.getBlue())
-        self.image.putpixel((self.x, self.y), newColor)
+        rgb = self._getRGB()
+        self._setRGB((rgb[0], value, rgb[2]))
 
     def setBlue(self, value):
         """Set blue level in the pixel
@@ -175,9 +199,8 @@ class Pixel:
             blue level for pixel
         """
         value = Pixel.correctLevel(value)
-        color = Color(self.image.getpixel((self.x, self.y)))
-        newColor = (color.getRed(), color.getGreen(), value)
-        self.image.putpixel((self.x, self.y), newColor)
+        rgb = self._getRGB()
+        self._setRGB((rgb[0], rgb[1], value))
 
     def colorDistance(self, testColor):
         """Computes the Euclidean distance norm between this pixel and a color
@@ -205,7 +228,7 @@ class Pixel:
         Color
             color object for the pixel
         """
-        return Color(self.image.getpixel((self.x, self.y)))
+        return Color(self._getRGB())
 
     def setColor(self, color):
         """Set the color of a pixel
@@ -215,7 +238,7 @@ class Pixel:
         color : Color
             color to assign to pixel
         """
-        self.image.putpixel((self.x, self.y), color.getRGB())
+        self._setRGB(color.getRGB())
 
     def setColorFrom(self, otherPixel):
         """Set color of this pixel using color value from otherPixel
@@ -262,6 +285,11 @@ class Pixel:
         int
             corrected color level
         """
+        if not isinstance(level, (int, float)):
+            # traced values (see Vectorizer) correct all their levels at once
+            correct = getattr(level, "_correctLevels", None)
+            if correct is not None:
+                return correct(cls.wrapLevels)
         level = int(level)
         if cls.wrapLevels:
             return level % 256
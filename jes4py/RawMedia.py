@@ -0,0 +1,371 @@
+"""
+RawMedia.py - read and write pictures and sounds in jes4py's raw formats
+
+A .jpic file holds a picture and a .jsnd file holds a sound.  Each is a
+small fixed-size header followed by the pixel or sample data exactly as
+jes4py stores it in memory, either as is or compressed with zlib.  They
+are meant for handing intermediate results from one program (or stage
+of a pipeline) to the next: unlike JPEG they lose nothing, and unlike PNG
+or WAV writing and reading them costs little more than copying the data.
+
+Files are read through a memory map, so the data goes from the operating
+system's file cache straight into the picture or sound.
+
+Picture header (16 bytes, little-endian):
+    magic b"JPIC", version, compression, channels (3 = RGB, 4 = RGBA),
+    one padding byte, width (uint32), height (uint32)
+
+Sound header (20 bytes, little-endian):
+    magic b"JSND", version, compression, channels, bytes per sample,
+    sample rate (uint32), number of frames (uint64)
+"""
+
+import contextlib
+import mmap
+import os
+import struct
+import zlib
+import PIL.Image
+
+PICTURE_EXTENSION = ".jpic"
+SOUND_EXTENSION = ".jsnd"
+
+VERSION = 1
+
+# Values of the compression field
+UNCOMPRESSED = 0
+ZLIB = 1
+
+_PICTURE_HEADER = struct.Struct("<4sBBBxII")
+_SOUND_HEADER = struct.Struct("<4sBBBBIQ")
+_MODES = {3: "RGB", 4: "RGBA"}
+
+def _unpackHeader(data, header, magic, name):
+    """Unpack and check the header of raw data
+
+    Parameters
+    ----------
+    data : memoryview
+        the raw data
+    header : struct.Struct
+        the layout of the header
+    magic : bytes
+        the bytes the data must start with
+    name : str
+        the name of the file holding the data (for error messages)
+
+    Returns
+    -------
+    tuple
+        the fields of the header after magic and version
+    """
+    if len(data) < header.size or data[:4] != magic:
+        raise ValueError("{} is not a .{} file".format(name,
+                                                       magic.decode().lower()))
+    fields = header.unpack_from(data)
+    if fields[1] != VERSION:
+        raise ValueError("{} has unsupported version {}".format(name,
+                                                                fields[1]))
+    return fields[2:]
+
+@contextlib.contextmanager
+def _payload(data, offset, size, compression, name):
+    """Give access to the pixel or sample data following a header
+
+    Parameters
+    ----------
+    data : memoryview
+        the raw data
+    offset : int
+        the size of the header
+    size : int
+        the number of bytes of pixel or sample data
+    compression : int
+        UNCOMPRESSED or ZLIB
+    name : str
+        the name of the file holding the data (for error messages)
+
+    Yields
+    ------
+    bytes-like
+        the pixel or sample data, valid only inside the with statement
+    """
+    if compression == ZLIB:
+        with data[offset:] as compressed:
+            payload = zlib.decompress(compressed)
+        if len(payload) != size:
+            raise ValueError(name + " is truncated")
+        yield payload
+    elif compression != UNCOMPRESSED:
+        raise ValueError("{} has unknown compression {}".format(name,
+                                                                compression))
+    elif len(data) < offset + size:
+        raise ValueError(name + " is truncated")
+    else:
+        with data[offset:offset + size] as payload:
+            yield payload
+
+@contextlib.contextmanager
+def _mapFile(fileName):
+    """Give access to the contents of a file through a memory map
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the file
+
+    Yields
+    ------
+    memoryview
+        the contents of the file, valid only inside the with statement
+    """
+    with open(fileName, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            with memoryview(mapping) as data:
+                yield data
+
+def _compress(data, compressLevel):
+    """Return the compression field and the data to write
+
+    Parameters
+    ----------
+    data : bytes-like
+        the pixel or sample data
+    compressLevel : int
+        None or 0 to store the data as is, 1 (fastest) to 9 (smallest
+        file) to compress it with zlib
+
+    Returns
+    -------
+    tuple
+        the compression field and the (possibly compressed) data
+    """
+    if not compressLevel:
+        return UNCOMPRESSED, data
+    return ZLIB, zlib.compress(data, compressLevel)
+
+def isPicture(data):
+    """Tell whether raw data holds a .jpic picture
+
+    Parameters
+    ----------
+    data : bytes-like
+        the data
+
+    Returns
+    -------
+    bool
+        True if data starts like a .jpic file
+    """
+    return bytes(data[:4]) == b"JPIC"
+
+def isSound(data):
+    """Tell whether raw data holds a .jsnd sound
+
+    Parameters
+    ----------
+    data : bytes-like
+        the data
+
+    Returns
+    -------
+    bool
+        True if data starts like a .jsnd file
+    """
+    return bytes(data[:4]) == b"JSND"
+
+def decodePicture(data, name="data"):
+    """Make an image from the contents of a .jpic file
+
+    Parameters
+    ----------
+    data : bytes-like
+        the contents of the file
+    name : str
+        the name of the file (for error messages)
+
+    Returns
+    -------
+    PIL.Image.Image
+        the image, in RGB or RGBA mode
+    """
+    with memoryview(data) as data:
+        compression, channels, width, height = _unpackHeader(
+            data, _PICTURE_HEADER, b"JPIC", name)
+        if channels not in _MODES:
+            raise ValueError("{} has unsupported channel count {}".format(
+                name, channels))
+        with _payload(data, _PICTURE_HEADER.size, width * height * channels,
+                      compression, name) as pixels:
+            return PIL.Image.frombytes(_MODES[channels], (width, height),
+                                       pixels)
+
+def _encodePicture(image, compressLevel):
+    """Return the header and pixel data of a .jpic file
+
+    Parameters
+    ----------
+    image : PIL.Image.Image
+        the image, in RGB or RGBA mode
+    compressLevel : int
+        as for encodePicture()
+
+    Returns
+    -------
+    tuple of bytes
+        the header and the (possibly compressed) pixel data
+    """
+    compression, data = _compress(image.tobytes(), compressLevel)
+    header = _PICTURE_HEADER.pack(b"JPIC", VERSION, compression,
+                                  len(image.getbands()), image.width,
+                                  image.height)
+    return header, data
+
+def encodePicture(image, compressLevel=None):
+    """Return the contents of a .jpic file holding an image
+
+    Parameters
+    ----------
+    image : PIL.Image.Image
+        the image, in RGB or RGBA mode
+    compressLevel : int
+        None or 0 to store the pixels as is, 1 (fastest) to 9 (smallest
+        file) to compress them with zlib
+
+    Returns
+    -------
+    bytes
+        the contents of the file
+    """
+    return b"".join(_encodePicture(image, compressLevel))
+
+def readPicture(fileName):
+    """Read an image from a .jpic file
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the file
+
+    Returns
+    -------
+    PIL.Image.Image
+        the image, in RGB or RGBA mode
+    """
+    with _mapFile(fileName) as data:
+        return decodePicture(data, fileName)
+
+def writePicture(fileName, image, compressLevel=None):
+    """Write an image to a .jpic file
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the file
+    image : PIL.Image.Image
+        the image, in RGB or RGBA mode
+    compressLevel : int
+        as for encodePicture()
+    """
+    with open(fileName, "wb") as file:
+        file.writelines(_encodePicture(image, compressLevel))
+
+def decodeSound(data, name="data"):
+    """Get the sample data from the contents of a .jsnd file
+
+    Parameters
+    ----------
+    data : bytes-like
+        the contents of the file
+    name : str
+        the name of the file (for error messages)
+
+    Returns
+    -------
+    tuple
+        the sample data (bytearray), number of frames, number of channels,
+        bytes per sample and sampling rate
+    """
+    with memoryview(data) as data:
+        compression, numChannels, sampleWidth, sampleRate, numFrames = \
+            _unpackHeader(data, _SOUND_HEADER, b"JSND", name)
+        size = numFrames * numChannels * sampleWidth
+        with _payload(data, _SOUND_HEADER.size, size, compression,
+                      name) as samples:
+            buffer = bytearray(samples)
+    return buffer, numFrames, numChannels, sampleWidth, sampleRate
+
+def _encodeSound(buffer, numFrames, numChannels, sampleWidth, sampleRate,
+                 compressLevel):
+    """Return the header and sample data of a .jsnd file
+
+    Parameters
+    ----------
+    buffer, numFrames, numChannels, sampleWidth, sampleRate, compressLevel
+        as for encodeSound()
+
+    Returns
+    -------
+    tuple of bytes-like
+        the header and the (possibly compressed) sample data
+    """
+    compression, data = _compress(buffer, compressLevel)
+    header = _SOUND_HEADER.pack(b"JSND", VERSION, compression, numChannels,
+                                sampleWidth, sampleRate, numFrames)
+    return header, data
+
+def encodeSound(buffer, numFrames, numChannels, sampleWidth, sampleRate,
+                compressLevel=None):
+    """Return the contents of a .jsnd file holding sample data
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        the sample data
+    numFrames, numChannels, sampleWidth, sampleRate : int
+        the format of the sample data
+    compressLevel : int
+        None or 0 to store the samples as is, 1 (fastest) to 9 (smallest
+        file) to compress them with zlib
+
+    Returns
+    -------
+    bytes
+        the contents of the file
+    """
+    return b"".join(_encodeSound(buffer, numFrames, numChannels, sampleWidth,
+                                 sampleRate, compressLevel))
+
+def readSound(fileName):
+    """Read sample data from a .jsnd file
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the file
+
+    Returns
+    -------
+    tuple
+        as for decodeSound()
+    """
+    with _mapFile(fileName) as data:
+        return decodeSound(data, fileName)
+
+def writeSound(fileName, buffer, numFrames, numChannels, sampleWidth,
+               sampleRate, compressLevel=None):
+    """Write sample data to a .jsnd file
+
+    Parameters
+    ----------
+    fileName : str
+        the name of the file
+    buffer, numFrames, numChannels, sampleWidth, sampleRate, compressLevel
+        as for encodeSound()
+    """
+    with open(fileName, "wb") as file:
+        file.writelines(_encodeSound(buffer, numFrames, numChannels,
+                                     sampleWidth, sampleRate, compressLevel))
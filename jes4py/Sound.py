@@ -1,11 +1,41 @@
 #import os, sys
 import simpleaudio as sa
-# import numpy as np
+import numpy as np
 import wave
+import os
+import io
+import sys
+import pickle
 from jes4py import Config
+from jes4py import Writer
+from jes4py import RawMedia
 from jes4py.SoundSample import SoundSample
 #import FileChooser
 
+def _unpickleSound(cls, buffer, state):
+    """Rebuild a sound pickled with protocol 5
+
+    Parameters
+    ----------
+    cls : type
+        the class of the sound
+    buffer : bytes-like
+        the sample data
+    state : dict
+        the other attributes, as returned by Sound.__getstate__
+
+    Returns
+    -------
+    Sound
+        the rebuilt sound
+    """
+    sound = cls.__new__(cls)
+    sound.__dict__.update(state)
+    if not isinstance(buffer, bytearray):
+        buffer = bytearray(buffer)
+    sound.buffer = buffer
+    return sound
+
 class Sound:
     MAX_NEG = -32768
     MAX_POS = 32767
@@ -37,7 +67,7 @@ class Sound:
         Parameters
         ----------
         sound : str
-            the filename of containing a sound in WAV format
+            the filename of containing a sound in WAV or .jsnd format
         sound : int
             the number of samples in the sound
         sound : Sound
@@ -46,14 +76,7 @@ class Sound:
             the frame rate for the sound
         """
         if isinstance(sound, str):
-            self.filename = sound
-            waveRead = wave.open(self.filename, 'rb')
-            self.numFrames = waveRead.getnframes()
-            self.numChannels = waveRead.getnchannels()
-            self.sampleWidth = waveRead.getsampwidth()
-            self.sampleRate = waveRead.getframerate()
-            self.buffer = bytearray(waveRead.readframes(self.numFrames))
-            waveRead.close()
+            self.loadFromFile(sound)
         elif isinstance(sound, int):
             self.filename = ''
             self.numFrames = sound
@@ -68,9 +91,47 @@ class Sound:
             self.numChannels = sound.numChannels
             self.sampleWidth = sound.sampleWidth
             self.sampleRate = sound.sampleRate
-            self.buffer = sound.buffer.copy()
+            self.buffer = bytearray(sound.buffer)
         self.playbacks = []
 
+    def __getstate__(self):
+        """Return the state to pickle, leaving out playbacks
+
+        Returns
+        -------
+        dict
+            the sound attributes worth sending to another process
+        """
+        state = self.__dict__.copy()
+        state['playbacks'] = []
+        if not isinstance(self.buffer, bytearray):
+            # a view sends a copy of its samples
+            state['buffer'] = bytearray(self.buffer)
+        return state
+
+    def __reduce_ex__(self, protocol):
+        """Reduce this sound for pickling
+
+        With protocol 5 the samples are handed to pickle as a PickleBuffer,
+        so they can be sent out-of-band (see the buffer_callback argument
+        of pickle.dumps) instead of being copied into the pickle.
+
+        Parameters
+        ----------
+        protocol : int
+            the pickle protocol in use
+
+        Returns
+        -------
+        tuple
+            the reduce value described in the pickle documentation
+        """
+        if protocol < 5:
+            return object.__reduce_ex__(self, protocol)
+        state = self.__getstate__()
+        buffer = pickle.PickleBuffer(state.pop('buffer'))
+        return (_unpickleSound, (type(self), buffer, state))
+
     def __str__(self):
         """Return string representation of this sound
 
@@ -104,6 +165,58 @@ class Sound:
         """
         return self.buffer
 
+    def _sampleLayout(self):
+        """Describe the sample data as an array
+
+        Returns
+        -------
+        tuple
+            the memoryview format, the NumPy type string and the shape of
+            the samples; the shape is (frames,) for mono sounds and
+            (frames, channels) for stereo ones.  Samples of a width with
+            no matching integer type are described as their bytes, with
+            one more dimension.
+        """
+        shape = (self.numFrames,)
+        if self.numChannels != 1:
+            shape += (self.numChannels,)
+        formats = {1: 'b', 2: 'h', 4: 'i'}
+        if self.sampleWidth in formats and sys.byteorder == 'little':
+            return (formats[self.sampleWidth],
+                    '<i{}'.format(self.sampleWidth), shape)
+        return 'B', '|u1', shape + (self.sampleWidth,)
+
+    @property
+    def __array_interface__(self):
+        """dict : lets numpy.asarray(sound) view the samples without copying
+
+        The array shares this sound's buffer, so changes made through
+        either one are seen by the other.
+        """
+        format, typestr, shape = self._sampleLayout()
+        return {'version': 3, 'shape': shape, 'typestr': typestr,
+                'data': self.buffer}
+
+    def __buffer__(self, flags):
+        """Return a writable memoryview of the samples (PEP 688)
+
+        Parameters
+        ----------
+        flags : int
+            the kind of buffer requested
+
+        Returns
+        -------
+        memoryview
+            the samples, shaped as described by _sampleLayout()
+        """
+        format, typestr, shape = self._sampleLayout()
+        view = memoryview(self.buffer)
+        if len(self.buffer) == 0:
+            # memoryview cannot take a shape with zeros
+            return view.cast(format)
+        return view.cast(format, shape)
+
 #    def getAudioFileFormat(self):
 #        return self.audioFileFormat # not yet defined
 
@@ -207,9 +320,46 @@ class Sound:
             the byte array that (self.buffer) is being replaced with
         """
         if isinstance(newBuffer, int):
-            self.buffer = bytearray(newBuffer)
-        elif isinstance(newBuffer, bytearray):
-            self.buffer = newBuffer.copy() #maybe not a copy?
+            newBuffer = bytearray(newBuffer)
+        if isinstance(newBuffer, bytearray):
+            if len(newBuffer) == len(self.buffer):
+                # copy into the current buffer so that arrays and
+                # memoryviews of this sound keep showing its samples
+                self.buffer[:] = newBuffer
+            else:
+                self.buffer = newBuffer.copy() #maybe not a copy?
+
+    def view(self, start, stop):
+        """Return a sound made of a range of this sound's frames
+
+        No samples are copied: the new sound's buffer is a memoryview of
+        this sound's buffer, so changing a sample of either sound changes
+        the other.  The view can be played, written and changed like any
+        other sound, but its length cannot change.
+
+        Parameters
+        ----------
+        start : int
+            the index of the first frame of the view
+        stop : int
+            the index just past the last frame of the view
+
+        Returns
+        -------
+        Sound
+            the view, whose frame 0 is frame start of this sound
+        """
+        if not 0 <= start <= stop <= self.numFrames:
+            raise ValueError("the view must lie within the sound")
+        frameSize = self.numChannels * self.sampleWidth
+        sound = Sound(0, self.sampleRate)
+        sound.filename = self.filename
+        sound.numChannels = self.numChannels
+        sound.sampleWidth = self.sampleWidth
+        sound.numFrames = stop - start
+        sound.buffer = memoryview(self.buffer)[start * frameSize:
+                                               stop * frameSize]
+        return sound
 
     # def setAudioFileFormat(self, audioFileFormat):
     #     self.audioFileFormat = audioFileFormat
@@ -422,6 +572,75 @@ class Sound:
             m = n + self.sampleWidth
             return int.from_bytes(self.buffer[n:m], byteorder='little', signed=True)    
 
+    def _getLevels(self):
+        """Return the first (left) sample of every frame as an array
+
+        Returns
+        -------
+        numpy.ndarray
+            a writable view of this sound's buffer, or None for samples
+            of a width with no matching integer type
+        """
+        format, typestr, shape = self._sampleLayout()
+        if format == 'B':
+            return None
+        levels = np.asarray(self)
+        if self.numChannels != 1:
+            levels = levels[:, 0]
+        return levels
+
+    def _frames(self, start, count):
+        """Return the frames to read or write, ready to index an array
+
+        Parameters
+        ----------
+        start : int or sequence of int
+            the first of count frames, or the list of frames
+        count : int
+            the number of frames from start, if start is an int
+
+        Returns
+        -------
+        slice or numpy.ndarray
+            the frames
+        """
+        if np.ndim(start) == 0:
+            return slice(start, start + count)
+        return np.asarray(start, dtype=np.intp)
+
+    def getSampleValues(self, start=0, stop=None, step=1):
+        """Return the values of many samples at once
+
+        Like getSampleValue(), reads the first (left) sample of each frame,
+        but all of them in one pass.
+
+        Parameters
+        ----------
+        start : int or sequence of int
+            the index of the first frame to read, or the indices of all
+            the frames to read (stop and step are then ignored)
+        stop : int
+            the index just past the last frame to read (default: the end
+            of the sound)
+        step : int
+            the distance between two frames read
+
+        Returns
+        -------
+        numpy.ndarray
+            a new array of int holding the sample values
+        """
+        if np.ndim(start) == 0:
+            frames = slice(start, stop, step)
+        else:
+            frames = self._frames(start, 0)
+        levels = self._getLevels()
+        if levels is None:
+            frames = np.arange(self.numFrames)[frames]
+            return np.array([self.getSampleValue(int(frame))
+                             for frame in frames], dtype=int)
+        return levels[frames].astype(int)
+
     def getLengthInBytes(self):
         """Obtains the length of this sound in bytes
         
@@ -536,6 +755,44 @@ class Sound:
                                               byteorder='little',
                                               signed=True)
 
+    def setSampleValues(self, start, values):
+        """Set the values of many samples at once
+
+        Like setSampleValue(), sets the first (left) sample of each frame,
+        but all of them in one pass.  Values outside of the range
+        [MAX_NEG, MAX_POS] are silently clipped to be within that range.
+
+        Parameters
+        ----------
+        start : int or sequence of int
+            the index of the frame where the first value goes, the others
+            going into the frames that follow, or the index of the frame
+            of each value
+        values : int, float, sequence or numpy.ndarray
+            the new sample values, or a single value for every frame from
+            start to the end of the sound (or for every frame listed in
+            start)
+        """
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            if not np.isfinite(values).all():
+                raise ValueError("sample values must be finite")
+            values = np.trunc(values)
+        count = values.size
+        if values.ndim == 0 and np.ndim(start) == 0:
+            count = self.numFrames - start
+        frames = self._frames(start, count)
+        levels = self._getLevels()
+        if levels is None:
+            frames = np.arange(self.numFrames)[frames]
+            values = np.broadcast_to(values, frames.shape)
+            for frame, value in zip(frames, values):
+                self.setSampleValue(int(frame), int(value))
+            return
+        limits = np.iinfo(levels.dtype)
+        levels[frames] = np.clip(values, max(self.MAX_NEG, limits.min),
+                                 min(self.MAX_POS, limits.max))
+
     def setFileName(self, filename):
         """Set sound's file name
 
@@ -556,10 +813,24 @@ class Sound:
         Parameters
         ----------
         inFileName : str
-            the name of the file to read the sound in from
+            the name of the file to read the sound in from (WAV or .jsnd)
         """
         self.filename = inFileName
-        waveRead = wave.open(self.filename, 'rb')
+        if os.path.splitext(inFileName)[1].lower() == RawMedia.SOUND_EXTENSION:
+            (self.buffer, self.numFrames, self.numChannels, self.sampleWidth,
+             self.sampleRate) = RawMedia.readSound(inFileName)
+        else:
+            self._readWave(inFileName)
+
+    def _readWave(self, file):
+        """Reset the fields of this sound from a wav file
+
+        Parameters
+        ----------
+        file : str or file object
+            the name of the file, or a file open for reading in binary mode
+        """
+        waveRead = wave.open(file, 'rb')
         self.numFrames = waveRead.getnframes()
         self.numChannels = waveRead.getnchannels()
         self.sampleWidth = waveRead.getsampwidth()
@@ -567,6 +838,86 @@ class Sound:
         self.buffer = bytearray(waveRead.readframes(self.numFrames))
         waveRead.close()
 
+    def toBytes(self, format="wav", compressLevel=None):
+        """Return the contents of a sound file holding this sound
+
+        Parameters
+        ----------
+        format : str
+            "wav" or "jsnd"
+        compressLevel : int
+            as for writeToFile(), used for "jsnd" only
+
+        Returns
+        -------
+        bytes
+            the contents of the file
+        """
+        params = (self.numFrames, self.numChannels, self.sampleWidth,
+                  self.sampleRate)
+        if format.lower() == "jsnd":
+            return RawMedia.encodeSound(self.buffer, *params, compressLevel)
+        if format.lower() != "wav":
+            raise ValueError("format must be 'wav' or 'jsnd'")
+        file = io.BytesIO()
+        Sound._writeWave(file, self.buffer, *params)
+        return file.getvalue()
+
+    @staticmethod
+    def fromBytes(data):
+        """Make a sound from the contents of a wav or .jsnd file
+
+        Parameters
+        ----------
+        data : bytes-like
+            the contents of the file
+
+        Returns
+        -------
+        Sound
+            the new sound
+        """
+        sound = Sound(0)
+        if RawMedia.isSound(data):
+            (sound.buffer, sound.numFrames, sound.numChannels,
+             sound.sampleWidth, sound.sampleRate) = RawMedia.decodeSound(data)
+        else:
+            sound._readWave(io.BytesIO(data))
+        return sound
+
+    @staticmethod
+    def fromBuffer(data, sampleRate=SAMPLE_RATE, numChannels=1,
+                   sampleWidth=NUM_BITS_PER_SAMPLE // 8):
+        """Make a sound from raw sample data
+
+        Parameters
+        ----------
+        data : bytes-like
+            the samples as signed little-endian integers; for stereo
+            sounds the left and right samples of each frame alternate
+        sampleRate : int
+            the number of frames per second
+        numChannels : int
+            1 for mono, 2 for stereo
+        sampleWidth : int
+            the number of bytes in each sample
+
+        Returns
+        -------
+        Sound
+            the new sound; its samples are a copy of data
+        """
+        with memoryview(data) as view, view.cast("B") as samples:
+            frameSize = numChannels * sampleWidth
+            if len(samples) % frameSize != 0:
+                raise ValueError("data does not hold a whole number of frames")
+            sound = Sound(0, sampleRate)
+            sound.numChannels = numChannels
+            sound.sampleWidth = sampleWidth
+            sound.numFrames = len(samples) // frameSize
+            sound.buffer = bytearray(samples)
+        return sound
+
     def write(self, fileName):
         """Write the sound to a wav file and throw an error if it can't be written
  
@@ -580,23 +931,64 @@ class Sound:
         except IOError:
             print("Couldn't write file to " + fileName)
 
-    def writeToFile(self, outFileName):
-        """Write the sound to a wav file
+    def writeToFile(self, outFileName, asynchronous=False, compressLevel=None):
+        """Write the sound to a wav file, or a .jsnd file if outFileName
+           ends with .jsnd
  
         Parameters
         ----------
         outFileName : str
             the name of the file to write the sound to
+        asynchronous : bool
+            False to write the file before returning, True to write it on
+            a background thread (see Writer).  The sound may be changed
+            right away; the file holds the samples as they were when this
+            method was called.
+        compressLevel : int
+            .jsnd compression from 0 (none, fastest) to 9 (smallest file);
+            .jsnd files are stored uncompressed by default
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            the future for the write when asynchronous is True
         """
         # Append the .wav extension if the filename doesn't have it
         # (Uncomment the next two lines to implement this functionality)
         # if not outFileName.endswith(".wav"):
         #     outFileName = outFileName+".wav"
 
+        params = (self.numFrames, self.numChannels, self.sampleWidth,
+                  self.sampleRate)
+        write = Sound._writeWave
+        if os.path.splitext(outFileName)[1].lower() == RawMedia.SOUND_EXTENSION:
+            write = RawMedia.writeSound
+            params += (compressLevel,)
+        if asynchronous:
+            return Writer.submit(write, outFileName, bytes(self.buffer),
+                                 *params)
+        write(outFileName, self.buffer, *params)
+        return None
+
+    @staticmethod
+    def _writeWave(outFileName, buffer, numFrames, numChannels, sampleWidth,
+                   sampleRate):
+        """Write sample data to a wav file
+
+        Parameters
+        ----------
+        outFileName : str or file object
+            the name of the file to write, or a file open for writing in
+            binary mode
+        buffer : bytes-like
+            the sample data
+        numFrames, numChannels, sampleWidth, sampleRate : int
+            the format of the sample data
+        """
         file = wave.open(outFileName, "wb")
-        file.setnframes(self.numFrames)
-        file.setnchannels(self.numChannels)
-        file.setsampwidth(self.sampleWidth)
-        file.setframerate(self.sampleRate)
-        file.writeframes(self.buffer)
+        file.setnframes(numFrames)
+        file.setnchannels(numChannels)
+        file.setsampwidth(sampleWidth)
+        file.setframerate(sampleRate)
+        file.writeframes(buffer)
         file.close()
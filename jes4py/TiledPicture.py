@@ -0,0 +1,486 @@
+import copyreg
+import mmap
+import pickle
+import tempfile
+from collections import OrderedDict
+import PIL.Image
+from jes4py.Picture import Picture
+from jes4py.PixelColor import Pixel, Color
+
+class TiledPicture(Picture):
+    """Picture whose pixels are kept in tiles in a memory-mapped file
+
+    Ordinary pictures hold all their pixels in one in-memory image, which
+    limits their size.  A TiledPicture divides the picture into square tiles
+    stored in a temporary file.  At most a fixed budget of tiles is held
+    in memory as images; the least recently used tile is written back to
+    the file when another tile is needed.  The budget always covers a full
+    row of tiles so that a row-by-row loop over the pixels loads each tile
+    only once.
+
+    Attributes
+    ----------
+    TILE_SIZE : int
+        default width and height of a tile in pixels
+    CACHE_BYTES : int
+        default amount of memory used for tiles held in memory
+    """
+
+    TILE_SIZE = 256
+    CACHE_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, width, height, acolor=None, tileSize=TILE_SIZE,
+                 cacheBytes=CACHE_BYTES):
+        """Initializer for TiledPicture class
+
+        Parameters
+        ----------
+        width, height : int
+            the size of the picture
+        acolor : Color
+            the initial color of all pixels (default is white)
+        tileSize : int
+            the width and height of a tile
+        cacheBytes : int
+            the amount of memory to use for tiles held in memory
+        """
+        self.filename = self.title = 'None'
+        self._generation = 0
+        self._cache = {}
+        self.tileSize = int(tileSize)
+        self.cacheBytes = int(cacheBytes)
+        self._tileLoads = 0
+        self._allocate(int(width), int(height))
+        if acolor is None:
+            acolor = Color(255, 255, 255)
+        self._fill(acolor.getRGB())
+
+    def _allocate(self, width, height):
+        """Create the file holding the tiles for a picture of a given size
+
+        Parameters
+        ----------
+        width, height : int
+            the size of the picture
+        """
+        size = self.tileSize
+        self.width = width
+        self.height = height
+        self.tilesAcross = (width + size - 1) // size
+        self.tilesDown = (height + size - 1) // size
+        self._tileBytes = size * size * 3
+        self._file = tempfile.TemporaryFile(prefix="jes4py_")
+        self._file.truncate(self._tileBytes * self.tilesAcross * self.tilesDown)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._maxTiles = max(self.cacheBytes // self._tileBytes,
+                             self.tilesAcross + 1)
+        self._tiles = OrderedDict()
+        self._lastKey = None
+        self._lastTile = None
+
+    def _fill(self, rgb):
+        """Set every pixel in the picture to one color
+
+        Parameters
+        ----------
+        rgb : tuple of int
+            the (red, green, blue) levels to use
+        """
+        self._tiles.clear()
+        self._lastKey = self._lastTile = None
+        data = bytes(rgb) * (self.tileSize * self.tileSize)
+        for offset in range(0, len(self._map), self._tileBytes):
+            self._map[offset:offset + self._tileBytes] = data
+        self._markChanged()
+
+    def _readTile(self, key):
+        """Read a tile from the file
+
+        Parameters
+        ----------
+        key : int
+            the index of the tile, counting row by row
+
+        Returns
+        -------
+        PIL.Image.Image
+            a new image holding the pixels of the tile
+        """
+        offset = key * self._tileBytes
+        return PIL.Image.frombytes("RGB", (self.tileSize, self.tileSize),
+                                   self._map[offset:offset + self._tileBytes])
+
+    def _writeTile(self, key, tile):
+        """Write a tile back to the file
+
+        Parameters
+        ----------
+        key : int
+            the index of the tile, counting row by row
+        tile : PIL.Image.Image
+            the image holding the pixels of the tile
+        """
+        offset = key * self._tileBytes
+        self._map[offset:offset + self._tileBytes] = tile.tobytes()
+
+    def _getTile(self, key):
+        """Return the in-memory entry for a tile, loading it if necessary
+
+        Parameters
+        ----------
+        key : int
+            the index of the tile, counting row by row
+
+        Returns
+        -------
+        list
+            the tile image and a flag telling whether it has been modified
+        """
+        if key == self._lastKey:
+            return self._lastTile
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = [self._readTile(key), False]
+            self._tileLoads += 1
+            self._tiles[key] = tile
+            if len(self._tiles) > self._maxTiles:
+                oldKey, oldTile = self._tiles.popitem(last=False)
+                if oldTile[1]:
+                    self._writeTile(oldKey, oldTile[0])
+        else:
+            self._tiles.move_to_end(key)
+        self._lastKey = key
+        self._lastTile = tile
+        return tile
+
+    def _peekTile(self, key):
+        """Return a tile image without changing which tiles are in memory
+
+        Parameters
+        ----------
+        key : int
+            the index of the tile, counting row by row
+
+        Returns
+        -------
+        PIL.Image.Image
+            the image holding the pixels of the tile
+        """
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile[0]
+        return self._readTile(key)
+
+    def flush(self):
+        """Write all modified tiles held in memory back to the file
+        """
+        for key, tile in self._tiles.items():
+            if tile[1]:
+                self._writeTile(key, tile[0])
+                tile[1] = False
+        self._map.flush()
+
+    def _tilesInRegion(self, x, y, width, height):
+        """Generate the tiles overlapping a region of the picture
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Yields
+        ------
+        tuple
+            the tile index and the (left, upper, right, lower) box of the
+            overlap in picture coordinates
+        """
+        size = self.tileSize
+        left, upper = max(x, 0), max(y, 0)
+        right, lower = min(x + width, self.width), min(y + height, self.height)
+        if right <= left or lower <= upper:
+            return
+        for ty in range(upper // size, (lower + size - 1) // size):
+            for tx in range(left // size, (right + size - 1) // size):
+                box = (max(left, tx * size), max(upper, ty * size),
+                       min(right, (tx + 1) * size), min(lower, (ty + 1) * size))
+                yield ty * self.tilesAcross + tx, box
+
+    def __reduce_ex__(self, protocol):
+        """Reduce this picture for pickling
+
+        The tile file is pickled as is, so the picture is never assembled
+        in memory.  With protocol 5 it is handed to pickle as a
+        PickleBuffer over the memory map and can be sent out-of-band.
+
+        Parameters
+        ----------
+        protocol : int
+            the pickle protocol in use
+
+        Returns
+        -------
+        tuple
+            the reduce value described in the pickle documentation
+        """
+        self.flush()
+        state = {'filename': self.filename, 'title': self.title,
+                 'tileSize': self.tileSize, 'cacheBytes': self.cacheBytes,
+                 'width': self.width, 'height': self.height}
+        if protocol >= 5:
+            state['tiles'] = pickle.PickleBuffer(self._map)
+        else:
+            state['tiles'] = bytes(self._map)
+        return copyreg.__newobj__, (type(self),), state
+
+    def __setstate__(self, state):
+        """Restore a pickled picture into a new tile file
+
+        Parameters
+        ----------
+        state : dict
+            the attributes and tile data returned by __reduce_ex__
+        """
+        self.filename = state['filename']
+        self.title = state['title']
+        self.tileSize = state['tileSize']
+        self.cacheBytes = state['cacheBytes']
+        self._generation = 0
+        self._cache = {}
+        self._tileLoads = 0
+        self._allocate(state['width'], state['height'])
+        with memoryview(state['tiles']) as tiles:
+            self._map[:] = tiles.cast('B')
+
+    @property
+    def image(self):
+        """PIL.Image.Image : a new image holding all the pixels
+
+        The whole picture is assembled in memory, so this should only be
+        used when an image is really needed, e.g. to write a file.
+        Changing the returned image does not change the picture.
+        """
+        return self._getRegion(0, 0, self.width, self.height)
+
+    @image.setter
+    def image(self, image):
+        image = image.convert("RGB")
+        if image.size != (self.width, self.height):
+            self._allocate(image.width, image.height)
+        else:
+            self._tiles.clear()
+            self._lastKey = self._lastTile = None
+        self._pasteImage(image, 0, 0)
+
+    def _shareImage(self, other):
+        """Copy the pixels of another picture into this one
+
+        Parameters
+        ----------
+        other : Picture
+            the picture whose pixels are copied
+        """
+        self.image = other.image
+        self._markChanged()
+
+    def _getWritableImage(self):
+        """Tiled pictures cannot be modified through a single image
+
+        Raises
+        ------
+        ValueError
+            always; drawing is not supported on tiled pictures
+        """
+        print("Drawing is not supported on tiled pictures")
+        raise ValueError
+
+    def getImage(self):
+        """Return a new PIL Image holding all the pixels of this picture
+
+        Returns
+        -------
+        PIL.Image.Image
+            an image assembled from the tiles (changes to it are not
+            reflected in the picture)
+        """
+        return self.image
+
+    def getWidth(self):
+        """Return the width of this picture
+
+        Returns
+        -------
+        int
+            number of pixels in a row of this picture
+        """
+        return self.width
+
+    def getHeight(self):
+        """Return the height of this picture
+
+        Returns
+        -------
+        int
+            number of pixels in a column of this picture
+        """
+        return self.height
+
+    def setAllPixelsToAColor(self, acolor):
+        """Makes every pixel of the picture one color
+
+        Parameters
+        ----------
+        acolor : Color
+            the color for all the pixels
+        """
+        if not isinstance(acolor, Color):
+            print ("setAllPixelsToAColor(color): Input is not a color")
+            raise ValueError
+        self._fill(acolor.getRGB())
+
+    def getPixel(self, x, y):
+        """Return the pixel at specified coordinates
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel
+
+        Returns
+        -------
+        Pixel
+            the pixel at (x,y) in this picture
+        """
+        return Pixel(None, x, y, self)
+
+    def getPixels(self):
+        """Return list of pixels contained in picture
+
+        Pixels are listed row-by-row.
+
+        Returns
+        -------
+        list of Pixel
+            list of pixels in this picture
+        """
+        return [Pixel(None, x, y, self)
+                for y in range(self.height) for x in range(self.width)]
+
+    def _getRGB(self, x, y):
+        """Return the red, green and blue levels of a pixel
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel
+
+        Returns
+        -------
+        tuple of int
+            the (red, green, blue) levels of the pixel
+        """
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            raise IndexError("image index out of range")
+        size = self.tileSize
+        tile = self._getTile((y // size) * self.tilesAcross + x // size)
+        return tile[0].getpixel((x % size, y % size))
+
+    def _setRGB(self, x, y, rgb):
+        """Set the red, green and blue levels of a pixel
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the pixel
+        rgb : tuple of int
+            the new (red, green, blue) levels
+        """
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            raise IndexError("image index out of range")
+        size = self.tileSize
+        tile = self._getTile((y // size) * self.tilesAcross + x // size)
+        tile[0].putpixel((x % size, y % size), tuple(rgb[:3]))
+        tile[1] = True
+        self._generation += 1
+
+    def _getRegion(self, x, y, width, height):
+        """Return a copy of a rectangular region of this picture
+
+        Parts of the region outside the picture are black.
+
+        Parameters
+        ----------
+        x, y : int
+            the coordinates of the upper-left corner of the region
+        width, height : int
+            the size of the region
+
+        Returns
+        -------
+        PIL.Image.Image
+            a new image holding the pixels in the region
+        """
+        size = self.tileSize
+        region = PIL.Image.new("RGB", (width, height))
+        for key, box in self._tilesInRegion(x, y, width, height):
+            tx = (key % self.tilesAcross) * size
+            ty = (key // self.tilesAcross) * size
+            part = self._peekTile(key).crop((box[0] - tx, box[1] - ty,
+                                             box[2] - tx, box[3] - ty))
+            region.paste(part, (box[0] - x, box[1] - y))
+        return region
+
+    def _pasteImage(self, image, x, y):
+        """Copy the pixels of an image into this picture
+
+        Parameters
+        ----------
+        image : PIL.Image.Image
+            the image to copy; parts outside the picture are ignored
+        x, y : int
+            the coordinates where the upper-left corner of image goes
+        """
+        image = image.convert("RGB")
+        size = self.tileSize
+        for key, box in self._tilesInRegion(x, y, image.width, image.height):
+            tile = self._getTile(key)
+            part = image.crop((box[0] - x, box[1] - y, box[2] - x, box[3] - y))
+            tx = (key % self.tilesAcross) * size
+            ty = (key // self.tilesAcross) * size
+            tile[0].paste(part, (box[0] - tx, box[1] - ty))
+            tile[1] = True
+        self._markChanged()
+
+    def copyInto(self, dest, upperLeftX, upperLeftY):
+        """Returns a picture with the current picture copied into it
+
+        The copy is made one tile at a time, so the whole picture never
+        needs to be held in memory.  Pixels that would fall outside dest
+        are not copied.
+
+        Parameters
+        ----------
+        dest : Picture
+            the Picture that the current picture will be copied into
+        upperLeftX : int
+            the x-coord of the upper-left corner in dest where the current
+            picture will be copied
+        upperLeftY : int
+            the y-coord of the upper-left corner in dest where the current
+            picture will be copied
+
+        Returns
+        -------
+        Picture
+            the dest picture that has self copied into it
+        """
+        right = min(self.width, dest.getWidth() - upperLeftX)
+        lower = min(self.height, dest.getHeight() - upperLeftY)
+        left, upper = max(0, -upperLeftX), max(0, -upperLeftY)
+        for key, box in self._tilesInRegion(left, upper, right - left,
+                                            lower - upper):
+            part = self._getRegion(box[0], box[1],
+                                   box[2] - box[0], box[3] - box[1])
+            dest._pasteImage(part, box[0] + upperLeftX, box[1] + upperLeftY)
+        return dest
@@ -0,0 +1,414 @@
+"""
+Vectorizer.py - run per-pixel functions over whole pictures with NumPy
+
+Most pixel functions written for the Media Computation curriculum are
+straight-line arithmetic on the red, green and blue levels of a pixel,
+perhaps with a few if statements, e.g.
+
+    def posterize(pixel):
+        if getRed(pixel) < 128:
+            setRed(pixel, 0)
+        else:
+            setRed(pixel, 255)
+
+applyToPicture() calls such a function once with a traced pixel whose
+levels are arrays holding the levels of every pixel in the picture, so the
+arithmetic is done for the whole picture at once.  When the function tests
+a traced value (in an if, while, and, or, max(), ...) the tracer follows
+the True branch for the pixels where the test holds and, on a later run,
+the False branch for the others.  Each run records the levels its pixels
+end up with, and the runs are merged like nested numpy.where() calls.
+
+Functions the tracer cannot follow, e.g. ones converting a level with
+int() or math.sqrt(), reading other pixels or using too many branches, are
+instead called once per pixel exactly as a for loop over getPixels() would.
+The results are identical either way.
+"""
+
+import functools
+import numpy as np
+from jes4py.PixelColor import Pixel
+from jes4py.Picture import Picture
+
+# Largest number of branch combinations followed before giving up
+MAX_PATHS = 64
+
+# Largest number of tests made in one run of the function
+MAX_DECISIONS = 1000
+
+# Largest number of pixels traced at once (bounds the memory used)
+CHUNK_PIXELS = 1 << 20
+
+class _TraceError(Exception):
+    """Raised when a function cannot be traced"""
+    pass
+
+def _operand(value):
+    """Return the array or number to use for an operand of a traced value
+
+    Parameters
+    ----------
+    value : _Traced, int or float
+        the operand
+
+    Returns
+    -------
+    numpy.ndarray, int, float or NotImplemented
+        the value to compute with (booleans are treated as integers, as
+        Python does), or NotImplemented for unsupported operands
+    """
+    if isinstance(value, _Traced):
+        value = value.values
+        if value.dtype == bool:
+            value = value.astype(np.int64)
+        return value
+    if isinstance(value, (int, float)):
+        return value
+    return NotImplemented
+
+def _binary(op, divides=False):
+    """Make a method applying a binary operator to a traced value
+
+    If divides is True the other operand is a divisor and is checked
+    with _Tracer.checkDivisor() first.
+    """
+    def method(self, other):
+        other = _operand(other)
+        if other is NotImplemented:
+            return NotImplemented
+        if divides:
+            self.tracer.checkDivisor(other)
+        return _Traced(op(_operand(self), other), self.tracer)
+    return method
+
+def _reflected(op, divides=False):
+    """Make a method applying a reflected binary operator to a traced value
+
+    If divides is True the traced value is a divisor and is checked with
+    _Tracer.checkDivisor() first.
+    """
+    def method(self, other):
+        other = _operand(other)
+        if other is NotImplemented:
+            return NotImplemented
+        if divides:
+            self.tracer.checkDivisor(_operand(self))
+        return _Traced(op(other, _operand(self)), self.tracer)
+    return method
+
+class _Traced:
+    """A value computed for every traced pixel at once
+
+    Attributes
+    ----------
+    values : numpy.ndarray
+        one value per pixel
+    tracer : _Tracer
+        the tracer following the function that computes this value
+    """
+
+    __slots__ = ('values', 'tracer')
+
+    def __init__(self, values, tracer):
+        self.values = values
+        self.tracer = tracer
+
+    __add__ = _binary(np.add)
+    __radd__ = _reflected(np.add)
+    __sub__ = _binary(np.subtract)
+    __rsub__ = _reflected(np.subtract)
+    __mul__ = _binary(np.multiply)
+    __rmul__ = _reflected(np.multiply)
+    __truediv__ = _binary(np.true_divide, divides=True)
+    __rtruediv__ = _reflected(np.true_divide, divides=True)
+    __floordiv__ = _binary(np.floor_divide, divides=True)
+    __rfloordiv__ = _reflected(np.floor_divide, divides=True)
+    __mod__ = _binary(np.remainder, divides=True)
+    __rmod__ = _reflected(np.remainder, divides=True)
+    __pow__ = _binary(np.power)
+    __rpow__ = _reflected(np.power)
+    __lt__ = _binary(np.less)
+    __le__ = _binary(np.less_equal)
+    __gt__ = _binary(np.greater)
+    __ge__ = _binary(np.greater_equal)
+    __eq__ = _binary(np.equal)
+    __ne__ = _binary(np.not_equal)
+    __hash__ = None
+
+    def __neg__(self):
+        return _Traced(-_operand(self), self.tracer)
+
+    def __pos__(self):
+        return _Traced(_operand(self), self.tracer)
+
+    def __abs__(self):
+        return _Traced(np.abs(_operand(self)), self.tracer)
+
+    def __round__(self, ndigits=None):
+        values = _operand(self)
+        if ndigits is None:
+            # round() returns an int, rounding halves to even like NumPy
+            if values.dtype.kind == 'f':
+                self.tracer.checkFinite(values)
+                values = np.round(values).astype(np.int64)
+            return _Traced(values, self.tracer)
+        return _Traced(np.round(values, ndigits), self.tracer)
+
+    def __bool__(self):
+        return self.tracer.decide(self.values != 0)
+
+    def __int__(self):
+        raise _TraceError("traced levels cannot be converted to int")
+
+    def __float__(self):
+        raise _TraceError("traced levels cannot be converted to float")
+
+    def __index__(self):
+        raise _TraceError("traced levels cannot be used as an index")
+
+    def _correctLevels(self, wrapLevels):
+        """Map levels to [0..255] like Pixel.correctLevel does for one level
+
+        Parameters
+        ----------
+        wrapLevels : bool
+            True to wrap levels around, False to clamp them
+
+        Returns
+        -------
+        _Traced
+            the corrected levels
+        """
+        values = _operand(self)
+        if values.dtype.kind == 'f':
+            # int() truncates toward zero and fails for inf and nan
+            self.tracer.checkFinite(values)
+            values = np.trunc(values)
+        values = values.astype(np.int64)
+        if wrapLevels:
+            values = values % 256
+        else:
+            values = np.clip(values, 0, 255)
+        return _Traced(values, self.tracer)
+
+class _TracedPixel(Pixel):
+    """A pixel whose levels and coordinates are traced values"""
+
+    def __init__(self, rgb, x, y):
+        """Initializer for _TracedPixel class
+
+        Parameters
+        ----------
+        rgb : tuple of _Traced
+            the red, green and blue levels
+        x, y : _Traced
+            the coordinates
+        """
+        Pixel.__init__(self, None, x, y)
+        self.rgb = rgb
+
+    def _getRGB(self):
+        return self.rgb
+
+    def _setRGB(self, rgb):
+        self.rgb = tuple(rgb[:3])
+
+class _Tracer:
+    """Follows every branch a pixel function can take over a set of pixels
+    """
+
+    def __init__(self, size):
+        """Initializer for _Tracer class
+
+        Parameters
+        ----------
+        size : int
+            the number of pixels traced
+        """
+        self.size = size
+
+    def trace(self, func, levels, xs, ys):
+        """Run a pixel function once for each feasible set of branches
+
+        Parameters
+        ----------
+        func : function
+            the pixel function
+        levels : numpy.ndarray
+            array of shape (size, 3) holding the levels of the pixels
+        xs, ys : numpy.ndarray
+            the coordinates of the pixels
+
+        Returns
+        -------
+        numpy.ndarray
+            uint8 array of shape (size, 3) holding the new levels
+        """
+        result = np.array(levels, dtype=np.uint8)
+        channels = [levels[:, c].astype(np.int64) for c in range(3)]
+        self.pending = [[]]
+        numPaths = 0
+        while self.pending:
+            numPaths += 1
+            if numPaths > MAX_PATHS:
+                raise _TraceError("too many branches")
+            self.prefix = self.pending.pop()
+            self.decisions = []
+            self.mask = np.ones(self.size, dtype=bool)
+            rgb = tuple(_Traced(channel, self) for channel in channels)
+            pixel = _TracedPixel(rgb, _Traced(xs, self), _Traced(ys, self))
+            func(pixel)
+            for c in range(3):
+                self.store(result[:, c], pixel.rgb[c])
+        return result
+
+    def store(self, target, value):
+        """Store new levels for the pixels on the current branch
+
+        Parameters
+        ----------
+        target : numpy.ndarray
+            where the levels of one channel are stored
+        value : _Traced or int
+            the levels set by the function
+        """
+        if isinstance(value, _Traced):
+            value = value.values
+        elif not isinstance(value, int):
+            raise _TraceError("levels must be integers")
+        values = np.broadcast_to(np.asarray(value), (self.size,))[self.mask]
+        if values.dtype.kind not in 'iub':
+            raise _TraceError("levels must be integers")
+        if values.size and (values.min() < 0 or values.max() > 255):
+            raise _TraceError("levels must be in [0..255]")
+        target[self.mask] = values
+
+    def decide(self, condition):
+        """Choose the branch to follow at a test of a traced value
+
+        Parameters
+        ----------
+        condition : numpy.ndarray
+            the outcome of the test for every pixel
+
+        Returns
+        -------
+        bool
+            the outcome to use for the pixels on the current branch
+        """
+        n = len(self.decisions)
+        if n >= MAX_DECISIONS:
+            raise _TraceError("too many tests")
+        if n < len(self.prefix):
+            choice = self.prefix[n]
+        elif not (self.mask & ~condition).any():
+            choice = True
+        elif not (self.mask & condition).any():
+            choice = False
+        else:
+            # both outcomes occur; follow True now and False on a later run
+            choice = True
+            self.pending.append(self.decisions + [False])
+        self.decisions.append(choice)
+        if choice:
+            self.mask = self.mask & condition
+        else:
+            self.mask = self.mask & ~condition
+        return choice
+
+    def checkDivisor(self, divisor):
+        """Give up if a divisor on the current branch is zero
+
+        NumPy returns 0, inf or nan where Python raises ZeroDivisionError;
+        giving up leaves the pixels to the per-pixel loop, which raises
+        the same error as a for loop over getPixels() would.
+
+        Parameters
+        ----------
+        divisor : numpy.ndarray, int or float
+            the divisor about to be used
+        """
+        divisor = np.broadcast_to(np.asarray(divisor), (self.size,))
+        if (divisor[self.mask] == 0).any():
+            raise _TraceError("division by zero")
+
+    def checkFinite(self, values):
+        """Give up if a value on the current branch is infinite or nan
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            float values about to be converted to integers
+        """
+        if not np.isfinite(values[self.mask]).all():
+            raise _TraceError("level is not a finite number")
+
+def applyToPicture(picture, func):
+    """Call a pixel function for every pixel of a picture
+
+    The function is traced and run on whole arrays of levels when possible
+    (see the module documentation) and called once per pixel otherwise.
+    Either way the picture ends up exactly as after
+
+        for pixel in getPixels(picture):
+            func(pixel)
+
+    Since the function may be run several times while being traced, it
+    should do nothing besides reading and setting the pixel's levels.
+
+    Parameters
+    ----------
+    picture : Picture
+        the picture whose pixels are changed
+    func : function
+        function taking a Pixel, e.g. def f(pixel): ...
+
+    Returns
+    -------
+    bool
+        True if the function was traced, False if it was called per pixel
+    """
+    width, height = picture.getWidth(), picture.getHeight()
+    levels = picture._getArray()
+    result = np.empty_like(levels)
+    rowsPerChunk = max(1, CHUNK_PIXELS // max(width, 1))
+    try:
+        with np.errstate(all='ignore'):
+            for top in range(0, height, rowsPerChunk):
+                bottom = min(top + rowsPerChunk, height)
+                ys, xs = np.mgrid[top:bottom, 0:width]
+                chunk = levels[top:bottom].reshape(-1, 3)
+                tracer = _Tracer(chunk.shape[0])
+                newLevels = tracer.trace(func, chunk, xs.ravel(), ys.ravel())
+                result[top:bottom] = newLevels.reshape(bottom - top, width, 3)
+    except Exception:
+        for y in range(height):
+            for x in range(width):
+                func(picture.getPixel(x, y))
+        return False
+    picture._setArray(result)
+    return True
+
+def vectorize(func):
+    """Decorator letting a pixel function be applied to a whole picture
+
+    The decorated function still works on a single pixel; called with a
+    picture it is applied to every pixel using applyToPicture().
+
+    Parameters
+    ----------
+    func : function
+        function taking a Pixel
+
+    Returns
+    -------
+    function
+        function taking a Pixel or a Picture
+    """
+    @functools.wraps(func)
+    def wrapper(target):
+        if isinstance(target, Picture):
+            applyToPicture(target, func)
+        else:
+            return func(target)
+    return wrapper
@@ -0,0 +1,95 @@
+"""
+Writer.py - write pictures and sounds to files on background threads
+
+Encoding a JPEG or PNG file takes much longer than changing a picture, so
+programs that write many frames spend most of their time waiting for the
+encoder.  The functions here run such writes on a small pool of threads
+(PIL and zlib release the interpreter lock while they work) so the
+program can go on computing the next frame.  At most MAX_PENDING writes
+may be waiting at once; submitting another waits for one to finish, so
+memory use stays bounded.
+
+Errors from background writes are reported by flushWrites(), which waits
+until every write submitted so far has finished.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Number of threads writing files
+MAX_WORKERS = 4
+
+# Largest number of writes submitted but not yet finished
+MAX_PENDING = 16
+
+_executor = None
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+_lock = threading.Lock()
+_pending = set()
+
+def _finished(future):
+    """Record that a background write has finished
+
+    Failed writes stay in the pending set until flushWrites() reports
+    them; cancelled ones are simply forgotten.
+
+    Parameters
+    ----------
+    future : concurrent.futures.Future
+        the finished write
+    """
+    try:
+        if future.cancelled() or future.exception() is None:
+            with _lock:
+                _pending.discard(future)
+    finally:
+        _slots.release()
+
+def submit(func, *args):
+    """Run a write function on a background thread
+
+    Parameters
+    ----------
+    func : function
+        the function doing the write
+    args : any
+        the arguments to pass to func
+
+    Returns
+    -------
+    concurrent.futures.Future
+        the future for the write; its result() is func's result
+    """
+    global _executor
+    _slots.acquire()
+    try:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(MAX_WORKERS,
+                                               thread_name_prefix="jes4py-writer")
+            future = _executor.submit(func, *args)
+            _pending.add(future)
+    except:
+        # the write never started, so its slot is free again
+        _slots.release()
+        raise
+    future.add_done_callback(_finished)
+    return future
+
+def flushWrites():
+    """Wait until all background writes have finished
+
+    Raises
+    ------
+    Exception
+        the error of a background write that failed since the
+        last call, if any
+    """
+    with _lock:
+        pending = list(_pending)
+    wait(pending)
+    with _lock:
+        _pending.difference_update(pending)
+    for future in pending:
+        if not future.cancelled() and future.exception() is not None:
+            raise future.exception()
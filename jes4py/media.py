@@ -11,12 +11,22 @@
 import sys
 import os
 import math
+import glob
+import functools
+import numpy as np
 # import traceback
 # import user
 #import pictureMod
 # import Picture
 # import Pixel
 from jes4py.Picture import Picture
+from jes4py.TiledPicture import TiledPicture
+from jes4py.Vectorizer import vectorize
+from jes4py import Vectorizer
+from jes4py import Filters
+from jes4py import ColorTools
+from jes4py import Writer
+from jes4py import Loader
 from jes4py.PixelColor import Pixel, Color
 # import Sound
 from jes4py.Sound import Sound
@@ -26,6 +36,7 @@ from jes4py.Sound import Sound
 # import Samples
 from jes4py.Sample import Sample
 from jes4py.Samples import Samples
+from jes4py.SoundSample import SoundSample
 # import MoviePlayer
 # import MovieWriter
 from jes4py import FileChooser
@@ -110,18 +121,19 @@ setLibPath = addLibPath
 ##
 
 def samplesToSound(samples, maxIndex=100):
-    # Find maxX
-    maxIndex = max([getIndex(s) for s in samples])
-    newSound = makeEmptySound(maxIndex + 1,
+    indices = [getIndex(s) for s in samples]
+    values = [getSampleValue(s) for s in samples]
+    newSound = makeEmptySound(max(indices) + 1,
                               int(getSamplingRate(samples[0].getSound())))
-    for s in samples:
-        x = getIndex(s)
-        setSampleValueAt(newSound, x, getSampleValue(s))
+    newSound.setSampleValues(indices, values)
     return newSound
 
 
 def makeSound(filename, maxIndex=100):
     global mediaFolder
+    if isinstance(filename, (bytes, bytearray, memoryview)):
+        # the contents of a sound file, e.g. an upload
+        return Sound.fromBytes(filename)
     if not isinstance(filename, str):
         return samplesToSound(filename, maxIndex=maxIndex)
     if not os.path.isabs(filename):
@@ -289,6 +301,38 @@ def getSampleValueAt(sound, index):
     return sound.getSampleValue(index - Sound._SoundIndexOffset)
 
 
+def getSampleValues(sound, start=Sound._SoundIndexOffset, stop=None, step=1):
+    function = "getSampleValues(sound[, start, stop, step])"
+    if not isinstance(sound, Sound):
+        print(function + ": First input is not a sound")
+        raise ValueError
+    if stop is None:
+        stop = getLength(sound) + Sound._SoundIndexOffset
+    start -= Sound._SoundIndexOffset
+    stop -= Sound._SoundIndexOffset
+    if step <= 0:
+        print(function + ": step must be greater than 0")
+        raise ValueError
+    if start < 0 or stop < start or stop > getLength(sound):
+        print(function + ": The range must lie within the sound")
+        raise ValueError
+    return sound.getSampleValues(start, stop, step)
+
+
+def setSampleValues(sound, start, values):
+    function = "setSampleValues(sound, start, values)"
+    if not isinstance(sound, Sound):
+        print(function + ": First input is not a sound")
+        raise ValueError
+    start -= Sound._SoundIndexOffset
+    # a single value is used for every sample from start to the end
+    count = np.size(values) if np.ndim(values) > 0 else 0
+    if start < 0 or start + count > getLength(sound):
+        print(function + ": The values must fit within the sound")
+        raise ValueError
+    sound.setSampleValues(start, values)
+
+
 def getSampleObjectAt(sound, index):
     if not isinstance(sound, Sound):
         print("getSampleObjectAt(sound,index): First input is not a sound")
@@ -364,14 +408,29 @@ def getDuration(sound):
     return sound.getLength() / sound.getSamplingRate()
 
 
-def writeSoundTo(sound, filename):
+def writeSoundTo(sound, filename, asynchronous=False, compressLevel=None):
     global mediaFolder
     if not os.path.isabs(filename):
         filename = mediaFolder + filename
     if not isinstance(sound, Sound):
         print("writeSoundTo(sound,filename): First input is not a sound")
         raise ValueError
-    sound.writeToFile(filename)
+    if compressLevel is not None and compressLevel not in range(10):
+        print("writeSoundTo(sound,filename): compressLevel must be between 0 and 9")
+        raise ValueError
+    return sound.writeToFile(filename, asynchronous, compressLevel)
+
+
+def makeSoundView(sound, start, stop):
+    if not isinstance(sound, Sound):
+        print("makeSoundView(sound, start, stop): First input is not a sound")
+        raise ValueError
+    start -= Sound._SoundIndexOffset
+    stop -= Sound._SoundIndexOffset
+    if start < 0 or stop < start or stop > getLength(sound):
+        print("makeSoundView(sound, start, stop): The view must lie within the sound")
+        raise ValueError
+    return sound.view(start, stop)
 
 
 def randomSamples(someSound, number):
@@ -383,7 +442,9 @@ def randomSamples(someSound, number):
 
 
 def getIndex(sample):
-    return int(str(sample).split()[2])
+    if isinstance(sample, SoundSample):
+        return sample.frameNumber
+    return sample.index
 
 ##
 # Globals for styled text
@@ -452,20 +513,20 @@ def randomPixels(somePic, number):
 
 
 def pixelsToPicture(pixels, defaultColor=white, maxX=100, maxY=100):
-    # Find maxX
-    maxX = max([getX(p) for p in pixels])
-    # find maxY
-    maxY = max([getY(p) for p in pixels])
+    coords = np.array([(getX(p), getY(p)) for p in pixels])
+    colors = [getColor(p) for p in pixels]
+    # Find maxX and maxY
+    maxX, maxY = coords.max(axis=0)
     newpic = makeEmptyPicture(maxX + 1, maxY + 1, defaultColor)
-    for pixel in pixels:
-        x = getX(pixel)
-        y = getY(pixel)
-        setColor(getPixel(newpic, x, y), getColor(pixel))
+    newpic.setPixelColors(coords - Picture._PictureIndexOffset, colors)
     return newpic
 
 
-def makePicture(filename, defaultColor=white):
+def makePicture(filename, defaultColor=white, maxWidth=None, maxHeight=None):
     global mediaFolder
+    if isinstance(filename, (bytes, bytearray, memoryview)):
+        # the contents of an image file, e.g. an upload
+        return Picture.fromBytes(filename)
     if not isinstance(filename, str):
         return pixelsToPicture(filename, defaultColor=defaultColor)
     if not os.path.isabs(filename):
@@ -473,10 +534,69 @@ def makePicture(filename, defaultColor=white):
     if not os.path.isfile(filename):
         print("makePicture(filename): There is no file at " + filename)
         raise ValueError
+    if ((maxWidth is not None and maxWidth <= 0)
+            or (maxHeight is not None and maxHeight <= 0)):
+        print("makePicture(filename[, maxWidth, maxHeight]): maxWidth and maxHeight must be greater than 0")
+        raise ValueError
     picture = Picture()
-    picture.loadOrFail(filename)
+    picture.loadOrFail(filename, maxWidth, maxHeight)
     return picture
 
+
+def _findFiles(function, fileNames):
+    global mediaFolder
+    if isinstance(fileNames, str):
+        # a pattern such as "frame*.jpg"
+        pattern = fileNames
+        if not os.path.isabs(pattern):
+            pattern = mediaFolder + pattern
+        fileNames = sorted(glob.glob(pattern))
+        if len(fileNames) == 0:
+            print(function + ": There are no files matching " + pattern)
+            raise ValueError
+        return fileNames
+    paths = []
+    for filename in fileNames:
+        if not os.path.isabs(filename):
+            filename = mediaFolder + filename
+        if not os.path.isfile(filename):
+            print(function + ": There is no file at " + filename)
+            raise ValueError
+        paths.append(filename)
+    return paths
+
+
+def _checkWorkers(function, workers):
+    if workers is not None and workers <= 0:
+        print(function + ": workers must be greater than 0")
+        raise ValueError
+
+
+def loadPictures(fileNames, workers=None, stream=False, processes=False,
+                 maxWidth=None, maxHeight=None):
+    function = "loadPictures(fileNames[, workers, stream])"
+    paths = _findFiles(function, fileNames)
+    _checkWorkers(function, workers)
+    if ((maxWidth is not None and maxWidth <= 0)
+            or (maxHeight is not None and maxHeight <= 0)):
+        print(function + ": maxWidth and maxHeight must be greater than 0")
+        raise ValueError
+    load = functools.partial(Loader.loadPicture, maxWidth=maxWidth, maxHeight=maxHeight)
+    return Loader.loadAll(load, paths, workers, processes, stream)
+
+
+def loadSounds(fileNames, workers=None, stream=False, processes=False):
+    function = "loadSounds(fileNames[, workers, stream])"
+    paths = _findFiles(function, fileNames)
+    _checkWorkers(function, workers)
+    return Loader.loadAll(Loader.loadSound, paths, workers, processes, stream)
+
+
+# Load a picture reduced to fit within maxWidth x maxHeight; JPEG files are
+# decoded at reduced resolution rather than at full size
+def makeThumbnail(filename, maxWidth, maxHeight=None):
+    return makePicture(filename, maxWidth=maxWidth, maxHeight=maxHeight)
+
 # MMO (1 Dec 2005): Capped width/height to max 10000 and min 1
 # alexr (6 Sep 2006): fixed to work without the Python classes.
 # PamC (6 July 2007): added new optional param to allow for empty pictures
@@ -486,6 +606,7 @@ def makePicture(filename, defaultColor=white):
 def makeEmptyPicture(width, height, acolor=white):
     if width > 10000 or height > 10000:
         print("makeEmptyPicture(width, height[, acolor]): height and width must be less than 10000 each")
+        print("Use makeTiledPicture(width, height[, acolor]) for larger pictures")
         raise ValueError
     if width <= 0 or height <= 0:
         print("makeEmptyPicture(width, height[, acolor]): height and width must be greater than 0 each")
@@ -497,6 +618,18 @@ def makeEmptyPicture(width, height, acolor=white):
     return picture
 
 
+# Pictures too large to hold in memory keep their pixels in tiles in a
+# temporary file; only the most recently used tiles are held in memory
+def makeTiledPicture(width, height, acolor=white):
+    if width <= 0 or height <= 0:
+        print("makeTiledPicture(width, height[, acolor]): height and width must be greater than 0 each")
+        raise ValueError
+    if not isinstance(acolor, Color):
+        print("makeTiledPicture(width, height[, acolor]): Last input is not a color")
+        raise ValueError
+    return TiledPicture(width, height, acolor)
+
+
 def getPixels(picture):
     if not isinstance(picture, Picture):
         print("getPixels(picture): Input is not a picture")
@@ -508,6 +641,188 @@ def getAllPixels(picture):
     return getPixels(picture)
 
 
+# Apply a function of one pixel, e.g. def f(pixel): ..., to every pixel of
+# a picture using several processes.  The function must be defined at the
+# top level of a module and only use the pixel it is given.  The processes
+# are forked, so the script is not run again in them; where processes
+# cannot be forked (Windows) the pixels are handled one at a time.
+def mapPixels(picture, func, workers=None):
+    if not isinstance(picture, Picture):
+        print("mapPixels(picture, func[, workers]): First input is not a picture")
+        raise ValueError
+    if not callable(func):
+        print("mapPixels(picture, func[, workers]): Second input is not a function")
+        raise ValueError
+    if workers is not None and workers <= 0:
+        print("mapPixels(picture, func[, workers]): workers must be greater than 0")
+        raise ValueError
+    picture.mapPixels(func, workers)
+
+
+def applyToPicture(picture, func):
+    if not isinstance(picture, Picture):
+        print("applyToPicture(picture, func): First input is not a picture")
+        raise ValueError
+    if not callable(func):
+        print("applyToPicture(picture, func): Second input is not a function")
+        raise ValueError
+    Vectorizer.applyToPicture(picture, func)
+
+
+def _checkBorder(function, border):
+    if border not in Filters.BORDERS:
+        print(function + ": border must be 'clamp', 'wrap' or 'reflect'")
+        raise ValueError
+
+
+def convolve(picture, kernel, border="reflect", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("convolve(picture, kernel): First input is not a picture")
+        raise ValueError
+    try:
+        rows, columns = len(kernel), len(kernel[0])
+    except TypeError:
+        print("convolve(picture, kernel): Second input is not a list of rows")
+        raise ValueError
+    if rows % 2 == 0 or columns % 2 == 0:
+        print("convolve(picture, kernel): kernel must have an odd number of rows and columns")
+        raise ValueError
+    _checkBorder("convolve(picture, kernel)", border)
+    return Filters.convolve(picture, kernel, border, inPlace)
+
+
+def gaussianBlur(picture, sigma=1.0, border="reflect", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("gaussianBlur(picture[, sigma]): First input is not a picture")
+        raise ValueError
+    if sigma <= 0:
+        print("gaussianBlur(picture[, sigma]): sigma must be greater than 0")
+        raise ValueError
+    _checkBorder("gaussianBlur(picture[, sigma])", border)
+    return Filters.gaussianBlur(picture, sigma, border, inPlace)
+
+
+def boxBlur(picture, radius=1, border="reflect", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("boxBlur(picture[, radius]): First input is not a picture")
+        raise ValueError
+    if not isinstance(radius, int) or radius < 0:
+        print("boxBlur(picture[, radius]): radius must be a nonnegative integer")
+        raise ValueError
+    _checkBorder("boxBlur(picture[, radius])", border)
+    return Filters.boxBlur(picture, radius, border, inPlace)
+
+
+def pixelate(picture, size, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("pixelate(picture, size): First input is not a picture")
+        raise ValueError
+    if not isinstance(size, int) or size < 1:
+        print("pixelate(picture, size): size must be a positive integer")
+        raise ValueError
+    return Filters.pixelate(picture, size, inPlace)
+
+
+def _checkRegion(function, picture, x, y, width, height):
+    if not isinstance(picture, Picture):
+        print(function + ": First input is not a picture")
+        raise ValueError
+    if width < 1 or height < 1:
+        print(function + ": width and height must be positive")
+        raise ValueError
+    x -= Picture._PictureIndexOffset
+    y -= Picture._PictureIndexOffset
+    if x >= getWidth(picture) or y >= getHeight(picture) or x + width <= 0 or y + height <= 0:
+        print(function + ": region is outside the picture")
+        raise ValueError
+    return x, y
+
+
+def regionSum(picture, x, y, width, height):
+    x, y = _checkRegion("regionSum(picture, x, y, width, height)", picture, x, y, width, height)
+    return picture.regionSum(x, y, width, height)
+
+
+def regionMean(picture, x, y, width, height):
+    x, y = _checkRegion("regionMean(picture, x, y, width, height)", picture, x, y, width, height)
+    return picture.regionMean(x, y, width, height)
+
+
+def sharpen(picture, sigma=1.0, amount=1.0, border="reflect", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("sharpen(picture[, sigma, amount]): First input is not a picture")
+        raise ValueError
+    if sigma <= 0:
+        print("sharpen(picture[, sigma, amount]): sigma must be greater than 0")
+        raise ValueError
+    _checkBorder("sharpen(picture[, sigma, amount])", border)
+    return Filters.unsharpMask(picture, sigma, amount, border, inPlace)
+
+
+def edgeDetect(picture, method="sobel", border="reflect", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("edgeDetect(picture[, method]): First input is not a picture")
+        raise ValueError
+    if method not in ("sobel", "laplacian"):
+        print("edgeDetect(picture[, method]): method must be 'sobel' or 'laplacian'")
+        raise ValueError
+    _checkBorder("edgeDetect(picture[, method])", border)
+    return Filters.edgeDetect(picture, method, border, inPlace)
+
+
+def _checkRadius(function, picture, radius, border):
+    if not isinstance(picture, Picture):
+        print(function + ": First input is not a picture")
+        raise ValueError
+    if not isinstance(radius, int) or radius < 0:
+        print(function + ": radius must be a nonnegative integer")
+        raise ValueError
+    _checkBorder(function, border)
+
+
+def medianFilter(picture, radius=1, border="reflect", inPlace=False):
+    _checkRadius("medianFilter(picture[, radius])", picture, radius, border)
+    return Filters.medianFilter(picture, radius, border, inPlace)
+
+
+def rankFilter(picture, radius, percentile, border="reflect", inPlace=False):
+    _checkRadius("rankFilter(picture, radius, percentile)", picture, radius, border)
+    if percentile < 0 or percentile > 100:
+        print("rankFilter(picture, radius, percentile): percentile must be between 0 and 100")
+        raise ValueError
+    return Filters.rankFilter(picture, radius, percentile, border, inPlace)
+
+
+def _checkThreshold(function, threshold):
+    if threshold is not None and (threshold < 0 or threshold > 256):
+        print(function + ": threshold must be between 0 and 256")
+        raise ValueError
+
+
+def erode(picture, radius=1, threshold=None, border="reflect", inPlace=False):
+    _checkRadius("erode(picture[, radius, threshold])", picture, radius, border)
+    _checkThreshold("erode(picture[, radius, threshold])", threshold)
+    return Filters.erode(picture, radius, threshold, border, inPlace)
+
+
+def dilate(picture, radius=1, threshold=None, border="reflect", inPlace=False):
+    _checkRadius("dilate(picture[, radius, threshold])", picture, radius, border)
+    _checkThreshold("dilate(picture[, radius, threshold])", threshold)
+    return Filters.dilate(picture, radius, threshold, border, inPlace)
+
+
+def opening(picture, radius=1, threshold=None, border="reflect", inPlace=False):
+    _checkRadius("opening(picture[, radius, threshold])", picture, radius, border)
+    _checkThreshold("opening(picture[, radius, threshold])", threshold)
+    return Filters.opening(picture, radius, threshold, border, inPlace)
+
+
+def closing(picture, radius=1, threshold=None, border="reflect", inPlace=False):
+    _checkRadius("closing(picture[, radius, threshold])", picture, radius, border)
+    _checkThreshold("closing(picture[, radius, threshold])", threshold)
+    return Filters.closing(picture, radius, threshold, border, inPlace)
+
+
 def getWidth(picture):
     if not isinstance(picture, Picture):
         print("getWidth(picture): Input is not a picture")
@@ -665,6 +980,36 @@ def getPixel(picture, x, y):
 
     return picture.getPixel(x - Picture._PictureIndexOffset, y - Picture._PictureIndexOffset)
 
+
+def _pixelCoordinates(function, picture, coords):
+    if not isinstance(picture, Picture):
+        print(function + ": First input is not a picture")
+        raise ValueError
+    coords = np.asarray(coords)
+    if coords.size > 0 and coords.shape[-1] != 2:
+        print(function + ": Second input is not a list of (x, y) coordinates")
+        raise ValueError
+    coords = coords.reshape(-1, 2) - Picture._PictureIndexOffset
+    if len(coords) > 0 and (coords.min() < 0 or coords[:, 0].max() >= getWidth(picture) or
+                            coords[:, 1].max() >= getHeight(picture)):
+        print(function + ": The pixels must lie within the picture")
+        raise ValueError
+    return coords
+
+
+def getPixelColors(picture, coords):
+    coords = _pixelCoordinates("getPixelColors(picture, coords)", picture, coords)
+    return picture.getPixelColors(coords)
+
+
+def setPixelColors(picture, coords, colors):
+    function = "setPixelColors(picture, coords, colors)"
+    coords = _pixelCoordinates(function, picture, coords)
+    if not isinstance(colors, Color) and len(colors) != len(coords):
+        print(function + ": There must be one color per pixel")
+        raise ValueError
+    picture.setPixelColors(coords, colors)
+
 # Added as a better name for getPixel
 
 
@@ -758,19 +1103,172 @@ def distance(c1, c2):
     return c1.distance(c2)
 
 
-def writePictureTo(picture, filename):
+def colorDistanceMap(picture, color, asPicture=False):
+    if not isinstance(picture, Picture):
+        print("colorDistanceMap(picture, color): First input is not a picture")
+        raise ValueError
+    if not isinstance(color, Color):
+        print("colorDistanceMap(picture, color): Second input is not a color")
+        raise ValueError
+    return ColorTools.colorDistanceMap(picture, color, asPicture)
+
+
+def chromaKey(foreground, background, keyColor, threshold, inPlace=False):
+    if not isinstance(foreground, Picture):
+        print("chromaKey(foreground, background, keyColor, threshold): First input is not a picture")
+        raise ValueError
+    if not isinstance(background, Picture):
+        print("chromaKey(foreground, background, keyColor, threshold): Second input is not a picture")
+        raise ValueError
+    if not isinstance(keyColor, Color):
+        print("chromaKey(foreground, background, keyColor, threshold): Third input is not a color")
+        raise ValueError
+    return ColorTools.chromaKey(foreground, background, keyColor, threshold, inPlace)
+
+
+def replaceBackground(picture, oldBackground, newBackground, threshold, inPlace=False):
+    for n, pic in enumerate([picture, oldBackground, newBackground]):
+        if not isinstance(pic, Picture):
+            print("replaceBackground(picture, oldBackground, newBackground, threshold): {} input is not a picture".format(["First", "Second", "Third"][n]))
+            raise ValueError
+    return ColorTools.replaceBackground(picture, oldBackground, newBackground, threshold, inPlace)
+
+
+def _checkPalette(function, palette):
+    if not isinstance(palette, (list, tuple)) or len(palette) == 0 or len(palette) > 256:
+        print(function + ": palette must be a list of 1 to 256 colors")
+        raise ValueError
+    for color in palette:
+        if not isinstance(color, Color):
+            print(function + ": palette must be a list of 1 to 256 colors")
+            raise ValueError
+
+
+def nearestColorMap(picture, palette):
+    if not isinstance(picture, Picture):
+        print("nearestColorMap(picture, palette): First input is not a picture")
+        raise ValueError
+    _checkPalette("nearestColorMap(picture, palette)", palette)
+    return ColorTools.nearestColorMap(picture, palette)
+
+
+def quantize(picture, palette, dither=False, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("quantize(picture, palette[, dither]): First input is not a picture")
+        raise ValueError
+    _checkPalette("quantize(picture, palette[, dither])", palette)
+    return ColorTools.quantize(picture, palette, dither, inPlace)
+
+
+def makePalette(picture, numColors, method="mediancut"):
+    if not isinstance(picture, Picture):
+        print("makePalette(picture, numColors[, method]): First input is not a picture")
+        raise ValueError
+    if not isinstance(numColors, int) or numColors < 1 or numColors > 256:
+        print("makePalette(picture, numColors[, method]): numColors must be between 1 and 256")
+        raise ValueError
+    if method not in ("mediancut", "kmeans"):
+        print("makePalette(picture, numColors[, method]): method must be 'mediancut' or 'kmeans'")
+        raise ValueError
+    return ColorTools.makePalette(picture, numColors, method)
+
+
+def getHistogram(picture, channel="luminance"):
+    if not isinstance(picture, Picture):
+        print("getHistogram(picture[, channel]): First input is not a picture")
+        raise ValueError
+    if channel not in Picture.CHANNELS:
+        print("getHistogram(picture[, channel]): channel must be 'red', 'green', 'blue' or 'luminance'")
+        raise ValueError
+    return picture.getHistogram(channel)
+
+
+def getStatistics(picture):
+    if not isinstance(picture, Picture):
+        print("getStatistics(picture): Input is not a picture")
+        raise ValueError
+    return picture.getStatistics()
+
+
+def equalizeHistogram(picture, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("equalizeHistogram(picture): Input is not a picture")
+        raise ValueError
+    return ColorTools.equalizeHistogram(picture, inPlace)
+
+
+def mirrorVertical(picture, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("mirrorVertical(picture): Input is not a picture")
+        raise ValueError
+    return picture.mirrorVertical(inPlace)
+
+def mirrorHorizontal(picture, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("mirrorHorizontal(picture): Input is not a picture")
+        raise ValueError
+    return picture.mirrorHorizontal(inPlace)
+
+def flip(picture, direction="horizontal", inPlace=False):
+    if not isinstance(picture, Picture):
+        print("flip(picture[, direction]): First input is not a picture")
+        raise ValueError
+    if direction not in ("horizontal", "vertical"):
+        print("flip(picture[, direction]): direction must be 'horizontal' or 'vertical'")
+        raise ValueError
+    return picture.flip(direction, inPlace)
+
+def transpose(picture, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("transpose(picture): Input is not a picture")
+        raise ValueError
+    return picture.transpose(inPlace)
+
+def rotate(picture, degrees, expand=True, acolor=None, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("rotate(picture, degrees): First input is not a picture")
+        raise ValueError
+    if acolor is not None and not isinstance(acolor, Color):
+        print("rotate(picture, degrees): acolor is not a color")
+        raise ValueError
+    return picture.rotate(degrees, expand, acolor, inPlace)
+
+def affineTransform(picture, coefficients, width=None, height=None, acolor=None, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("affineTransform(picture, coefficients): First input is not a picture")
+        raise ValueError
+    if len(coefficients) != 6:
+        print("affineTransform(picture, coefficients): coefficients must be a list of six numbers")
+        raise ValueError
+    if acolor is not None and not isinstance(acolor, Color):
+        print("affineTransform(picture, coefficients): acolor is not a color")
+        raise ValueError
+    return picture.affineTransform(coefficients, width, height, acolor, inPlace)
+
+
+def writePictureTo(picture, filename, asynchronous=False, quality=None, compressLevel=None, optimize=None):
     global mediaFolder
     if not os.path.isabs(filename):
         filename = mediaFolder + filename
     if not isinstance(picture, Picture):
         print("writePictureTo(picture,filename): First input is not a picture")
         raise ValueError
-    picture.writeOrFail(filename)
+    if quality is not None and (quality < 1 or quality > 95):
+        print("writePictureTo(picture,filename): quality must be between 1 and 95")
+        raise ValueError
+    if compressLevel is not None and compressLevel not in range(10):
+        print("writePictureTo(picture,filename): compressLevel must be between 0 and 9")
+        raise ValueError
+    return picture.writeOrFail(filename, asynchronous, quality, compressLevel, optimize)
 #   if not os.path.exists(filename):
 #       print "writePictureTo(pict,filename): Path is not valid"
 #       raise ValueError
 
 
+def flushWrites():
+    Writer.flushWrites()
+
+
 # not to be confused with setColor, totally different, don't document/export
 def _setColorTo(color, other):
     color.setRGB(other.getRed(), other.getGreen(), other.getBlue())
@@ -782,8 +1280,11 @@ def _setColorTo(color, other):
 
 
 def makeDarker(color):
+    if isinstance(color, Picture):
+        # darken every pixel using a per-channel lookup table
+        return ColorTools.applyColorFunction(color, Color.makeDarker, "channel")
     if not isinstance(color, Color):
-        print("makeDarker(color): Input is not a color")
+        print("makeDarker(color): Input is not a color or a picture")
         raise ValueError
     return Color(color.makeDarker())
 
@@ -793,19 +1294,50 @@ def makeDarker(color):
 
 
 def makeLighter(color):
+    if isinstance(color, Picture):
+        # makeLighter treats very dark colors specially, so each distinct
+        # color is looked up rather than each channel
+        return ColorTools.applyColorFunction(color, Color.makeLighter, "exact")
     if not isinstance(color, Color):
-        print("makeLighter(color): Input is not a color")
+        print("makeLighter(color): Input is not a color or a picture")
         raise ValueError
     return Color(color.makeLighter())
 
 
 def makeBrighter(color):  # This is the same as makeLighter(color)
+    if isinstance(color, Picture):
+        return makeLighter(color)
     if not isinstance(color, Color):
-        print("makeBrighter(color): Input is not a color")
+        print("makeBrighter(color): Input is not a color or a picture")
         raise ValueError
     return Color(color.makeLighter())
 
 
+def scaleColor(color, scaleFactor):
+    if isinstance(color, Picture):
+        return ColorTools.applyColorFunction(color, lambda c: c.scaleColor(scaleFactor), "channel")
+    if not isinstance(color, Color):
+        print("scaleColor(color, scaleFactor): First input is not a color or a picture")
+        raise ValueError
+    return color.scaleColor(scaleFactor)
+
+
+def applyColorFunction(picture, func, mode="channel", lutSize=33, inPlace=False):
+    if not isinstance(picture, Picture):
+        print("applyColorFunction(picture, func[, mode]): First input is not a picture")
+        raise ValueError
+    if not callable(func):
+        print("applyColorFunction(picture, func[, mode]): Second input is not a function")
+        raise ValueError
+    if mode not in ("channel", "3d", "exact"):
+        print("applyColorFunction(picture, func[, mode]): mode must be 'channel', '3d' or 'exact'")
+        raise ValueError
+    if not isinstance(lutSize, int) or lutSize < 2 or lutSize > 65:
+        print("applyColorFunction(picture, func[, mode]): lutSize must be between 2 and 65")
+        raise ValueError
+    return ColorTools.applyColorFunction(picture, func, mode, lutSize, inPlace)
+
+
 def makeColor(red, green=None, blue=None):
     return Color(red, green, blue)
 
@@ -874,6 +1406,16 @@ def duplicatePicture(picture):
         raise ValueError
     return Picture(picture)
 
+def makeView(picture, upperLeftX, upperLeftY, width, height):
+    if not isinstance(picture, Picture):
+        print("makeView(picture, upperLeftX, upperLeftY, width, height): First parameter is not a picture")
+        raise ValueError
+    if upperLeftX < 0 or upperLeftY < 0 or width < 0 or height < 0 or \
+            upperLeftX + width > getWidth(picture) or upperLeftY + height > getHeight(picture):
+        print("makeView(picture, upperLeftX, upperLeftY, width, height): The view must lie within the picture")
+        raise ValueError
+    return picture.view(upperLeftX, upperLeftY, width, height)
+
 def cropPicture(picture, upperLeftX, upperLeftY, width, height):
  if not isinstance(picture, Picture):
    print("crop(picture, upperLeftX, upperLeftY, width, height): First parameter is not a picture")
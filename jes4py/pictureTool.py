@@ -32,6 +32,7 @@ Summer 2020 JES4py Team: Dr. Jonathan Senning
 
 """
 
+import io
 import os
 import sys
 import wx
@@ -161,9 +162,11 @@ class MainWindow(wx.Frame):
     y = 0
 
     def __init__(self, filename, parent, title):
-        # Load image and get image size
+        # Load image (from a file name or a file object) and get image size
         self.image = wx.Image(filename, wx.BITMAP_TYPE_ANY)
         self.bmp = wx.Bitmap(self.image)
+        self.pyramid = [self.image]
+        self.scaledImages = {}
         super(MainWindow, self).__init__(parent=parent, title=title, style=wx.DEFAULT_FRAME_STYLE)
 
         self.InitUI()
@@ -391,7 +394,7 @@ class MainWindow(wx.Frame):
         """
         w, h = self.image.GetSize()
         w, h = int(w * self.zoomFactor), int(h * self.zoomFactor)
-        image = self.image.Scale(w, h)
+        image = self.getScaledImage(w, h)
         self.bmp = wx.Bitmap(image)
         self.imageCtrl.SetBitmap(self.bmp)
 
@@ -401,6 +404,30 @@ class MainWindow(wx.Frame):
         # Forget any saved bitmap buffer
         self.crosshair.clearBackupBitmap()
         
+    def getScaledImage(self, w, h):
+        """Return the image scaled to a given size, reusing earlier results
+
+        Scaled images are kept so switching between zoom levels does not
+        rescale the image again.  Reductions start from the smallest of a
+        pyramid of successively halved images that is still at least
+        twice the requested size, rather than from the full image.
+        """
+        image = self.scaledImages.get((w, h))
+        if image is None:
+            level = 0
+            source = self.pyramid[0]
+            while (source.GetWidth() // 2 >= 2 * w
+                    and source.GetHeight() // 2 >= 2 * h):
+                level += 1
+                if level == len(self.pyramid):
+                    self.pyramid.append(source.Scale(
+                        source.GetWidth() // 2, source.GetHeight() // 2,
+                        wx.IMAGE_QUALITY_BOX_AVERAGE))
+                source = self.pyramid[level]
+            image = source.Scale(w, h)
+            self.scaledImages[(w, h)] = image
+        return image
+
     def drawCrosshairs(self):
         """Draw image with crosshairs to indicate selected position
         """
@@ -477,7 +504,7 @@ class MainWindow(wx.Frame):
 
 def main(argv):
 
-    usage = "usage: {} file [title]".format(argv[0])
+    usage = "usage: {} file [title]  (file - reads the image from stdin)".format(argv[0])
     # Get image file name and optional image title from command line
     if len(argv) == 2:
         filename = title = argv[1]
@@ -488,13 +515,18 @@ def main(argv):
         print(usage)
         exit(1)
 
-    if not os.path.isfile(filename):
+    if filename == "-":
+        # the image file itself is sent through stdin
+        image = io.BytesIO(sys.stdin.buffer.read())
+    elif os.path.isfile(filename):
+        image = filename
+    else:
         print("{} does not exist or is not a file".format(filename))
         print(usage)
         exit(1)
 
     app = wx.App(False)
-    frame = MainWindow(filename=filename, parent=None, title=title)
+    frame = MainWindow(filename=image, parent=None, title=title)
     frame.Show()
     app.MainLoop()
 
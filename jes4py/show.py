@@ -23,7 +23,9 @@ The repaint() method checks to make sure a subprocess for this picture object
 is currently running and then sends the pickled updated picture object.
 
 This script expects the initial byte of data to be 0 (to exit) or 1
-(a pickled picture object follows).
+(a pickled picture object follows).  A picture is sent as the 8-byte
+length of the pickle, the pickle (protocol 5), the 8-byte number of
+out-of-band buffers and then each buffer as its 8-byte length and data.
 
 Implementation note: The thread portion of this program is based on the
 first example at https://wiki.wxpython.org/LongRunningTasks.  The pickling
@@ -81,7 +83,14 @@ class Listener(Thread):
                     data = sys.stdin.buffer.read(8)
                     dataLen = int.from_bytes(data, byteorder='big')
                     pkg = sys.stdin.buffer.read(dataLen)
-                    wx.PostEvent(self.notifyWindow, MessageEvent(pkg))
+                    data = sys.stdin.buffer.read(8)
+                    buffers = []
+                    for i in range(int.from_bytes(data, byteorder='big')):
+                        data = sys.stdin.buffer.read(8)
+                        dataLen = int.from_bytes(data, byteorder='big')
+                        buffers.append(sys.stdin.buffer.read(dataLen))
+                    wx.PostEvent(self.notifyWindow,
+                                 MessageEvent((pkg, buffers)))
                 except RuntimeError:
                     return
             else:
@@ -121,14 +130,15 @@ class MainWindow(wx.Frame):
             the event object
 
         event.data is either None (to indicate request to terminate program)
-        or a pickled Picture object
+        or a pickled Picture object and its out-of-band buffers
         """
         if event.data is None:
             # all done
             self.Close()
         else:
             # unpickle data and update displayed image
-            picture = pickle.loads(event.data)
+            pkg, buffers = event.data
+            picture = pickle.loads(pkg, buffers=buffers)
             self.updateBitmap(picture)
 
     def updateBitmap(self, picture):
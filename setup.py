@@ -19,6 +19,7 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     python_requires='>=3.0.0',install_requires=[
+        'numpy',
         'wave',
         'wxPython',
         'simpleaudio'